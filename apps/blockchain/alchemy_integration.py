@@ -4,71 +4,29 @@ import json
 import os
 from django.conf import settings
 
+from .batch_fetch import JsonRpcBatchError, batch_contract_calls
+from .contract_registry import get_ecommerce
+from .event_indexer import (
+    compra_on_chain_data, decode_receipt_events, product_data, producto_on_chain_data, purchase_data,
+)
+from .fees import get_fee_oracle
+from .metrics import instrumented
+from .models import CompraOnChain, ProductoOnChain
+from .providers import get_http_provider
+from .signer import get_signer
+
 class BlockchainService:
     def __init__(self):
-        self.web3 = Web3(Web3.HTTPProvider(settings.ALCHEMY_API_URL))
+        self.web3 = Web3(get_http_provider(settings.ALCHEMY_API_URL))
+        self.fees = get_fee_oracle(self.web3)
         self.contract_address = settings.CONTRACT_ADDRESS
-        self.contract_abi = self._load_abi()
-        self.contract = self.web3.eth.contract(
-            address=self.contract_address,
-            abi=self.contract_abi
-        )
+        # ABI leído y validado una vez por proceso (artefacto de Truffle o ABI de ECommerce.sol)
+        spec = get_ecommerce()
+        self.contract_abi = spec.abi
+        self.contract = spec.contract(self.web3, self.contract_address)
         self.owner_private_key = settings.OWNER_PRIVATE_KEY
         self.owner_address = settings.OWNER_ADDRESS
 
-    def _load_abi(self):
-        """Cargar ABI del contrato desde el archivo de compilación"""
-        try:
-            with open('build/contracts/ECommerce.json', 'r') as f:
-                contract_data = json.load(f)
-                return contract_data['abi']
-        except FileNotFoundError:
-            # ABI básico como fallback
-            return [
-                {
-                    "inputs": [],
-                    "stateMutability": "nonpayable",
-                    "type": "constructor"
-                },
-                {
-                    "anonymous": False,
-                    "inputs": [
-                        {
-                            "indexed": True,
-                            "internalType": "uint256",
-                            "name": "productId",
-                            "type": "uint256"
-                        },
-                        {
-                            "indexed": False,
-                            "internalType": "string",
-                            "name": "name",
-                            "type": "string"
-                        },
-                        {
-                            "indexed": False,
-                            "internalType": "uint256",
-                            "name": "price",
-                            "type": "uint256"
-                        },
-                        {
-                            "indexed": False,
-                            "internalType": "uint256",
-                            "name": "stock",
-                            "type": "uint256"
-                        },
-                        {
-                            "indexed": False,
-                            "internalType": "address",
-                            "name": "creator",
-                            "type": "address"
-                        }
-                    ],
-                    "name": "ProductRegistered",
-                    "type": "event"
-                }
-            ]
-
     def check_connection(self):
         """Verificar conexión con Sepolia"""
         try:
@@ -80,6 +38,7 @@ class BlockchainService:
         except Exception as e:
             return False, f"Error de conexión: {str(e)}"
 
+    @instrumented
     def register_product(self, name, price, stock):
         """Registrar nuevo producto en blockchain"""
         try:
@@ -89,25 +48,24 @@ class BlockchainService:
             ).build_transaction({
                 'from': self.owner_address,
                 'gas': 200000,
-                'gasPrice': self.web3.eth.gas_price,
+                **self.fees.fee_params(),
                 'nonce': self.web3.eth.get_transaction_count(self.owner_address)
             })
 
             # Firmar transacción
-            signed_txn = self.web3.eth.account.sign_transaction(
-                transaction, self.owner_private_key
-            )
+            signed_txn = get_signer(self.owner_private_key).sign(transaction)
 
             # Enviar transacción
-            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
             
             # Esperar confirmación
             receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+            registered = decode_receipt_events(receipt, 'ProductRegistered')
             
             return {
                 'success': True,
                 'tx_hash': tx_hash.hex(),
-                'product_id': None,  # Se obtendría del evento
+                'product_id': registered[0][0] if registered else None,
                 'block_number': receipt.blockNumber
             }
             
@@ -117,6 +75,7 @@ class BlockchainService:
                 'error': str(e)
             }
 
+    @instrumented
     def register_purchase(self, product_id, quantity, product_data, buyer_address):
         """Registrar compra en blockchain"""
         try:
@@ -132,26 +91,25 @@ class BlockchainService:
                 'from': buyer_address,
                 'value': total_price,
                 'gas': 300000,
-                'gasPrice': self.web3.eth.gas_price,
+                **self.fees.fee_params(),
                 'nonce': self.web3.eth.get_transaction_count(buyer_address)
             })
 
             # Firmar transacción (en un caso real, el usuario firmaría)
             # Para demo, usamos una cuenta controlada
-            signed_txn = self.web3.eth.account.sign_transaction(
-                transaction, self.owner_private_key
-            )
+            signed_txn = get_signer(self.owner_private_key).sign(transaction)
 
             # Enviar transacción
-            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
             
             # Esperar confirmación
             receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+            purchased = decode_receipt_events(receipt, 'ProductPurchased')
             
             return {
                 'success': True,
                 'tx_hash': tx_hash.hex(),
-                'purchase_id': None,  # Se obtendría del evento
+                'purchase_id': purchased[0][0] if purchased else None,
                 'block_number': receipt.blockNumber
             }
             
@@ -161,33 +119,60 @@ class BlockchainService:
                 'error': str(e)
             }
 
+    @instrumented
     def get_product(self, product_id):
-        """Obtener información de producto desde blockchain"""
+        """Obtener información de producto (índice local de eventos o blockchain)"""
+        producto = ProductoOnChain.objects.filter(product_id=product_id).first()
+        if producto is not None:
+            return producto_on_chain_data(producto)
         try:
-            product = self.contract.functions.getProduct(product_id).call()
-            return {
-                'id': product[0],
-                'name': product[1],
-                'price': product[2],
-                'stock': product[3],
-                'creator': product[4],
-                'created_at': product[5]
-            }
+            return product_data(self.contract.functions.getProduct(product_id).call())
         except Exception as e:
             return {'error': str(e)}
 
+    @instrumented
     def get_purchase(self, purchase_id):
-        """Obtener información de compra desde blockchain"""
+        """Obtener información de compra (índice local de eventos o blockchain)"""
+        compra = CompraOnChain.objects.filter(purchase_id=purchase_id).first()
+        if compra is not None:
+            return compra_on_chain_data(compra)
         try:
-            purchase = self.contract.functions.getPurchase(purchase_id).call()
-            return {
-                'purchase_id': purchase[0],
-                'product_id': purchase[1],
-                'buyer': purchase[2],
-                'quantity': purchase[3],
-                'total_price': purchase[4],
-                'purchased_at': purchase[5],
-                'product_data': purchase[6]
-            }
+            return purchase_data(self.contract.functions.getPurchase(purchase_id).call())
         except Exception as e:
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+    
+    @instrumented
+    def get_products(self, product_ids, block_identifier=None):
+        """Leer varios productos en un único lote de eth_call fijado a un bloque"""
+        try:
+            block_number, results = batch_contract_calls(
+                self.web3, self.contract, 'getProduct',
+                [(product_id,) for product_id in product_ids], block_identifier
+            )
+        except Exception as e:
+            return {'error': str(e)}
+        return {
+            'block_number': block_number,
+            'products': [
+                {'id': product_id, 'error': str(r)} if isinstance(r, JsonRpcBatchError) else product_data(r)
+                for product_id, r in zip(product_ids, results)
+            ]
+        }
+    
+    @instrumented
+    def get_purchases(self, purchase_ids, block_identifier=None):
+        """Leer varias compras en un único lote de eth_call fijado a un bloque"""
+        try:
+            block_number, results = batch_contract_calls(
+                self.web3, self.contract, 'getPurchase',
+                [(purchase_id,) for purchase_id in purchase_ids], block_identifier
+            )
+        except Exception as e:
+            return {'error': str(e)}
+        return {
+            'block_number': block_number,
+            'purchases': [
+                {'purchase_id': purchase_id, 'error': str(r)} if isinstance(r, JsonRpcBatchError) else purchase_data(r)
+                for purchase_id, r in zip(purchase_ids, results)
+            ]
+        }
@@ -3,4 +3,10 @@ from django.apps import AppConfig
 class BlockchainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.blockchain'
-    verbose_name = 'Blockchain'
\ No newline at end of file
+    verbose_name = 'Blockchain'
+
+    def ready(self):
+        # Señales de borrado que mantienen el resumen de ventas
+        from . import sales_summary  # noqa: F401
+        # La conexión con la cadena no se abre aquí: ready() también corre en cada
+        # comando de manage.py (migrate, check...). La lanzan wsgi.py y asgi.py
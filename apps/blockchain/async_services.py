@@ -0,0 +1,132 @@
+# apps/blockchain/async_services.py
+import asyncio
+
+from django.conf import settings
+from web3 import AsyncWeb3
+
+from .batch_fetch import async_fetch_recent_transactions
+from .fees import get_fee_oracle
+from .info_cache import AsyncBlockKeyedCache
+from .metrics import instrumented
+from .nonce_manager import get_nonce_manager
+from .providers import get_async_http_provider
+
+
+class AsyncBlockchainService:
+    """Variante AsyncWeb3 de BlockchainService para las vistas async bajo ASGI.
+
+    No hace I/O en el constructor: la conexión se establece en la primera
+    llamada con `await service.connect()`.
+    """
+
+    def __init__(self, provider_url='http://localhost:8545'):
+        self.provider_url = provider_url
+        self.w3 = AsyncWeb3(get_async_http_provider(provider_url))
+        self.default_account = None
+        self.contract_address = None
+        self.nonce_manager = None
+        self._connect_lock = None
+        self._info_cache = AsyncBlockKeyedCache(self._fetch_blockchain_info, ttl=settings.BLOCKCHAIN_INFO_TTL)
+
+    @instrumented
+    async def connect(self):
+        """Conectar a Ganache y preparar la cuenta por defecto (solo la primera vez)"""
+        if self.default_account is not None:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.default_account is not None:
+                return
+            if not await self.w3.is_connected():
+                raise Exception("No se pudo conectar a Ganache")
+            accounts = await self.w3.eth.accounts
+            self.nonce_manager = get_nonce_manager(self.w3, accounts[0])
+            self.default_account = accounts[0]
+            print(f"✅ AsyncBlockchainService conectado a {self.provider_url}")
+
+    @instrumented
+    async def purchase_product_on_blockchain(self, product_id, quantity, total):
+        """Enviar la transacción de compra sin bloquear el worker ni esperar a que se mine"""
+        try:
+            await self.connect()
+
+            accounts = await self.w3.eth.accounts
+            from_account = self.default_account
+            to_account = accounts[1] if len(accounts) > 1 else from_account
+            fees = await get_fee_oracle(self.w3).afee_params(self.w3)
+
+            async def send(nonce):
+                transaction = {
+                    'from': from_account,
+                    'to': to_account,
+                    'value': self.w3.to_wei(0.001, 'ether'),
+                    'gas': 21000,
+                    **fees,
+                    'nonce': nonce,
+                }
+                return await self.w3.eth.send_transaction(transaction)
+
+            print(f"⏳ Enviando transacción async a Ganache (producto {product_id}, cantidad {quantity})...")
+            tx_hash = await self.nonce_manager.asend(self.w3, send)
+
+            # Sin HeadWatcher en el loop: el saldo cambió, no esperar al TTL
+            self._info_cache.invalidate()
+
+            # La confirmación la hace el confirmador en segundo plano (confirmer.py)
+            tx_hash_hex = self.w3.to_hex(tx_hash)
+            print(f"📤 Transacción Ganache enviada (pendiente de confirmación): {tx_hash_hex}")
+            return tx_hash_hex
+
+        except Exception as e:
+            print(f"❌ Error en transacción Ganache: {e}")
+            return None
+
+    @instrumented
+    async def get_blockchain_info(self):
+        """Obtener información de la blockchain (cacheada por bloque)"""
+        try:
+            await self.connect()
+            return dict(await self._info_cache.aget())
+        except Exception as e:
+            return {
+                'connected': False,
+                'error': str(e)
+            }
+
+    async def _fetch_blockchain_info(self):
+        """Consultas en paralelo; devuelve (info, bloque)"""
+        balance_wei, block_number, accounts, gas_price, listening = await asyncio.gather(
+            self.w3.eth.get_balance(self.default_account),
+            self.w3.eth.block_number,
+            self.w3.eth.accounts,
+            self.w3.eth.gas_price,
+            self.w3.net.listening,
+        )
+        return {
+            'connected': True,
+            'network': 'Ganache Local',
+            'block_number': block_number,
+            'default_account': self.default_account,
+            'balance_eth': float(self.w3.from_wei(balance_wei, 'ether')),
+            'contract_address': self.contract_address,
+            'accounts_available': len(accounts),
+            'gas_price': self.w3.from_wei(gas_price, 'gwei'),
+            'is_listening': listening
+        }, block_number
+
+    @instrumented
+    async def get_recent_transactions(self, depth=5, limit=20):
+        """Transacciones recientes con sus recibos mediante lotes JSON-RPC"""
+        return await async_fetch_recent_transactions(self.w3, depth=depth, limit=limit)
+
+
+_service = None
+
+
+def get_async_service():
+    """Instancia compartida del servicio async (creación sin I/O)"""
+    global _service
+    if _service is None:
+        _service = AsyncBlockchainService()
+    return _service
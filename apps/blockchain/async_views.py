@@ -0,0 +1,167 @@
+# apps/blockchain/async_views.py
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.contrib.auth.models import User
+import json
+
+from .models import BlockchainProducto, BlockchainOrden, CheckpointIndexador
+from .async_services import get_async_service
+from .batch_fetch import async_batch_request, hex_to_int
+from .head_watcher import known_head
+from .indexer import CHECKPOINT_BLOQUES, indice_cubre, rango_explicito, transaccion_indexada_data
+from .sales_summary import aleer_resumen
+from .serialization import (
+    estadisticas_data, orden_data, ordenes_recientes_values, producto_data, productos_values,
+)
+from .views import ERROR_PARAMETROS_TX, parametros_transacciones
+from apps.tienda.stock import StockInsuficiente, cantidad_valida, comprar, con_reintentos
+
+
+def async_csrf_exempt(view):
+    """csrf_exempt para vistas async (el decorador de Django 4.2 no las soporta)"""
+    view.csrf_exempt = True
+    return view
+
+
+@async_csrf_exempt
+async def blockchain_info(request):
+    """Información de la blockchain (async)"""
+    info = await get_async_service().get_blockchain_info()
+    return JsonResponse(info)
+
+
+@async_csrf_exempt
+async def comprar_producto(request):
+    """Compra que devuelve en cuanto la transacción se difunde, sin bloquear un hilo"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            producto_id = data.get('producto_id')
+            cantidad = data.get('cantidad', 1)
+
+            if not cantidad_valida(cantidad):
+                return JsonResponse({'error': 'La cantidad debe ser un entero positivo'}, status=400)
+
+            comprador, _ = await User.objects.aget_or_create(username='comprador1')
+
+            def crear_orden(producto):
+                return BlockchainOrden.objects.create(
+                    producto=producto,
+                    comprador=comprador,
+                    cantidad=cantidad,
+                    total_pagado=producto.precio * cantidad
+                )
+
+            # Reserva de stock y orden en una transacción (síncrona: atomic no admite await)
+            producto, orden = await sync_to_async(comprar)(BlockchainProducto, producto_id, cantidad, crear_orden)
+            total = orden.total_pagado
+
+            # Registrar compra en blockchain
+            tx_hash = await get_async_service().purchase_product_on_blockchain(
+                producto_id,
+                cantidad,
+                float(total)
+            )
+            orden.blockchain_tx_hash = tx_hash
+            orden.estado = 'pendiente' if tx_hash else 'fallida'
+            await sync_to_async(con_reintentos)(lambda: orden.save(update_fields=['blockchain_tx_hash', 'estado']))
+
+            return JsonResponse({
+                'mensaje': 'Compra enviada a blockchain, pendiente de confirmación',
+                'orden': {
+                    'id': orden.id,
+                    'producto': producto.nombre,
+                    'cantidad': cantidad,
+                    'total': str(total),
+                    'blockchain_tx': tx_hash,
+                    'estado': orden.estado
+                }
+            })
+
+        except BlockchainProducto.DoesNotExist:
+            return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+        except StockInsuficiente:
+            return JsonResponse({'error': 'Stock insuficiente'}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+@async_csrf_exempt
+async def dashboard_completo(request):
+    """Dashboard (async): la info de la cadena no ocupa un hilo del worker"""
+    try:
+        productos_data = [producto_data(row) async for row in productos_values(BlockchainProducto.objects.all())]
+        ordenes_data = [orden_data(row) async for row in ordenes_recientes_values(BlockchainOrden.objects.all())]
+
+        blockchain_info = await get_async_service().get_blockchain_info()
+
+        stats = estadisticas_data(await aleer_resumen(), blockchain_info)
+
+        return JsonResponse({
+            'estadisticas': stats,
+            'productos': productos_data,
+            'ordenes_recientes': ordenes_data,
+            'blockchain_info': blockchain_info
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error en dashboard: {str(e)}'}, status=500)
+
+
+@async_csrf_exempt
+async def transacciones_detalladas(request):
+    """Transacciones blockchain detalladas (async, lotes JSON-RPC)"""
+    try:
+        try:
+            depth, limit, pagina, qs = parametros_transacciones(request.GET)
+        except ValueError:
+            return JsonResponse({'error': ERROR_PARAMETROS_TX}, status=400)
+
+        service = get_async_service()
+        checkpoint = await CheckpointIndexador.objects.filter(nombre=CHECKPOINT_BLOQUES).afirst()
+        if checkpoint:
+            head = known_head(service.w3)
+            if head is None:
+                try:
+                    head = hex_to_int((await async_batch_request(service.w3, [('eth_blockNumber', [])]))[0])
+                except Exception:
+                    # Sin nodo no hay con qué comparar: se responde del índice indicando su altura
+                    head = None
+            rango = rango_explicito(request.GET)
+            if head is None or rango or indice_cubre(checkpoint, head, depth):
+                if not rango:
+                    qs = qs.filter(block_number__gt=(head if head is not None else checkpoint.block_number) - depth)
+                offset = (pagina - 1) * limit
+                return JsonResponse({
+                    'fuente': 'indice',
+                    'bloque_indexado': checkpoint.block_number,
+                    'bloque_cabeza': head,
+                    'total_transacciones': await qs.acount(),
+                    'pagina': pagina,
+                    'por_pagina': limit,
+                    'transacciones': [transaccion_indexada_data(t) async for t in qs[offset:offset + limit]]
+                })
+
+        transacciones_detalladas = []
+        for block, tx, tx_receipt in await service.get_recent_transactions(depth=depth, limit=limit):
+            transacciones_detalladas.append({
+                'block_number': hex_to_int(block['number']),
+                'hash': tx['hash'],
+                'from': tx['from'],
+                'to': tx['to'] if tx['to'] else 'Contract Creation',
+                'value_eth': float(service.w3.from_wei(hex_to_int(tx['value']), 'ether')),
+                'gas_used': hex_to_int(tx_receipt['gasUsed']) if tx_receipt else 0,
+                'gas_price_gwei': float(service.w3.from_wei(hex_to_int(tx.get('gasPrice', '0x0')), 'gwei')),
+                'status': 'Success' if tx_receipt and hex_to_int(tx_receipt['status']) == 1 else 'Failed',
+                'timestamp': hex_to_int(block['timestamp']) if 'timestamp' in block else None
+            })
+
+        return JsonResponse({
+            'fuente': 'nodo',
+            'total_transacciones': len(transacciones_detalladas),
+            'transacciones': transacciones_detalladas
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,494 @@
+# apps/blockchain/batch_fetch.py
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from eth_abi import decode
+from eth_utils.abi import collapse_if_tuple
+
+from .chain_cache import get_chain_cache
+from .head_watcher import known_head
+from .metrics import observe_rpc
+from .providers import get_async_session, get_session, get_timeout
+
+_request_ids = itertools.count(1)
+
+# Endpoints que ya respondieron que no soportan eth_getBlockReceipts
+_block_receipts_unsupported = set()
+# Código JSON-RPC 2.0 de método inexistente
+METHOD_NOT_FOUND = -32601
+_support_lock = threading.Lock()
+
+# Hash del bloque génesis por endpoint, espacio de nombres de la ChainCache:
+# endpoint -> (hash, cabeza más alta vista, momento de la última comprobación)
+_chain_namespaces = {}
+
+
+class JsonRpcBatchError(Exception):
+    """Error devuelto por el nodo para una petición dentro de un lote"""
+
+    def __init__(self, method, error):
+        self.method = method
+        self.error = error
+        super().__init__(f"{method}: {error.get('message', error) if isinstance(error, dict) else error}")
+
+
+def _endpoint(w3):
+    endpoint = getattr(w3.provider, 'endpoint_uri', None)
+    if not endpoint:
+        raise ValueError('El proveedor no expone endpoint_uri; el batching requiere un HTTPProvider')
+    return str(endpoint)
+
+
+def _build_payload(calls):
+    return [{
+        'jsonrpc': '2.0',
+        'id': next(_request_ids),
+        'method': method,
+        'params': list(params),
+    } for method, params in calls]
+
+
+def _parse_batch(payload, calls, body):
+    # Algunos nodos devuelven un único objeto de error si rechazan el lote completo
+    if isinstance(body, dict):
+        raise JsonRpcBatchError('batch', body.get('error', body))
+
+    by_id = {item.get('id'): item for item in body}
+    results = []
+    for request, (method, _) in zip(payload, calls):
+        item = by_id.get(request['id'])
+        if item is None:
+            results.append(JsonRpcBatchError(method, 'Sin respuesta en el lote'))
+        elif 'error' in item:
+            results.append(JsonRpcBatchError(method, item['error']))
+        else:
+            results.append(item.get('result'))
+    return results
+
+
+def _observe_batch(calls, elapsed, results=None):
+    # Cada método del lote cuenta la latencia del lote completo
+    for i, (method, _) in enumerate(calls):
+        error = results is None or isinstance(results[i], JsonRpcBatchError)
+        observe_rpc((method,), elapsed, error)
+
+
+def batch_request(w3, calls, timeout=None):
+    """Enviar una lista de (método, params) en un único POST JSON-RPC.
+
+    Devuelve una lista alineada con `calls`; cada elemento es el resultado o
+    una JsonRpcBatchError si el nodo falló esa petición concreta.
+    """
+    if not calls:
+        return []
+
+    payload = _build_payload(calls)
+    router = getattr(w3.provider, 'router', None)
+
+    def send(url):
+        session = get_session() if router is None else get_session(retry=False)
+        response = session.post(url, json=payload, timeout=timeout or get_timeout())
+        response.raise_for_status()
+        return response.json()
+
+    start = time.perf_counter()
+    try:
+        if router is None:
+            body = send(_endpoint(w3))
+        else:
+            # Un lote con algún envío va entero al primario (ver PRIMARY_METHODS)
+            body = router.send([method for method, _ in calls], send)
+        results = _parse_batch(payload, calls, body)
+    except Exception:
+        _observe_batch(calls, time.perf_counter() - start)
+        raise
+    _observe_batch(calls, time.perf_counter() - start, results)
+    return results
+
+
+async def async_batch_request(w3, calls):
+    """Versión asyncio de batch_request (para AsyncWeb3)"""
+    if not calls:
+        return []
+
+    payload = _build_payload(calls)
+    session = await get_async_session()
+
+    async def send(url):
+        async with session.post(url, json=payload) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    router = getattr(w3.provider, 'router', None)
+    start = time.perf_counter()
+    try:
+        if router is None:
+            body = await send(_endpoint(w3))
+        else:
+            body = await router.asend([method for method, _ in calls], send)
+        results = _parse_batch(payload, calls, body)
+    except Exception:
+        _observe_batch(calls, time.perf_counter() - start)
+        raise
+    _observe_batch(calls, time.perf_counter() - start, results)
+    return results
+
+
+def hex_to_int(value):
+    """Convertir una cantidad JSON-RPC ('0x1a') a entero"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    return int(value, 16)
+
+
+def _known_namespace(endpoint, head):
+    """Génesis memorizado del endpoint, o None si hay que volver a comprobarlo.
+
+    Se comprueba de nuevo cada BLOCKCHAIN_CHAIN_NAMESPACE_TTL segundos y en
+    cuanto la cabeza retrocede (un nodo reiniciado vuelve a numerar desde 0).
+    """
+    entry = _chain_namespaces.get(endpoint)
+    if entry is None:
+        return None
+    namespace, highest, checked_at = entry
+    if head is not None and highest is not None and head < highest:
+        return None
+    if time.monotonic() - checked_at >= settings.BLOCKCHAIN_CHAIN_NAMESPACE_TTL:
+        return None
+    if head is not None and (highest is None or head > highest):
+        _chain_namespaces[endpoint] = (namespace, head, checked_at)
+    return namespace
+
+
+def _remember_namespace(endpoint, genesis, head):
+    if not isinstance(genesis, dict):
+        return None
+    previous = _chain_namespaces.get(endpoint)
+    if previous is not None and previous[0] != genesis['hash']:
+        print(f"🔄 {endpoint}: la cadena cambió (nuevo génesis), la caché de bloques empieza de cero")
+    _chain_namespaces[endpoint] = (genesis['hash'], head, time.monotonic())
+    return genesis['hash']
+
+
+def _chain_namespace(w3, head=None):
+    endpoint = _endpoint(w3)
+    namespace = _known_namespace(endpoint, head)
+    if namespace is None:
+        genesis = batch_request(w3, [('eth_getBlockByNumber', ['0x0', False])])[0]
+        namespace = _remember_namespace(endpoint, genesis, head)
+    return namespace
+
+
+async def _async_chain_namespace(w3, head=None):
+    endpoint = _endpoint(w3)
+    namespace = _known_namespace(endpoint, head)
+    if namespace is None:
+        genesis = (await async_batch_request(w3, [('eth_getBlockByNumber', ['0x0', False])]))[0]
+        namespace = _remember_namespace(endpoint, genesis, head)
+    return namespace
+
+
+def _block_key(number, full_transactions):
+    return f"{number}:{int(bool(full_transactions))}"
+
+
+def _cached_blocks(namespace, block_numbers, full_transactions):
+    cache = get_chain_cache()
+    if cache is None or namespace is None:
+        return {}
+    found = cache.get_many(namespace, 'block', [_block_key(n, full_transactions) for n in block_numbers])
+    return {n: found[_block_key(n, full_transactions)] for n in block_numbers if _block_key(n, full_transactions) in found}
+
+
+def _admit_blocks(namespace, block_numbers, results, full_transactions, head):
+    cache = get_chain_cache()
+    if cache is None or namespace is None:
+        return
+    cache.put_many(namespace, 'block', [
+        (_block_key(n, full_transactions), block, n)
+        for n, block in zip(block_numbers, results) if isinstance(block, dict)
+    ], head)
+
+
+def _cached_receipts(namespace, hashes):
+    cache = get_chain_cache()
+    if cache is None or namespace is None:
+        return {}
+    found = cache.get_many(namespace, 'receipt', [h.lower() for h in hashes])
+    return {h: found[h.lower()] for h in hashes if h.lower() in found}
+
+
+def _admit_receipts(namespace, receipts, head):
+    cache = get_chain_cache()
+    if cache is None or namespace is None:
+        return
+    cache.put_many(namespace, 'receipt', [
+        (tx_hash.lower(), receipt, hex_to_int(receipt.get('blockNumber')))
+        for tx_hash, receipt in receipts.items()
+    ], head)
+
+
+def _blocks_calls(block_numbers, full_transactions):
+    return [('eth_getBlockByNumber', [hex(n), full_transactions]) for n in block_numbers]
+
+
+def _collect_blocks(block_numbers, results):
+    blocks = []
+    for number, result in zip(block_numbers, results):
+        if isinstance(result, JsonRpcBatchError):
+            print(f"Error obteniendo bloque {number}: {result}")
+            continue
+        if result:
+            blocks.append(result)
+    return blocks
+
+
+def fetch_blocks(w3, block_numbers, full_transactions=True, head=None, cache=True):
+    """Obtener varios bloques (con transacciones completas) en un único round trip.
+
+    Los bloques finalizados salen de la ChainCache; sólo se piden al nodo los
+    que faltan. `head` (o la cabeza del HeadWatcher) decide qué bloques son
+    finales y pueden guardarse. El indexador pasa `cache=False`: recorre cada
+    bloque una sola vez y sólo desplazaría entradas útiles.
+    """
+    head = head if head is not None else known_head(w3)
+    namespace = _chain_namespace(w3, head) if cache else None
+    cached = _cached_blocks(namespace, block_numbers, full_transactions)
+    missing = [n for n in block_numbers if n not in cached]
+    results = batch_request(w3, _blocks_calls(missing, full_transactions))
+    _admit_blocks(namespace, missing, results, full_transactions, head)
+    fetched = dict(zip(missing, results))
+    return _collect_blocks(block_numbers, [cached[n] if n in cached else fetched[n] for n in block_numbers])
+
+
+async def async_fetch_blocks(w3, block_numbers, full_transactions=True, head=None):
+    namespace = await _async_chain_namespace(w3, head)
+    cached = _cached_blocks(namespace, block_numbers, full_transactions)
+    missing = [n for n in block_numbers if n not in cached]
+    results = await async_batch_request(w3, _blocks_calls(missing, full_transactions))
+    _admit_blocks(namespace, missing, results, full_transactions, head)
+    fetched = dict(zip(missing, results))
+    return _collect_blocks(block_numbers, [cached[n] if n in cached else fetched[n] for n in block_numbers])
+
+
+def _block_receipts_result(results, wanted):
+    if any(isinstance(r, JsonRpcBatchError) for r in results):
+        return None
+    receipts = {}
+    for block_receipts in results:
+        for receipt in block_receipts or []:
+            if wanted is None or receipt['transactionHash'] in wanted:
+                receipts[receipt['transactionHash']] = receipt
+    return receipts
+
+
+def _method_not_found(results):
+    # Sólo "method not found" demuestra que el nodo no tiene eth_getBlockReceipts;
+    # cualquier otro error del lote puede ser transitorio
+    return any(
+        isinstance(r, JsonRpcBatchError) and isinstance(r.error, dict) and r.error.get('code') == METHOD_NOT_FOUND
+        for r in results
+    )
+
+
+def _mark_block_receipts_unsupported(endpoint):
+    with _support_lock:
+        _block_receipts_unsupported.add(endpoint)
+    print(f"⚠️  {endpoint} no soporta eth_getBlockReceipts, usando lotes de eth_getTransactionReceipt")
+
+
+def _receipt_hashes(blocks, wanted):
+    hashes = []
+    for block in blocks:
+        for tx in block['transactions']:
+            tx_hash = tx['hash'] if isinstance(tx, dict) else tx
+            if wanted is None or tx_hash in wanted:
+                hashes.append(tx_hash)
+    return hashes
+
+
+def _collect_receipts(hashes, results):
+    receipts = {}
+    for tx_hash, receipt in zip(hashes, results):
+        if receipt and not isinstance(receipt, JsonRpcBatchError):
+            receipts[tx_hash] = receipt
+    return receipts
+
+
+def _uncached_blocks(blocks, wanted, cached):
+    # Bloques con algún recibo pedido que no esté ya en la caché
+    return [b for b in blocks if any(h not in cached for h in _receipt_hashes([b], wanted))]
+
+
+def fetch_receipts(w3, blocks, tx_hashes=None, head=None, cache=True):
+    """Obtener los recibos de los bloques indicados.
+
+    Usa eth_getBlockReceipts (un elemento del lote por bloque) cuando el nodo
+    lo soporta y, si no, un lote de eth_getTransactionReceipt. Los recibos de
+    bloques finalizados se sirven y se guardan en la ChainCache.
+    Devuelve un diccionario {tx_hash: recibo}.
+    """
+    wanted = set(tx_hashes) if tx_hashes is not None else None
+    endpoint = _endpoint(w3)
+    head = head if head is not None else known_head(w3)
+    namespace = _chain_namespace(w3, head) if cache else None
+
+    blocks_with_txs = [b for b in blocks if b.get('transactions')]
+    cached = _cached_receipts(namespace, _receipt_hashes(blocks_with_txs, wanted))
+    blocks_with_txs = _uncached_blocks(blocks_with_txs, wanted, cached)
+    if not blocks_with_txs:
+        return cached
+
+    receipts = None
+    if endpoint not in _block_receipts_unsupported:
+        calls = [('eth_getBlockReceipts', [b['number']]) for b in blocks_with_txs]
+        results = batch_request(w3, calls)
+        receipts = _block_receipts_result(results, wanted)
+        if receipts is None and _method_not_found(results):
+            _mark_block_receipts_unsupported(endpoint)
+
+    if receipts is None:
+        hashes = _receipt_hashes(blocks_with_txs, wanted)
+        results = batch_request(w3, [('eth_getTransactionReceipt', [h]) for h in hashes])
+        receipts = _collect_receipts(hashes, results)
+    _admit_receipts(namespace, receipts, head)
+    receipts.update(cached)
+    return receipts
+
+
+async def async_fetch_receipts(w3, blocks, tx_hashes=None, head=None):
+    wanted = set(tx_hashes) if tx_hashes is not None else None
+    endpoint = _endpoint(w3)
+    namespace = await _async_chain_namespace(w3, head)
+
+    blocks_with_txs = [b for b in blocks if b.get('transactions')]
+    cached = _cached_receipts(namespace, _receipt_hashes(blocks_with_txs, wanted))
+    blocks_with_txs = _uncached_blocks(blocks_with_txs, wanted, cached)
+    if not blocks_with_txs:
+        return cached
+
+    receipts = None
+    if endpoint not in _block_receipts_unsupported:
+        calls = [('eth_getBlockReceipts', [b['number']]) for b in blocks_with_txs]
+        results = await async_batch_request(w3, calls)
+        receipts = _block_receipts_result(results, wanted)
+        if receipts is None and _method_not_found(results):
+            _mark_block_receipts_unsupported(endpoint)
+
+    if receipts is None:
+        hashes = _receipt_hashes(blocks_with_txs, wanted)
+        results = await async_batch_request(w3, [('eth_getTransactionReceipt', [h]) for h in hashes])
+        receipts = _collect_receipts(hashes, results)
+    _admit_receipts(namespace, receipts, head)
+    receipts.update(cached)
+    return receipts
+
+
+def _older_block_numbers(latest, depth):
+    latest_number = hex_to_int(latest['number'])
+    return [latest_number - i for i in range(1, min(depth, latest_number + 1))]
+
+
+def _select_transactions(blocks, limit):
+    selected = []
+    for block in blocks:
+        for tx in block['transactions']:
+            if len(selected) >= limit:
+                break
+            selected.append((block, tx))
+    used_blocks = {block['number'] for block, _ in selected}
+    return selected, [b for b in blocks if b['number'] in used_blocks]
+
+
+def fetch_recent_transactions(w3, depth=5, limit=20):
+    """Transacciones de los últimos `depth` bloques con sus recibos.
+
+    Coste fijo: bloque más reciente + lote de bloques + lote de recibos,
+    sin importar cuántas transacciones haya.
+    Devuelve una lista de tuplas (bloque, transacción, recibo) en formato JSON-RPC.
+    """
+    latest = batch_request(w3, [('eth_getBlockByNumber', ['latest', True])])[0]
+    if isinstance(latest, JsonRpcBatchError):
+        raise latest
+
+    head = hex_to_int(latest['number'])
+    blocks = [latest] + fetch_blocks(w3, _older_block_numbers(latest, depth), head=head)
+    selected, used_blocks = _select_transactions(blocks, limit)
+    receipts = fetch_receipts(w3, used_blocks, tx_hashes=[tx['hash'] for _, tx in selected], head=head)
+    return [(block, tx, receipts.get(tx['hash'])) for block, tx in selected]
+
+
+async def async_fetch_recent_transactions(w3, depth=5, limit=20):
+    """Versión asyncio de fetch_recent_transactions"""
+    latest = (await async_batch_request(w3, [('eth_getBlockByNumber', ['latest', True])]))[0]
+    if isinstance(latest, JsonRpcBatchError):
+        raise latest
+
+    head = hex_to_int(latest['number'])
+    blocks = [latest] + await async_fetch_blocks(w3, _older_block_numbers(latest, depth), head=head)
+    selected, used_blocks = _select_transactions(blocks, limit)
+    receipts = await async_fetch_receipts(
+        w3, used_blocks, tx_hashes=[tx['hash'] for _, tx in selected], head=head
+    )
+    return [(block, tx, receipts.get(tx['hash'])) for block, tx in selected]
+
+
+def _function_abi(contract, fn_name):
+    for item in contract.abi:
+        if item.get('type') == 'function' and item.get('name') == fn_name:
+            return item
+    raise ValueError(f"El ABI del contrato no define la función {fn_name}")
+
+
+def batch_contract_calls(w3, contract, fn_name, args_list, block_identifier=None):
+    """Ejecutar `fn_name(*args)` para cada args de `args_list` con eth_call por lotes.
+
+    Todas las llamadas se fijan al mismo bloque (la cabeza conocida por el
+    HeadWatcher, o eth_blockNumber), así los resultados son coherentes entre sí.
+    Devuelve (bloque, resultados) con un resultado decodificado (tupla) o una
+    JsonRpcBatchError por cada elemento de `args_list`.
+    """
+    if block_identifier is None:
+        block_identifier = known_head(w3)
+    if block_identifier is None:
+        block_identifier = hex_to_int(batch_request(w3, [('eth_blockNumber', [])])[0])
+    block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+
+    # Import diferido: contract_registry -> deployments -> batch_fetch
+    from .contract_registry import registry
+
+    spec = registry.for_abi(contract.abi)
+    if spec is not None and fn_name in spec.functions:
+        # Contrato del registro: selector y tipos ya precalculados
+        output_types = spec.output_types[fn_name]
+        encode_call = spec.encode_call
+    else:
+        output_types = [collapse_if_tuple(o) for o in _function_abi(contract, fn_name)['outputs']]
+        encode_call = lambda name, args: contract.encodeABI(fn_name=name, args=list(args))
+    calls = [
+        ('eth_call', [{'to': contract.address, 'data': encode_call(fn_name, args)}, block])
+        for args in args_list
+    ]
+
+    size = settings.BLOCKCHAIN_CALL_BATCH_SIZE
+    results = []
+    for start in range(0, len(calls), size):
+        results.extend(batch_request(w3, calls[start:start + size]))
+
+    decoded = []
+    for result in results:
+        if isinstance(result, JsonRpcBatchError):
+            decoded.append(result)
+        elif not result or result == '0x':
+            # Sin código en la dirección o revert sin datos
+            decoded.append(JsonRpcBatchError(fn_name, 'Respuesta vacía de eth_call'))
+        else:
+            try:
+                decoded.append(decode(output_types, bytes.fromhex(result[2:])))
+            except Exception as e:
+                decoded.append(JsonRpcBatchError(fn_name, f"No se pudo decodificar la respuesta: {e}"))
+    return block_identifier, decoded
@@ -4,6 +4,17 @@ import json
 import os
 from django.conf import settings
 
+from .batch_fetch import JsonRpcBatchError, batch_contract_calls
+from .contract_registry import get_ecommerce
+from .event_indexer import product_data
+from .fees import get_fee_oracle
+from .metrics import instrumented
+from .providers import get_http_provider
+from .signer import get_signer
+
+# Private key de la primera cuenta de Hardhat (solo testing)
+HARDHAT_PRIVATE_KEY = '0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80'
+
 class BlockchainService:
     def __init__(self, network="localhost"):
         self.network = network
@@ -12,21 +23,18 @@ class BlockchainService:
     def setup_connection(self):
         """Configurar conexión según la red"""
         if self.network == "localhost":
-            self.web3 = Web3(Web3.HTTPProvider('http://127.0.0.1:8545'))
+            self.web3 = Web3(get_http_provider('http://127.0.0.1:8545'))
             self.contract_address = "0x5FbDB2315678afecb367f032d93F642f64180aa3"  # Reemplaza con tu dirección
         elif self.network == "sepolia":
-            self.web3 = Web3(Web3.HTTPProvider(settings.ALCHEMY_API_URL))
+            self.web3 = Web3(get_http_provider(settings.ALCHEMY_API_URL))
             self.contract_address = settings.CONTRACT_ADDRESS_SEPOLIA
         
-        # Cargar ABI del contrato
-        with open('blockchain/artifacts/contracts/ECommerce.sol/ECommerce.json', 'r') as f:
-            contract_data = json.load(f)
-            self.contract_abi = contract_data['abi']
+        self.fees = get_fee_oracle(self.web3)
         
-        self.contract = self.web3.eth.contract(
-            address=self.contract_address,
-            abi=self.contract_abi
-        )
+        # ABI del contrato (artefacto de Hardhat), cargado una vez por proceso
+        spec = get_ecommerce()
+        self.contract_abi = spec.abi
+        self.contract = spec.contract(self.web3, self.contract_address)
     
     def check_connection(self):
         """Verificar conexión con la blockchain"""
@@ -37,6 +45,7 @@ class BlockchainService:
         except Exception as e:
             return False, f"Error de conexión: {str(e)}"
     
+    @instrumented
     def register_product(self, name, price, stock):
         """Registrar nuevo producto en blockchain"""
         try:
@@ -52,17 +61,15 @@ class BlockchainService:
             ).build_transaction({
                 'from': account,
                 'gas': 200000,
-                'gasPrice': self.web3.eth.gas_price,
+                **self.fees.fee_params(),
                 'nonce': self.web3.eth.get_transaction_count(account)
             })
             
             # Firmar transacción (en local no necesita clave privada)
-            signed_txn = self.web3.eth.account.sign_transaction(
-                transaction, '0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80'  # Private key de Hardhat
-            )
+            signed_txn = get_signer(HARDHAT_PRIVATE_KEY).sign(transaction)
             
             # Enviar transacción
-            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
             
             # Esperar confirmación
             receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
@@ -77,6 +84,7 @@ class BlockchainService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @instrumented
     def purchase_product(self, product_id, quantity, product_data, buyer_address):
         """Realizar compra en blockchain"""
         try:
@@ -95,17 +103,15 @@ class BlockchainService:
                 'from': buyer_address,
                 'value': total_price,
                 'gas': 300000,
-                'gasPrice': self.web3.eth.gas_price,
+                **self.fees.fee_params(),
                 'nonce': self.web3.eth.get_transaction_count(buyer_address)
             })
             
             # Firmar transacción
-            signed_txn = self.web3.eth.account.sign_transaction(
-                transaction, '0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80'
-            )
+            signed_txn = get_signer(HARDHAT_PRIVATE_KEY).sign(transaction)
             
             # Enviar transacción
-            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
             
             # Esperar confirmación
             receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
@@ -120,17 +126,28 @@ class BlockchainService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @instrumented
     def get_product(self, product_id):
         """Obtener información de producto desde blockchain"""
         try:
-            product = self.contract.functions.getProduct(product_id).call()
-            return {
-                'id': product[0],
-                'name': product[1],
-                'price': product[2],
-                'stock': product[3],
-                'creator': product[4],
-                'created_at': product[5]
-            }
+            return product_data(self.contract.functions.getProduct(product_id).call())
+        except Exception as e:
+            return {'error': str(e)}
+    
+    @instrumented
+    def get_products(self, product_ids, block_identifier=None):
+        """Leer varios productos en un único lote de eth_call fijado a un bloque"""
+        try:
+            block_number, results = batch_contract_calls(
+                self.web3, self.contract, 'getProduct',
+                [(product_id,) for product_id in product_ids], block_identifier
+            )
         except Exception as e:
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+        return {
+            'block_number': block_number,
+            'products': [
+                {'id': product_id, 'error': str(r)} if isinstance(r, JsonRpcBatchError) else product_data(r)
+                for product_id, r in zip(product_ids, results)
+            ]
+        }
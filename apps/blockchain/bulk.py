@@ -0,0 +1,185 @@
+# apps/blockchain/bulk.py
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .batch_fetch import JsonRpcBatchError, batch_request, hex_to_int
+from .contract_registry import registry
+from .models import BlockchainProducto
+from .nonce_manager import is_nonce_error
+from .sales_summary import productos_actualizados
+from .signer import get_signer
+
+
+class BulkSubmitter:
+    """Envío en bloque de transacciones firmadas de una misma cuenta.
+
+    Reserva un rango de nonces, firma todo por adelantado y envía los
+    eth_sendRawTransaction en lotes JSON-RPC sin esperar recibos. Si un
+    elemento falla, su nonce se rellena con una transferencia de 0 ETH a la
+    propia cuenta para que los siguientes no se queden bloqueados en el mempool.
+    """
+
+    def __init__(self, w3, nonce_manager, private_key, fees):
+        self.w3 = w3
+        self.nonce_manager = nonce_manager
+        self.signer = get_signer(private_key)
+        self.address = self.signer.address
+        self.fees = fees
+        self.send_batch_size = settings.BLOCKCHAIN_BULK_SEND_BATCH
+        self._chain_id = None
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def _complete(self, transaction, nonce, fee_fields):
+        return {
+            **transaction,
+            **fee_fields,
+            'from': self.address,
+            'nonce': nonce,
+            'chainId': self.chain_id,
+        }
+
+    def sign_all(self, transactions):
+        """Firmar las transacciones (sin nonce ni tarifas) con nonces consecutivos"""
+        fee_fields = self.fees.fee_params()
+        start = self.nonce_manager.reserve(len(transactions))
+        nonces = list(range(start, start + len(transactions)))
+        try:
+            # Lotes grandes: la firma se reparte entre el pool de procesos del Signer
+            signed = self.signer.sign_many([
+                self._complete(transaction, nonce, fee_fields) for transaction, nonce in zip(transactions, nonces)
+            ])
+        except BaseException:
+            # No se envió nada: devolver el rango para no dejar un hueco permanente
+            self.nonce_manager.release_range(start, len(transactions))
+            raise
+        return list(zip(nonces, signed)), fee_fields
+
+    def send_all(self, signed, fee_fields):
+        """Enviar en lotes; devuelve una lista alineada de (tx_hash, error)"""
+        results = []
+        try:
+            for start in range(0, len(signed), self.send_batch_size):
+                chunk = signed[start:start + self.send_batch_size]
+                responses = batch_request(self.w3, [
+                    ('eth_sendRawTransaction', [self.w3.to_hex(s.raw_transaction)]) for _, s in chunk
+                ])
+                for (nonce, _), response in zip(chunk, responses):
+                    if isinstance(response, JsonRpcBatchError):
+                        results.append((nonce, None, str(response)))
+                    else:
+                        results.append((nonce, response, None))
+
+            failed = [(nonce, error) for nonce, tx_hash, error in results if error]
+            if failed:
+                self._fill_gaps(failed, fee_fields)
+        except BaseException:
+            # Error de transporte a mitad de envío: el lote en curso pudo llegar o no y los
+            # siguientes no se enviaron. El nonce 'pending' del nodo dirá dónde quedó el hueco.
+            self.nonce_manager.invalidate()
+            raise
+        return [(tx_hash, error) for _, tx_hash, error in results]
+
+    def _fill_gaps(self, failed, fee_fields):
+        # Con un error de nonce la secuencia ya no es nuestra: sólo queda resincronizar
+        if any(is_nonce_error(error) for _, error in failed):
+            self.nonce_manager.resync()
+            return
+        fillers = [
+            ('eth_sendRawTransaction', [self.w3.to_hex(self.signer.sign(self._complete(
+                {'to': self.address, 'value': 0, 'gas': 21000}, nonce, fee_fields
+            )).raw_transaction)])
+            for nonce, _ in failed
+        ]
+        responses = batch_request(self.w3, fillers)
+        if any(isinstance(r, JsonRpcBatchError) for r in responses):
+            print(f"⚠️  No se pudieron rellenar {len(failed)} nonces fallidos; resincronizando")
+            self.nonce_manager.resync()
+
+    def reconcile(self, tx_hashes, timeout=None, interval=None):
+        """Recibos de todas las transacciones, en lotes, hasta que lleguen o venza el plazo"""
+        timeout = settings.BLOCKCHAIN_BULK_RECEIPT_TIMEOUT if timeout is None else timeout
+        interval = interval or settings.BLOCKCHAIN_HEAD_POLL_INTERVAL
+        deadline = time.monotonic() + timeout
+        pending = [h for h in tx_hashes if h]
+        receipts = {}
+        while pending:
+            for start in range(0, len(pending), self.send_batch_size):
+                chunk = pending[start:start + self.send_batch_size]
+                responses = batch_request(self.w3, [('eth_getTransactionReceipt', [h]) for h in chunk])
+                for tx_hash, receipt in zip(chunk, responses):
+                    if receipt and not isinstance(receipt, JsonRpcBatchError):
+                        receipts[tx_hash] = receipt
+            pending = [h for h in pending if h not in receipts]
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+        return receipts
+
+    def submit(self, transactions, wait=True, timeout=None):
+        """Firmar, enviar y (opcionalmente) reconciliar; devuelve un resultado por transacción"""
+        signed, fee_fields = self.sign_all(transactions)
+        sent = self.send_all(signed, fee_fields)
+        receipts = self.reconcile([h for h, _ in sent], timeout=timeout) if wait else {}
+
+        results = []
+        for (nonce, _), (tx_hash, error) in zip(signed, sent):
+            result = {'nonce': nonce, 'tx_hash': tx_hash, 'block_number': None, 'gas_used': None}
+            receipt = receipts.get(tx_hash)
+            if error:
+                result.update(estado='error', error=error)
+            elif receipt:
+                result.update(
+                    estado='confirmada' if hex_to_int(receipt.get('status', '0x1')) == 1 else 'fallida',
+                    block_number=hex_to_int(receipt['blockNumber']),
+                    gas_used=hex_to_int(receipt['gasUsed']),
+                )
+            else:
+                result['estado'] = 'pendiente'
+            results.append(result)
+        return results
+
+
+def register_products_bulk(service, productos, wait=True, timeout=None):
+    """Registrar BlockchainProducto ya guardados con BlockchainService.createProduct en bloque.
+
+    Guarda blockchain_tx_hash de cada producto enviado y devuelve un resultado
+    por producto (mismo orden que `productos`).
+    """
+    anteriores = [producto.blockchain_tx_hash for producto in productos]
+    # Sin contrato, o sin dirección (cada envío sería una creación de contrato que gasta
+    # nonce y gas): modo simulación, igual que create_product_on_blockchain
+    if service.contract is None or not service.contract.address:
+        now = int(time.time())
+        results = []
+        for i, producto in enumerate(productos):
+            producto.blockchain_tx_hash = f"0xSIM{now}_{i}"
+            results.append({'tx_hash': producto.blockchain_tx_hash, 'estado': 'simulada'})
+    else:
+        spec = registry.for_abi(service.contract.abi) or registry.get('SimpleStore')
+        transactions = [{
+            'to': service.contract.address,
+            'value': 0,
+            'gas': 200000,
+            'data': spec.encode_call(
+                'createProduct',
+                [producto.nombre, service.w3.to_wei(producto.precio, 'ether')]
+            ),
+        } for producto in productos]
+        submitter = BulkSubmitter(service.w3, service.nonce_manager, service.private_key, service.fees)
+        results = submitter.submit(transactions, wait=wait, timeout=timeout)
+        for producto, result in zip(productos, results):
+            producto.blockchain_tx_hash = result['tx_hash']
+
+    with transaction.atomic():
+        BlockchainProducto.objects.bulk_update(productos, ['blockchain_tx_hash'], batch_size=500)
+        productos_actualizados(anteriores, productos)
+    for producto, result in zip(productos, results):
+        result.update(id=producto.id, nombre=producto.nombre)
+    return results
@@ -0,0 +1,199 @@
+# apps/blockchain/chain_cache.py
+import json
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Memoria de cada entrada además de su JSON: tupla de clave, sus cadenas y el nodo del OrderedDict
+ENTRY_OVERHEAD = 400
+
+
+class ChainCache:
+    """LRU en memoria de datos de cadena que ya no pueden cambiar.
+
+    Sólo admite bloques y recibos a `confirmations` o más bloques de la cabeza
+    (por debajo de la profundidad de finalidad un reorg ya no los alcanza). Las
+    entradas se guardan como JSON compacto y se decodifican en cada acierto:
+    así el presupuesto de memoria mide lo que de verdad ocupan (un dict
+    decodificado ocupa varias veces su JSON) y nadie puede modificar la copia
+    compartida. Con `path` las entradas admitidas se guardan también en SQLite,
+    con su propio presupuesto `max_disk_bytes` (se borran las más antiguas), y
+    un fallo en memoria se busca allí antes de ir al nodo.
+
+    Las claves llevan un espacio de nombres por cadena (el hash del bloque
+    génesis), así un Ganache reiniciado no reutiliza datos de la cadena anterior.
+    """
+
+    def __init__(self, max_bytes, confirmations, path=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes
+        self.confirmations = confirmations
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._stats = {
+            'hits': 0, 'disk_hits': 0, 'misses': 0, 'admitted': 0, 'not_final': 0,
+            'evictions': 0, 'disk_evictions': 0,
+        }
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db_lock, self._db:
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS chain_entries ('
+                    'seq INTEGER PRIMARY KEY, namespace TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL, '
+                    'value TEXT NOT NULL, UNIQUE (namespace, kind, key))'
+                )
+                self._disk_bytes = self._db.execute(
+                    'SELECT COALESCE(SUM(LENGTH(value)), 0) FROM chain_entries'
+                ).fetchone()[0]
+
+    def is_final(self, block_number, head):
+        return block_number is not None and head is not None and block_number <= head - self.confirmations
+
+    def _remember(self, cache_key, raw):
+        # Llamar con self._lock tomado
+        size = sys.getsizeof(raw) + ENTRY_OVERHEAD
+        previous = self._entries.pop(cache_key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[cache_key] = (raw, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats['evictions'] += 1
+
+    def get_many(self, namespace, kind, keys):
+        """{clave: valor} de las claves presentes en memoria o en SQLite"""
+        raws = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get((namespace, kind, key))
+                if entry is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end((namespace, kind, key))
+                raws[key] = entry[0]
+            self._stats['hits'] += len(raws)
+
+        if missing and self._db is not None:
+            rows = []
+            with self._db_lock:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows.extend(self._db.execute(
+                        f"SELECT key, value FROM chain_entries WHERE namespace = ? AND kind = ? "
+                        f"AND key IN ({', '.join('?' * len(chunk))})",
+                        [namespace, kind, *chunk],
+                    ).fetchall())
+            with self._lock:
+                for key, raw in rows:
+                    raws[key] = raw
+                    self._remember((namespace, kind, key), raw)
+                self._stats['disk_hits'] += len(rows)
+
+        with self._lock:
+            self._stats['misses'] += len(keys) - len(raws)
+        return {key: json.loads(raw) for key, raw in raws.items()}
+
+    def _evict_disk(self):
+        # Llamar con self._db_lock tomado y dentro de la transacción. Se libera hasta el 90 %
+        # del presupuesto para no borrar en cada inserción
+        excess = self._disk_bytes - int(self.max_disk_bytes * 0.9)
+        freed = 0
+        cutoff = None
+        evicted = 0
+        for seq, size in self._db.execute('SELECT seq, LENGTH(value) FROM chain_entries ORDER BY seq'):
+            freed += size
+            cutoff = seq
+            evicted += 1
+            if freed >= excess:
+                break
+        if cutoff is not None:
+            self._db.execute('DELETE FROM chain_entries WHERE seq <= ?', [cutoff])
+            self._disk_bytes -= freed
+            with self._lock:
+                self._stats['disk_evictions'] += evicted
+
+    def put_many(self, namespace, kind, items, head):
+        """Admitir [(clave, valor, número de bloque)] que estén por debajo de la finalidad"""
+        admitted = []
+        not_final = 0
+        for key, value, block_number in items:
+            if not self.is_final(block_number, head):
+                not_final += 1
+                continue
+            admitted.append((key, json.dumps(value, separators=(',', ':'))))
+
+        with self._lock:
+            for key, raw in admitted:
+                self._remember((namespace, kind, key), raw)
+            self._stats['admitted'] += len(admitted)
+            self._stats['not_final'] += not_final
+
+        if admitted and self._db is not None:
+            with self._db_lock, self._db:
+                for key, raw in admitted:
+                    inserted = self._db.execute(
+                        'INSERT OR IGNORE INTO chain_entries (namespace, kind, key, value) VALUES (?, ?, ?, ?)',
+                        [namespace, kind, key, raw],
+                    ).rowcount
+                    if inserted:
+                        self._disk_bytes += len(raw)
+                if self.max_disk_bytes and self._disk_bytes > self.max_disk_bytes:
+                    self._evict_disk()
+        return len(admitted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        stats['max_bytes'] = self.max_bytes
+        stats['confirmations'] = self.confirmations
+        stats['persistent'] = self._db is not None
+        if self._db is not None:
+            stats['disk_bytes'] = self._disk_bytes
+            stats['max_disk_bytes'] = self.max_disk_bytes
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chain_cache():
+    """ChainCache del proceso, o None si BLOCKCHAIN_CHAIN_CACHE_MB es 0"""
+    global _cache
+    if settings.BLOCKCHAIN_CHAIN_CACHE_MB <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ChainCache(
+                    int(settings.BLOCKCHAIN_CHAIN_CACHE_MB * 1024 * 1024),
+                    settings.BLOCKCHAIN_CHAIN_CACHE_CONFIRMATIONS,
+                    settings.BLOCKCHAIN_CHAIN_CACHE_PATH or None,
+                    int(settings.BLOCKCHAIN_CHAIN_CACHE_DISK_MB * 1024 * 1024) or None,
+                )
+    return _cache
+
+
+def chain_cache_stats():
+    cache = get_chain_cache()
+    return cache.stats() if cache is not None else {'enabled': False}
@@ -0,0 +1,122 @@
+# apps/blockchain/confirmer.py
+import re
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .batch_fetch import JsonRpcBatchError, batch_request, hex_to_int
+from .head_watcher import get_head_watcher
+from .metrics import instrumented, observe_confirmation
+from .models import BlockchainOrden
+
+TX_HASH_RE = re.compile(r'^0x[0-9a-fA-F]{64}$')
+
+
+def normalize_tx_hash(tx_hash):
+    if tx_hash and not tx_hash.startswith('0x'):
+        tx_hash = '0x' + tx_hash
+    return tx_hash
+
+
+class ReceiptConfirmer:
+    """Pasa las órdenes pendientes a confirmada/fallida con un barrido de recibos por bloque.
+
+    Todos los recibos pendientes se piden en lotes JSON-RPC, así que una
+    avalancha de órdenes cuesta un barrido por bloque y no un sondeo por orden.
+    """
+
+    def __init__(self, w3, batch_size=None):
+        self.w3 = w3
+        self.batch_size = batch_size or getattr(settings, 'BLOCKCHAIN_CONFIRMER_BATCH_SIZE', 200)
+        self._sweep_lock = threading.Lock()
+
+    @instrumented(name='confirmer')
+    def sweep(self, block_number=None):
+        """Revisar todas las órdenes pendientes; devuelve el recuento por estado"""
+        # Si el bloque anterior aún se está procesando, este barrido lo cubrirá el siguiente
+        if not self._sweep_lock.acquire(blocking=False):
+            return None
+        try:
+            close_old_connections()
+            counts = {'confirmada': 0, 'fallida': 0, 'pendiente': 0}
+            last_id = 0
+            while True:
+                pending = list(
+                    BlockchainOrden.objects
+                    .filter(estado='pendiente', blockchain_tx_hash__isnull=False, id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', 'blockchain_tx_hash', 'fecha_compra')[:self.batch_size]
+                )
+                if not pending:
+                    break
+                last_id = pending[-1][0]
+                for estado, n in self._process(pending).items():
+                    counts[estado] += n
+            if counts['confirmada'] or counts['fallida']:
+                print(f"✅ Bloque {block_number}: {counts['confirmada']} órdenes confirmadas, "
+                      f"{counts['fallida']} fallidas, {counts['pendiente']} pendientes")
+            return counts
+        finally:
+            close_old_connections()
+            self._sweep_lock.release()
+
+    def _process(self, pending):
+        counts = {'confirmada': 0, 'fallida': 0, 'pendiente': 0}
+        now = timezone.now()
+        updated = []
+
+        valid = []
+        for orden_id, tx_hash, fecha_compra in pending:
+            tx_hash = normalize_tx_hash(tx_hash)
+            if TX_HASH_RE.match(tx_hash or ''):
+                valid.append((orden_id, tx_hash, fecha_compra))
+            else:
+                # Hashes simulados (modo fallback): nunca habrá recibo
+                updated.append(BlockchainOrden(id=orden_id, estado='fallida', fecha_confirmacion=now))
+                counts['fallida'] += 1
+
+        results = batch_request(self.w3, [('eth_getTransactionReceipt', [h]) for _, h, _ in valid])
+        for (orden_id, tx_hash, fecha_compra), receipt in zip(valid, results):
+            if isinstance(receipt, JsonRpcBatchError):
+                print(f"⚠️  Error obteniendo recibo {tx_hash}: {receipt}")
+                counts['pendiente'] += 1
+                continue
+            if not receipt:
+                counts['pendiente'] += 1
+                continue
+            estado = 'confirmada' if hex_to_int(receipt.get('status', '0x1')) == 1 else 'fallida'
+            updated.append(BlockchainOrden(
+                id=orden_id,
+                estado=estado,
+                block_number=hex_to_int(receipt['blockNumber']),
+                gas_used=hex_to_int(receipt['gasUsed']),
+                fecha_confirmacion=now,
+            ))
+            counts[estado] += 1
+            # Latencia extremo a extremo: de la compra a ver el recibo en un bloque
+            observe_confirmation((now - fecha_compra).total_seconds(), estado)
+
+        if updated:
+            BlockchainOrden.objects.bulk_update(
+                updated, ['estado', 'block_number', 'gas_used', 'fecha_confirmacion']
+            )
+        return counts
+
+
+_confirmers = {}
+_confirmer_lock = threading.Lock()
+
+
+def start_confirmer(w3):
+    """Suscribir un confirmador por endpoint al HeadWatcher de ese endpoint y arrancarlo"""
+    key = str(getattr(w3.provider, 'endpoint_uri', None) or repr(w3.provider))
+    with _confirmer_lock:
+        confirmer = _confirmers.get(key)
+        if confirmer is None:
+            confirmer = _confirmers[key] = ReceiptConfirmer(w3)
+            watcher = get_head_watcher(w3)
+            watcher.subscribe(confirmer.sweep)
+            watcher.start()
+        return confirmer
@@ -0,0 +1,244 @@
+# apps/blockchain/contract_registry.py
+import json
+import threading
+import weakref
+from pathlib import Path
+
+from django.conf import settings
+from eth_abi import decode, encode
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+
+from .deployments import contract_hash
+
+
+def _uint(name, indexed=None):
+    item = {'internalType': 'uint256', 'name': name, 'type': 'uint256'}
+    if indexed is not None:
+        item['indexed'] = indexed
+    return item
+
+
+def _param(type_, name, indexed=None):
+    item = {'internalType': type_, 'name': name, 'type': type_}
+    if indexed is not None:
+        item['indexed'] = indexed
+    return item
+
+
+# ABI de contracts/ECommerce.sol, para cuando no hay artefacto compilado
+ECOMMERCE_ABI = [
+    {'inputs': [], 'stateMutability': 'nonpayable', 'type': 'constructor'},
+    {'anonymous': False, 'name': 'ProductRegistered', 'type': 'event', 'inputs': [
+        _uint('productId', True), _param('string', 'name', False), _uint('price', False),
+        _uint('stock', False), _param('address', 'creator', False)]},
+    {'anonymous': False, 'name': 'ProductPurchased', 'type': 'event', 'inputs': [
+        _uint('purchaseId', True), _uint('productId', True), _param('address', 'buyer', False),
+        _uint('quantity', False), _uint('totalPrice', False), _param('string', 'productData', False)]},
+    {'anonymous': False, 'name': 'StockUpdated', 'type': 'event', 'inputs': [
+        _uint('productId', True), _uint('newStock', False)]},
+    {'name': 'registerProduct', 'type': 'function', 'stateMutability': 'nonpayable',
+     'inputs': [_param('string', '_name'), _uint('_price'), _uint('_stock')], 'outputs': [_uint('')]},
+    {'name': 'purchaseProduct', 'type': 'function', 'stateMutability': 'payable',
+     'inputs': [_uint('_productId'), _uint('_quantity'), _param('string', '_productData')], 'outputs': [_uint('')]},
+    {'name': 'updateStock', 'type': 'function', 'stateMutability': 'nonpayable',
+     'inputs': [_uint('_productId'), _uint('_newStock')], 'outputs': []},
+    {'name': 'getProduct', 'type': 'function', 'stateMutability': 'view', 'inputs': [_uint('_productId')],
+     'outputs': [_uint('id'), _param('string', 'name'), _uint('price'), _uint('stock'),
+                 _param('address', 'creator'), _uint('createdAt')]},
+    {'name': 'getPurchase', 'type': 'function', 'stateMutability': 'view', 'inputs': [_uint('_purchaseId')],
+     'outputs': [_uint('purchaseId'), _uint('productId'), _param('address', 'buyer'), _uint('quantity'),
+                 _uint('totalPrice'), _uint('purchasedAt'), _param('string', 'productData')]},
+    {'name': 'getUserPurchases', 'type': 'function', 'stateMutability': 'view',
+     'inputs': [_param('address', '_user')], 'outputs': [_param('uint256[]', '')]},
+    {'name': 'withdraw', 'type': 'function', 'stateMutability': 'nonpayable', 'inputs': [], 'outputs': []},
+    {'name': 'getContractBalance', 'type': 'function', 'stateMutability': 'view', 'inputs': [],
+     'outputs': [_uint('')]},
+    {'name': 'productCount', 'type': 'function', 'stateMutability': 'view', 'inputs': [], 'outputs': [_uint('')]},
+    {'name': 'purchaseCount', 'type': 'function', 'stateMutability': 'view', 'inputs': [], 'outputs': [_uint('')]},
+]
+
+# Artefactos de Truffle y Hardhat, en orden de preferencia
+ECOMMERCE_ARTIFACTS = [
+    'build/contracts/ECommerce.json',
+    'blockchain/artifacts/contracts/ECommerce.sol/ECommerce.json',
+    'apps/blockchain/artifacts/contracts/ECommerce.sol/ECommerce.json',
+]
+
+
+def _topic_type(abi_type):
+    # Los parámetros indexados dinámicos se guardan como keccak en el topic: no se pueden decodificar
+    if abi_type in ('string', 'bytes') or abi_type.endswith(']') or abi_type.startswith('('):
+        return 'bytes32'
+    return abi_type
+
+
+class ContractValidationError(ValueError):
+    """Artefacto o ABI que no se puede usar"""
+
+
+class ContractSpec:
+    """ABI validado de un contrato con todo lo derivable precalculado.
+
+    Selectores, tipos de entrada/salida y topics de eventos se calculan una
+    vez al registrar el contrato; codificar llamadas y decodificar logs no
+    vuelve a recorrer el ABI ni a hashear firmas.
+    """
+
+    def __init__(self, name, abi, bytecode=None, source=None):
+        self.name = name
+        self.abi = abi
+        self.bytecode = bytecode
+        self.source = source
+        self.code_hash = contract_hash(abi, bytecode or '')
+        self.functions = {}
+        self.selectors = {}
+        self.input_types = {}
+        self.output_types = {}
+        self.events = {}
+        self.event_topics = {}
+        self.topics = {}
+        self._event_decoders = {}
+        self._factories = weakref.WeakKeyDictionary()
+        self._factories_lock = threading.Lock()
+
+        for item in abi:
+            if item.get('type') == 'function':
+                fn_name = item['name']
+                # Con sobrecargas nos quedamos con la primera, como web3 al llamar por nombre
+                if fn_name in self.functions:
+                    continue
+                self.functions[fn_name] = item
+                self.selectors[fn_name] = '0x' + function_abi_to_4byte_selector(item).hex()
+                self.input_types[fn_name] = [collapse_if_tuple(i) for i in item.get('inputs', [])]
+                self.output_types[fn_name] = [collapse_if_tuple(o) for o in item.get('outputs', [])]
+            elif item.get('type') == 'event' and not item.get('anonymous'):
+                topic = '0x' + event_abi_to_log_topic(item).hex()
+                self.events[item['name']] = item
+                self.event_topics[item['name']] = topic
+                self.topics[topic] = item['name']
+                inputs = item.get('inputs', [])
+                self._event_decoders[topic] = (
+                    item['name'],
+                    [_topic_type(collapse_if_tuple(i)) for i in inputs if i.get('indexed')],
+                    [collapse_if_tuple(i) for i in inputs if not i.get('indexed')],
+                    [i.get('indexed', False) for i in inputs],
+                )
+
+    def encode_call(self, fn_name, args):
+        """calldata de fn_name(*args) sin pasar por el objeto Contract de web3"""
+        return self.selectors[fn_name] + encode(self.input_types[fn_name], list(args)).hex()
+
+    def decode_output(self, fn_name, data):
+        if isinstance(data, str):
+            data = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+        return decode(self.output_types[fn_name], data)
+
+    def decode_log(self, log):
+        """(evento, valores en el orden del ABI) o None si el log no es de este contrato"""
+        topics = log.get('topics') or []
+        if not topics:
+            return None
+        topic0 = topics[0] if isinstance(topics[0], str) else Web3.to_hex(topics[0])
+        decoder = self._event_decoders.get(topic0.lower())
+        if decoder is None:
+            return None
+        name, indexed_types, data_types, order = decoder
+
+        indexed = iter(decode(
+            indexed_types,
+            b''.join(Web3.to_bytes(hexstr=t) if isinstance(t, str) else bytes(t) for t in topics[1:]),
+        ))
+        data = log['data']
+        values = iter(decode(data_types, Web3.to_bytes(hexstr=data) if isinstance(data, str) else bytes(data)))
+        return name, [next(indexed) if is_indexed else next(values) for is_indexed in order]
+
+    def contract(self, w3, address=None):
+        """Objeto Contract de web3; la fábrica se construye una vez por instancia de Web3"""
+        with self._factories_lock:
+            factory = self._factories.get(w3)
+            if factory is None:
+                factory = self._factories[w3] = w3.eth.contract(abi=self.abi, bytecode=self.bytecode)
+        # Sin dirección (CONTRACT_ADDRESS vacío): la fábrica, como w3.eth.contract(address='')
+        if not address:
+            return factory
+        return factory(address=address)
+
+
+def validate_abi(name, abi, required_functions=(), required_events=()):
+    if not isinstance(abi, list) or not all(isinstance(item, dict) and 'type' in item for item in abi):
+        raise ContractValidationError(f"{name}: el ABI debe ser una lista de entradas con 'type'")
+    for item in abi:
+        if item['type'] in ('function', 'event') and 'name' not in item:
+            raise ContractValidationError(f"{name}: entrada {item['type']} sin nombre")
+    names = {(item['type'], item.get('name')) for item in abi}
+    missing = [f for f in required_functions if ('function', f) not in names]
+    missing += [e for e in required_events if ('event', e) not in names]
+    if missing:
+        raise ContractValidationError(f"{name}: al ABI le faltan {', '.join(missing)}")
+
+
+class ContractRegistry:
+    """Contratos conocidos por el proceso: cada artefacto se lee y valida una sola vez"""
+
+    def __init__(self):
+        self._specs = {}
+        self._by_abi = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, abi, bytecode=None, source=None, required_functions=(), required_events=()):
+        validate_abi(name, abi, required_functions, required_events)
+        spec = ContractSpec(name, abi, bytecode, source)
+        with self._lock:
+            self._specs[name] = spec
+            self._by_abi[id(abi)] = spec
+        return spec
+
+    def load_artifact(self, name, paths, fallback_abi=None, required_functions=(), required_events=()):
+        """Registrar desde el primer artefacto (Truffle/Hardhat) que exista, o con el ABI de respaldo"""
+        with self._lock:
+            if name in self._specs:
+                return self._specs[name]
+        for path in paths:
+            path = Path(path)
+            if not path.is_absolute():
+                path = Path(settings.BASE_DIR) / path
+            if not path.exists():
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except ValueError as e:
+                raise ContractValidationError(f"{name}: {path} no es JSON válido: {e}")
+            if 'abi' not in data:
+                raise ContractValidationError(f"{name}: {path} no contiene 'abi'")
+            return self.register(name, data['abi'], data.get('bytecode'), str(path),
+                                 required_functions, required_events)
+        if fallback_abi is None:
+            raise ContractValidationError(f"{name}: no se encontró ningún artefacto en {paths}")
+        return self.register(name, fallback_abi, None, 'fallback', required_functions, required_events)
+
+    def get(self, name):
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Contrato no registrado: {name}")
+        return spec
+
+    def for_abi(self, abi):
+        """Spec registrado con este mismo objeto ABI (p. ej. el de un Contract creado por spec.contract)"""
+        spec = self._by_abi.get(id(abi))
+        return spec if spec is not None and spec.abi is abi else None
+
+
+registry = ContractRegistry()
+
+
+def get_ecommerce():
+    """Spec de ECommerce: artefacto compilado si existe, si no el ABI de contracts/ECommerce.sol"""
+    return registry.load_artifact(
+        'ECommerce',
+        ECOMMERCE_ARTIFACTS,
+        fallback_abi=ECOMMERCE_ABI,
+        required_functions=('registerProduct', 'purchaseProduct', 'getProduct', 'getPurchase'),
+        required_events=('ProductRegistered', 'ProductPurchased', 'StockUpdated'),
+    )
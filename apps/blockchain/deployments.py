@@ -0,0 +1,119 @@
+# apps/blockchain/deployments.py
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+from .batch_fetch import JsonRpcBatchError, batch_request, hex_to_int
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+class DeploymentError(Exception):
+    """El despliegue no dejó un contrato en la cadena (transacción revertida o sin dirección)"""
+
+
+def contract_hash(abi, bytecode):
+    """Huella del contrato: cambia si cambian el bytecode o el ABI"""
+    digest = hashlib.sha256()
+    digest.update(bytecode.lower().encode())
+    digest.update(json.dumps(abi, sort_keys=True, separators=(',', ':')).encode())
+    return digest.hexdigest()
+
+
+class DeploymentStore:
+    """Registro local de contratos desplegados, compartido entre workers.
+
+    Las claves son 'red:chain_id:hash'; el fichero se reescribe de forma
+    atómica y se bloquea con flock mientras un proceso despliega.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.BLOCKCHAIN_DEPLOYMENTS_FILE)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.deployments-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Bloqueo exclusivo entre procesos mientras se consulta/despliega"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def candidates(self, network, code_hash):
+        """Registros de esta red y contrato (para cualquier chain_id)"""
+        return [
+            record for record in self._read().values()
+            if record['network'] == network and record['contract_hash'] == code_hash
+        ]
+
+    def save(self, network, chain_id, code_hash, address, tx_hash):
+        data = self._read()
+        data[f"{network}:{chain_id}:{code_hash}"] = {
+            'network': network,
+            'chain_id': chain_id,
+            'contract_hash': code_hash,
+            'address': address,
+            'tx_hash': tx_hash,
+            'deployed_at': int(time.time()),
+        }
+        self._write(data)
+
+
+def get_or_deploy_contract(w3, network, abi, bytecode, deploy_fn, store=None, code_hash=None):
+    """Reutilizar el contrato registrado si sigue en la cadena o desplegarlo.
+
+    Comprueba eth_chainId y eth_getCode de los candidatos en un único lote
+    JSON-RPC. `deploy_fn()` debe devolver (dirección, tx_hash) o lanzar
+    DeploymentError si la transacción revirtió; un despliegue fallido no se registra.
+    Devuelve (dirección, reutilizado).
+    """
+    store = store or DeploymentStore()
+    code_hash = code_hash or contract_hash(abi, bytecode)
+
+    with store.lock():
+        # Registros sin dirección (despliegues fallidos de versiones anteriores) no se consultan
+        records = [r for r in store.candidates(network, code_hash) if r.get('address')]
+        calls = [('eth_chainId', [])] + [('eth_getCode', [r['address'], 'latest']) for r in records]
+        results = batch_request(w3, calls)
+        if isinstance(results[0], JsonRpcBatchError):
+            raise results[0]
+        chain_id = hex_to_int(results[0])
+
+        for record, code in zip(records, results[1:]):
+            if record['chain_id'] != chain_id or isinstance(code, JsonRpcBatchError):
+                continue
+            # Un nodo reiniciado (p. ej. Ganache sin --db) devuelve '0x' en la dirección antigua
+            if code and code not in ('0x', '0x0'):
+                return w3.to_checksum_address(record['address']), True
+
+        address, tx_hash = deploy_fn()
+        if not address:
+            raise DeploymentError(f"El despliegue {tx_hash} no devolvió dirección de contrato")
+        store.save(network, chain_id, code_hash, address, tx_hash)
+        return address, False
@@ -0,0 +1,232 @@
+# apps/blockchain/event_indexer.py
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from web3 import Web3
+
+from .batch_fetch import JsonRpcBatchError, batch_request, hex_to_int
+from .contract_registry import get_ecommerce
+from .metrics import instrumented
+from .models import BlockchainProducto, CheckpointIndexador, CompraOnChain, ProductoOnChain
+
+CHECKPOINT_EVENTOS = 'eventos_ecommerce'
+
+
+def decode_log(log):
+    """Decodificar un log del contrato ECommerce; devuelve (evento, valores) o None"""
+    return get_ecommerce().decode_log(log)
+
+
+def decode_receipt_events(receipt, event_name):
+    """Valores de los eventos `event_name` contenidos en un recibo"""
+    events = []
+    for log in receipt.get('logs', []):
+        decoded = decode_log(log)
+        if decoded and decoded[0] == event_name:
+            events.append(decoded[1])
+    return events
+
+
+def _normalize_hash(tx_hash):
+    tx_hash = tx_hash if isinstance(tx_hash, str) else Web3.to_hex(tx_hash)
+    return tx_hash.lower()
+
+
+class EventIndexer:
+    """Ingesta de los eventos de ECommerce con eth_getLogs en rangos adaptativos.
+
+    El rango crece mientras el nodo responde y se parte a la mitad cuando lo
+    rechaza (límite de resultados o de bloques del proveedor). Sólo se indexa
+    hasta `head - confirmations`, así que un reorg nunca alcanza lo guardado.
+    """
+
+    def __init__(self, w3, address, start_block=None, chunk=None, max_chunk=None, confirmations=None):
+        self.w3 = w3
+        self.address = Web3.to_checksum_address(address)
+        self.start_block = start_block if start_block is not None else settings.BLOCKCHAIN_EVENTS_START_BLOCK
+        self.max_chunk = max_chunk or settings.BLOCKCHAIN_LOGS_MAX_CHUNK
+        self.chunk = min(chunk or settings.BLOCKCHAIN_LOGS_CHUNK, self.max_chunk)
+        self.confirmations = confirmations if confirmations is not None else settings.BLOCKCHAIN_INDEX_CONFIRMATIONS
+
+    @instrumented(name='indexar_eventos')
+    def run(self):
+        """Ingerir hasta `head - confirmations`; devuelve el número de eventos aplicados"""
+        head = hex_to_int(batch_request(self.w3, [('eth_blockNumber', [])])[0])
+        safe_head = head - self.confirmations
+        total = 0
+        while True:
+            checkpoint = CheckpointIndexador.objects.filter(nombre=CHECKPOINT_EVENTOS).first()
+            first = checkpoint.block_number + 1 if checkpoint else self.start_block
+            if first > safe_head:
+                return total
+            total += self.run_range(first, min(safe_head, first + self.chunk - 1))
+
+    def run_range(self, first, last):
+        """Ingerir [first, last], partiendo el rango si el nodo lo rechaza"""
+        log_filter = {
+            'address': self.address,
+            'fromBlock': hex(first),
+            'toBlock': hex(last),
+            'topics': [list(get_ecommerce().topics)],
+        }
+        logs, last_block = batch_request(self.w3, [
+            ('eth_getLogs', [log_filter]),
+            ('eth_getBlockByNumber', [hex(last), False]),
+        ])
+        if isinstance(logs, JsonRpcBatchError):
+            if last == first:
+                raise logs
+            self.chunk = max(1, (last - first + 1) // 2)
+            return self.run_range(first, first + self.chunk - 1)
+        if isinstance(last_block, JsonRpcBatchError):
+            raise last_block
+
+        # El rango funcionó: probar uno mayor en la siguiente vuelta
+        self.chunk = min(self.max_chunk, self.chunk * 2)
+        applied = self._store(logs, last_block)
+        if applied:
+            print(f"📥 Bloques {first}-{last}: {applied} eventos de ECommerce")
+        return applied
+
+    def _timestamps(self, logs):
+        numbers = sorted({hex_to_int(log['blockNumber']) for log in logs})
+        blocks = batch_request(self.w3, [('eth_getBlockByNumber', [hex(n), False]) for n in numbers])
+        return {
+            n: hex_to_int(b['timestamp']) if isinstance(b, dict) else 0
+            for n, b in zip(numbers, blocks)
+        }
+
+    def _store(self, logs, last_block):
+        logs = sorted(logs, key=lambda l: (hex_to_int(l['blockNumber']), hex_to_int(l['logIndex'])))
+        timestamps = self._timestamps(logs) if logs else {}
+        decoded = [(log, decode_log(log)) for log in logs if not log.get('removed')]
+        decoded = [(log, event) for log, event in decoded if event]
+
+        product_ids = {values[0] if name != 'ProductPurchased' else values[1] for _, (name, values) in decoded}
+        with transaction.atomic():
+            productos = {p.product_id: p for p in ProductoOnChain.objects.filter(product_id__in=product_ids)}
+            nuevos = {}
+            compras = []
+            registrados = {}
+
+            for log, (name, values) in decoded:
+                block_number = hex_to_int(log['blockNumber'])
+                tx_hash = _normalize_hash(log['transactionHash'])
+                if name == 'ProductRegistered':
+                    product_id, nombre, precio, stock, creador = values
+                    producto = productos.get(product_id)
+                    if producto is None:
+                        producto = ProductoOnChain(product_id=product_id)
+                        productos[product_id] = nuevos[product_id] = producto
+                    producto.nombre = nombre
+                    producto.precio_wei = Decimal(precio)
+                    producto.stock = Decimal(stock)
+                    producto.creador = Web3.to_checksum_address(creador)
+                    producto.tx_hash = tx_hash
+                    producto.block_number = block_number
+                    producto.timestamp = timestamps[block_number]
+                    producto.actualizado_en_bloque = block_number
+                    registrados[tx_hash] = product_id
+                elif name == 'StockUpdated':
+                    product_id, stock = values
+                    producto = productos.get(product_id)
+                    if producto is not None:
+                        producto.stock = Decimal(stock)
+                        producto.actualizado_en_bloque = block_number
+                else:
+                    purchase_id, product_id, comprador, cantidad, total, product_data = values
+                    compras.append(CompraOnChain(
+                        purchase_id=purchase_id,
+                        product_id=product_id,
+                        comprador=Web3.to_checksum_address(comprador),
+                        cantidad=Decimal(cantidad),
+                        total_wei=Decimal(total),
+                        product_data=product_data,
+                        tx_hash=tx_hash,
+                        block_number=block_number,
+                        log_index=hex_to_int(log['logIndex']),
+                        timestamp=timestamps[block_number],
+                    ))
+
+            ProductoOnChain.objects.bulk_create(nuevos.values())
+            existentes = [p for pid, p in productos.items() if pid not in nuevos]
+            if existentes:
+                ProductoOnChain.objects.bulk_update(existentes, [
+                    'nombre', 'precio_wei', 'stock', 'creador', 'tx_hash',
+                    'block_number', 'timestamp', 'actualizado_en_bloque'
+                ])
+            # purchase_id es único: volver a aplicar un rango no duplica compras
+            CompraOnChain.objects.bulk_create(compras, ignore_conflicts=True)
+            self._backfill_product_ids(registrados)
+
+            CheckpointIndexador.objects.update_or_create(
+                nombre=CHECKPOINT_EVENTOS,
+                defaults={
+                    'block_number': hex_to_int(last_block['number']),
+                    'block_hash': last_block['hash'],
+                },
+            )
+        return len(decoded)
+
+    def _backfill_product_ids(self, registrados):
+        """Completar BlockchainProducto.blockchain_product_id a partir del hash de registro"""
+        if not registrados:
+            return
+        # Los hashes se guardaron con y sin prefijo 0x según el servicio que los envió
+        candidatos = list(registrados) + [h[2:] for h in registrados]
+        pendientes = BlockchainProducto.objects.filter(
+            blockchain_tx_hash__in=candidatos, blockchain_product_id__isnull=True
+        )
+        actualizados = []
+        for producto in pendientes:
+            tx_hash = producto.blockchain_tx_hash.lower()
+            tx_hash = tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+            producto.blockchain_product_id = registrados[tx_hash]
+            actualizados.append(producto)
+        BlockchainProducto.objects.bulk_update(actualizados, ['blockchain_product_id'])
+
+
+def product_data(product):
+    """Salida de getProduct (web3 o batch_contract_calls) como diccionario.
+
+    eth_abi decodifica las direcciones en minúsculas y web3 en formato checksum:
+    se normalizan para que las dos rutas y el índice local devuelvan lo mismo.
+    """
+    return {
+        'id': product[0],
+        'name': product[1],
+        'price': product[2],
+        'stock': product[3],
+        'creator': Web3.to_checksum_address(product[4]),
+        'created_at': product[5]
+    }
+
+
+def purchase_data(purchase):
+    """Salida de getPurchase como diccionario (mismas reglas que product_data)"""
+    return {
+        'purchase_id': purchase[0],
+        'product_id': purchase[1],
+        'buyer': Web3.to_checksum_address(purchase[2]),
+        'quantity': purchase[3],
+        'total_price': purchase[4],
+        'purchased_at': purchase[5],
+        'product_data': purchase[6]
+    }
+
+
+def producto_on_chain_data(producto):
+    """Mismo formato que product_data, leído del índice local"""
+    return product_data((
+        producto.product_id, producto.nombre, int(producto.precio_wei), int(producto.stock),
+        producto.creador, producto.timestamp,
+    ))
+
+
+def compra_on_chain_data(compra):
+    """Mismo formato que purchase_data, leído del índice local"""
+    return purchase_data((
+        compra.purchase_id, compra.product_id, compra.comprador, int(compra.cantidad),
+        int(compra.total_wei), compra.timestamp, compra.product_data,
+    ))
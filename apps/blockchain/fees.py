@@ -0,0 +1,155 @@
+# apps/blockchain/fees.py
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from web3 import AsyncWeb3
+
+from .batch_fetch import JsonRpcBatchError, _endpoint, async_batch_request, batch_request, hex_to_int
+from .head_watcher import get_head_watcher
+from .metrics import instrumented
+
+# Percentil de la propina pagada en los últimos bloques para cada nivel
+FEE_TIERS = {'slow': 10, 'normal': 50, 'fast': 90}
+DEFAULT_TIER = 'normal'
+
+
+class FeeOracle:
+    """Tarifas EIP-1559 calculadas una vez por bloque a partir de eth_feeHistory.
+
+    Los constructores de transacciones leen `fee_params()` de memoria; el único
+    RPC es el muestreo que dispara el HeadWatcher en cada bloque nuevo. Si el
+    nodo no soporta EIP-1559 se cachea eth_gasPrice con el mismo ciclo.
+    """
+
+    def __init__(self, w3, blocks=None):
+        self.w3 = w3
+        self.blocks = blocks or settings.BLOCKCHAIN_FEE_HISTORY_BLOCKS
+        self.min_priority_fee = int(settings.BLOCKCHAIN_MIN_PRIORITY_FEE_GWEI * 10 ** 9)
+        self.max_age = settings.BLOCKCHAIN_FEE_MAX_AGE
+        # True cuando un HeadWatcher de la misma cadena llama a refresh en cada bloque
+        self.follows_head = False
+        self.block_number = None
+        self.updated_at = None
+        self._tiers = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def _calls(self):
+        return [
+            ('eth_feeHistory', [hex(self.blocks), 'latest', list(FEE_TIERS.values())]),
+            ('eth_gasPrice', []),
+        ]
+
+    @instrumented(name='fee_oracle')
+    def refresh(self, block_number=None):
+        """Muestrear el historial de tarifas (callback para HeadWatcher.subscribe)"""
+        self._update(batch_request(self.w3, self._calls()), block_number)
+
+    async def arefresh(self, async_w3, block_number=None):
+        self._update(await async_batch_request(async_w3, self._calls()), block_number)
+
+    def _update(self, results, block_number):
+        history, gas_price = results
+        if isinstance(history, JsonRpcBatchError) or not history or not history.get('reward'):
+            if isinstance(gas_price, JsonRpcBatchError):
+                raise gas_price
+            tiers = self.legacy_tiers(hex_to_int(gas_price))
+        else:
+            tiers = self.compute_tiers(history)
+        with self._lock:
+            self._tiers = tiers
+            self.block_number = block_number
+            self.updated_at = time.time()
+
+    def compute_tiers(self, history):
+        """maxPriorityFeePerGas = mediana por percentil; maxFeePerGas = 2 * baseFee siguiente + propina"""
+        rewards = np.array([[hex_to_int(r) for r in row] for row in history['reward']], dtype=np.float64)
+        # Los bloques vacíos reportan propina 0 y hunden los percentiles
+        used = np.array(history.get('gasUsedRatio', []), dtype=np.float64)
+        if used.shape[0] == rewards.shape[0] and (used > 0).any():
+            rewards = rewards[used > 0]
+        priority = np.median(rewards, axis=0)
+        priority = np.maximum(priority, self.min_priority_fee)
+        # baseFeePerGas trae un elemento más: la base del bloque siguiente
+        next_base_fee = hex_to_int(history['baseFeePerGas'][-1])
+
+        return {
+            tier: {
+                'maxFeePerGas': int(2 * next_base_fee + tip),
+                'maxPriorityFeePerGas': int(tip),
+            }
+            for tier, tip in zip(FEE_TIERS, priority)
+        }
+
+    def legacy_tiers(self, gas_price):
+        return {
+            'slow': {'gasPrice': int(gas_price * 0.9)},
+            'normal': {'gasPrice': gas_price},
+            'fast': {'gasPrice': int(gas_price * 1.25)},
+        }
+
+    def _stale(self):
+        return not self.follows_head and time.time() - self.updated_at > self.max_age
+
+    def _refresh_in_background(self):
+        if not self._refreshing.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  FeeOracle: no se pudo refrescar el historial de tarifas: {e}")
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name='blockchain-fee-oracle', daemon=True).start()
+
+    def fee_params(self, tier=DEFAULT_TIER):
+        """Campos de tarifa para la transacción, leídos de memoria"""
+        if self._tiers is None:
+            # Sólo en frío: la primera transacción del proceso antes del primer muestreo
+            self.refresh()
+        elif self._stale():
+            # Sin HeadWatcher de esta cadena: refrescar sin bloquear al que envía
+            self._refresh_in_background()
+        return dict(self._tiers[tier])
+
+    async def afee_params(self, async_w3, tier=DEFAULT_TIER):
+        if self._tiers is None or self._stale():
+            await self.arefresh(async_w3)
+        return dict(self._tiers[tier])
+
+    def snapshot(self):
+        with self._lock:
+            tiers = dict(self._tiers or {})
+        return {'block_number': self.block_number, 'updated_at': self.updated_at, 'tiers': tiers}
+
+
+_oracles = {}
+_oracles_lock = threading.Lock()
+
+
+def get_fee_oracle(w3):
+    """FeeOracle compartido por endpoint.
+
+    Con un Web3 síncrono se suscribe al HeadWatcher de su endpoint; mientras
+    no lo tenga, se refresca cada BLOCKCHAIN_FEE_MAX_AGE. Un AsyncWeb3 sólo
+    lee: la muestra la refresca afee_params.
+    """
+    endpoint = _endpoint(w3)
+    is_async = isinstance(w3, AsyncWeb3)
+    with _oracles_lock:
+        oracle = _oracles.get(endpoint)
+        if oracle is None:
+            oracle = _oracles[endpoint] = FeeOracle(None if is_async else w3)
+        if not is_async and oracle.w3 is None:
+            oracle.w3 = w3
+        if oracle.w3 is not None and not oracle.follows_head:
+            watcher = get_head_watcher(oracle.w3)
+            watcher.subscribe(oracle.refresh)
+            watcher.start()
+            oracle.follows_head = True
+        return oracle
@@ -0,0 +1,100 @@
+# apps/blockchain/head_watcher.py
+import threading
+
+from django.conf import settings
+
+from .metrics import instrumented
+
+
+class HeadWatcher:
+    """Hilo que sondea eth_blockNumber y avisa a los suscriptores en cada bloque nuevo.
+
+    Un único sondeo por proceso alimenta a todos los trabajos que dependen
+    del avance de la cadena (confirmación de órdenes, etc.).
+    """
+
+    def __init__(self, w3, interval=None):
+        self.w3 = w3
+        self.interval = interval or getattr(settings, 'BLOCKCHAIN_HEAD_POLL_INTERVAL', 2.0)
+        self.head = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """Registrar callback(block_number); se llama desde el hilo del watcher"""
+        with self._lock:
+            if callback not in self._callbacks:
+                self._callbacks.append(callback)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='blockchain-head-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    @instrumented(name='head_watcher')
+    def _fetch_head(self):
+        return self.w3.eth.block_number
+
+    def poll(self):
+        """Consultar la cabeza una vez y notificar si avanzó; devuelve el bloque actual"""
+        block_number = self._fetch_head()
+        if block_number != self.head:
+            self.head = block_number
+            with self._lock:
+                callbacks = list(self._callbacks)
+            for callback in callbacks:
+                try:
+                    callback(block_number)
+                except Exception as e:
+                    print(f"⚠️  Error procesando bloque {block_number} en {callback}: {e}")
+        return block_number
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️  HeadWatcher: error consultando la cabeza de la cadena: {e}")
+            self._stop.wait(self.interval)
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def _endpoint_key(w3):
+    return str(getattr(w3.provider, 'endpoint_uri', None) or repr(w3.provider))
+
+
+def get_head_watcher(w3):
+    """HeadWatcher compartido del proceso para el endpoint de `w3` (uno por endpoint).
+
+    Igual que get_nonce_manager y get_fee_oracle: un servicio apuntado a otro
+    nodo (--provider-url, blockchain_service.configure) sigue su propia cadena.
+    """
+    key = _endpoint_key(w3)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = HeadWatcher(w3)
+        return watcher
+
+
+def known_head(w3):
+    """Último bloque visto por el HeadWatcher del endpoint de `w3`, si está en marcha"""
+    watcher = _watchers.get(_endpoint_key(w3))
+    if watcher is None or watcher.head is None or not watcher.is_running:
+        return None
+    return watcher.head
@@ -0,0 +1,234 @@
+# apps/blockchain/indexer.py
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .batch_fetch import batch_request, fetch_blocks, fetch_receipts, hex_to_int
+from .head_watcher import get_head_watcher, known_head
+from .metrics import instrumented
+from .models import BloqueIndexado, CheckpointIndexador, TransaccionIndexada
+
+CHECKPOINT_BLOQUES = 'bloques'
+
+
+class BlockIndexer:
+    """Ingesta incremental de bloques y transacciones en tablas locales.
+
+    Reanuda desde CheckpointIndexador y, si detecta un reorg (el hash guardado
+    ya no es canónico), retrocede `confirmations` bloques y vuelve a ingerir.
+    """
+
+    def __init__(self, w3, confirmations=None, batch_blocks=None, start_block=None):
+        self.w3 = w3
+        self.confirmations = confirmations if confirmations is not None else settings.BLOCKCHAIN_INDEX_CONFIRMATIONS
+        self.batch_blocks = batch_blocks or settings.BLOCKCHAIN_INDEX_BATCH_BLOCKS
+        self.start_block = start_block if start_block is not None else settings.BLOCKCHAIN_INDEX_START_BLOCK
+
+    def run(self, max_rounds=None):
+        """Ingerir hasta alcanzar la cabeza; devuelve el número de bloques ingeridos"""
+        total = 0
+        rounds = 0
+        while max_rounds is None or rounds < max_rounds:
+            indexed = self.run_once()
+            rounds += 1
+            if indexed == 0:
+                break
+            total += indexed
+        return total
+
+    @instrumented(name='indexar_bloques')
+    def run_once(self, head=None):
+        """Ingerir un lote de bloques (o deshacer un reorg); devuelve los bloques ingeridos"""
+        if head is None:
+            head = hex_to_int(batch_request(self.w3, [('eth_blockNumber', [])])[0])
+
+        checkpoint = CheckpointIndexador.objects.filter(nombre=CHECKPOINT_BLOQUES).first()
+        first = checkpoint.block_number + 1 if checkpoint else self.start_block
+        last = min(head, first + self.batch_blocks - 1)
+
+        if checkpoint and checkpoint.block_number > head:
+            # La cadena es más corta que lo indexado: reorg profundo o nodo reiniciado
+            self.rollback(checkpoint)
+            return 0
+
+        # El bloque del checkpoint va en el mismo lote para comprobar que sigue siendo canónico
+        numbers = ([checkpoint.block_number] if checkpoint else []) + list(range(first, last + 1))
+        if not numbers:
+            return 0
+        # Sin caché: la comprobación de reorg necesita el bloque canónico actual
+        blocks = fetch_blocks(self.w3, numbers, cache=False)
+
+        # fetch_blocks omite los bloques que fallaron: si falta el primero (error transitorio
+        # del nodo) no hay con qué comparar, y deshacer por ello sería un falso reorg
+        if not blocks or hex_to_int(blocks[0]['number']) != numbers[0]:
+            return 0
+
+        if checkpoint:
+            if blocks[0]['hash'] != checkpoint.block_hash:
+                self.rollback(checkpoint)
+                return 0
+            parent_hash = blocks[0]['hash']
+            blocks = blocks[1:]
+        else:
+            parent_hash = None
+
+        # Cortar el lote si la cadena cambió a mitad de la descarga
+        continuous = []
+        for block in blocks:
+            if parent_hash is not None and block['parentHash'] != parent_hash:
+                break
+            continuous.append(block)
+            parent_hash = block['hash']
+        if not continuous:
+            return 0
+
+        receipts = fetch_receipts(self.w3, continuous, cache=False)
+        self._store(continuous, receipts)
+        return len(continuous)
+
+    def _store(self, blocks, receipts):
+        with transaction.atomic():
+            BloqueIndexado.objects.bulk_create([
+                BloqueIndexado(
+                    block_number=hex_to_int(b['number']),
+                    block_hash=b['hash'],
+                    parent_hash=b['parentHash'],
+                    timestamp=hex_to_int(b['timestamp']),
+                    tx_count=len(b['transactions']),
+                ) for b in blocks
+            ])
+            ids = dict(
+                BloqueIndexado.objects
+                .filter(block_number__in=[hex_to_int(b['number']) for b in blocks])
+                .values_list('block_number', 'id')
+            )
+
+            txs = []
+            for block in blocks:
+                number = hex_to_int(block['number'])
+                # El orden de la lista es el índice de la transacción en el bloque
+                for position, tx in enumerate(block['transactions']):
+                    receipt = receipts.get(tx['hash'])
+                    txs.append(TransaccionIndexada(
+                        tx_hash=tx['hash'],
+                        bloque_id=ids[number],
+                        block_number=number,
+                        tx_index=position,
+                        from_address=tx['from'],
+                        to_address=tx['to'],
+                        value_wei=Decimal(hex_to_int(tx['value'])),
+                        gas_price_wei=Decimal(hex_to_int(tx.get('gasPrice', '0x0'))),
+                        gas_used=hex_to_int(receipt['gasUsed']) if receipt else None,
+                        status=hex_to_int(receipt['status']) if receipt and 'status' in receipt else None,
+                        timestamp=hex_to_int(block['timestamp']),
+                    ))
+            TransaccionIndexada.objects.bulk_create(txs, batch_size=500)
+
+            last = blocks[-1]
+            CheckpointIndexador.objects.update_or_create(
+                nombre=CHECKPOINT_BLOQUES,
+                defaults={'block_number': hex_to_int(last['number']), 'block_hash': last['hash']},
+            )
+
+    def rollback(self, checkpoint):
+        """Deshacer los últimos `confirmations` bloques tras detectar un reorg"""
+        target = checkpoint.block_number - max(self.confirmations, 1)
+        print(f"⚠️  Reorg detectado en el bloque {checkpoint.block_number}; retrocediendo hasta {target}")
+        with transaction.atomic():
+            BloqueIndexado.objects.filter(block_number__gt=target).delete()
+            anchor = BloqueIndexado.objects.filter(block_number=target).first()
+            if anchor is None:
+                CheckpointIndexador.objects.filter(nombre=CHECKPOINT_BLOQUES).delete()
+            else:
+                CheckpointIndexador.objects.filter(nombre=CHECKPOINT_BLOQUES).update(
+                    block_number=anchor.block_number, block_hash=anchor.block_hash
+                )
+
+
+_indexer = None
+_indexer_lock = threading.Lock()
+
+
+def start_indexer(w3):
+    """Indexar en segundo plano con cada bloque nuevo del HeadWatcher"""
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None:
+            _indexer = BlockIndexer(w3)
+            run_lock = threading.Lock()
+
+            def on_new_block(block_number):
+                if not run_lock.acquire(blocking=False):
+                    return
+                try:
+                    close_old_connections()
+                    _indexer.run()
+                finally:
+                    close_old_connections()
+                    run_lock.release()
+
+            watcher = get_head_watcher(w3)
+            watcher.subscribe(on_new_block)
+            watcher.start()
+        return _indexer
+
+
+def cabeza_cadena(w3):
+    """Bloque más reciente: el del HeadWatcher si está en marcha o eth_blockNumber"""
+    head = known_head(w3)
+    if head is None:
+        head = hex_to_int(batch_request(w3, [('eth_blockNumber', [])])[0])
+    return head
+
+
+def indice_cubre(checkpoint, head, depth, confirmations=None):
+    """¿Puede el índice responder por los últimos `depth` bloques de `head`?
+
+    El checkpoint puede ir como mucho `confirmations` bloques por detrás de la
+    cabeza; más atrás el indexador está parado o no da abasto y el índice
+    serviría datos viejos.
+    """
+    if checkpoint is None:
+        return False
+    confirmations = settings.BLOCKCHAIN_INDEX_CONFIRMATIONS if confirmations is None else confirmations
+    return (checkpoint.block_number >= head - confirmations
+            and settings.BLOCKCHAIN_INDEX_START_BLOCK <= max(0, head - depth + 1))
+
+
+def rango_explicito(params):
+    """La petición fija bloque_min/bloque_max: sólo el índice puede responderla"""
+    return bool(params.get('bloque_min') or params.get('bloque_max'))
+
+
+def filtrar_transacciones(params):
+    """Queryset de TransaccionIndexada según los filtros de la petición"""
+    qs = TransaccionIndexada.objects.all()
+    if params.get('desde'):
+        qs = qs.filter(from_address__iexact=params['desde'])
+    if params.get('hacia'):
+        qs = qs.filter(to_address__iexact=params['hacia'])
+    if params.get('bloque_min'):
+        qs = qs.filter(block_number__gte=int(params['bloque_min']))
+    if params.get('bloque_max'):
+        qs = qs.filter(block_number__lte=int(params['bloque_max']))
+    if params.get('estado') == 'success':
+        qs = qs.filter(status=1)
+    elif params.get('estado') == 'failed':
+        qs = qs.exclude(status=1)
+    return qs.order_by('-block_number', '-tx_index')
+
+
+def transaccion_indexada_data(tx):
+    return {
+        'block_number': tx.block_number,
+        'hash': tx.tx_hash,
+        'from': tx.from_address,
+        'to': tx.to_address if tx.to_address else 'Contract Creation',
+        'value_eth': float(tx.value_wei / Decimal(10 ** 18)),
+        'gas_used': tx.gas_used or 0,
+        'gas_price_gwei': float(tx.gas_price_wei / Decimal(10 ** 9)),
+        'status': 'Success' if tx.status == 1 else 'Failed',
+        'timestamp': tx.timestamp
+    }
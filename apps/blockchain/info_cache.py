@@ -0,0 +1,115 @@
+# apps/blockchain/info_cache.py
+import asyncio
+import threading
+import time
+
+
+class BlockKeyedCache:
+    """Valor cacheado por bloque de cabeza con un TTL de respaldo.
+
+    Se invalida cuando el HeadWatcher anuncia un bloque nuevo (on_new_block) o
+    cuando vence el TTL, por si el watcher no está en marcha. Si varios hilos
+    lo encuentran caducado a la vez, sólo uno llama a `fetch`; el resto espera
+    su resultado.
+    """
+
+    def __init__(self, fetch, ttl):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.hits = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._value = None
+        self._block = None
+        self._fetched_at = 0.0
+        self._head = None
+        self._refreshing = None
+        self._error = None
+
+    def on_new_block(self, block_number):
+        """Callback para HeadWatcher.subscribe"""
+        self._head = block_number
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def _fresh(self):
+        if self._value is None or time.monotonic() - self._fetched_at >= self.ttl:
+            return False
+        return self._head is None or self._head == self._block
+
+    def _store(self, value, block_number):
+        self._value = value
+        self._block = block_number
+        self._fetched_at = time.monotonic()
+        if self._head is None or block_number > self._head:
+            self._head = block_number
+        self.refreshes += 1
+
+    def get(self):
+        with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._value
+            refreshing = self._refreshing
+            if refreshing is None:
+                refreshing = self._refreshing = threading.Event()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            refreshing.wait()
+            with self._lock:
+                if self._error is not None:
+                    raise self._error
+                self.hits += 1
+                return self._value
+
+        try:
+            value, block_number = self.fetch()
+            with self._lock:
+                self._error = None
+                self._store(value, block_number)
+            return value
+        except Exception as e:
+            with self._lock:
+                self._error = e
+            raise
+        finally:
+            with self._lock:
+                self._refreshing = None
+            refreshing.set()
+
+    def stats(self):
+        return {'hits': self.hits, 'refreshes': self.refreshes, 'block': self._block}
+
+
+class AsyncBlockKeyedCache(BlockKeyedCache):
+    """Variante para el event loop: `fetch` es una corrutina y los que esperan comparten su Future"""
+
+    async def aget(self):
+        if self._fresh():
+            self.hits += 1
+            return self._value
+        loop = asyncio.get_running_loop()
+        # Un Future sólo se puede esperar desde su propio loop
+        if self._refreshing is not None and self._refreshing.get_loop() is loop:
+            self.hits += 1
+            return await asyncio.shield(self._refreshing)
+
+        future = self._refreshing = loop.create_future()
+        try:
+            value, block_number = await self.fetch()
+            self._store(value, block_number)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Marcar la excepción como recuperada si nadie más esperaba
+            future.exception()
+            raise
+        finally:
+            if self._refreshing is future:
+                self._refreshing = None
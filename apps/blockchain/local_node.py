@@ -0,0 +1,103 @@
+# apps/blockchain/local_node.py
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from web3 import Web3
+
+# Cuentas de `ganache-cli -d`: la primera es la que firma en BlockchainService
+GANACHE_MNEMONIC = 'myth like bonus scare over problem client lizard pioneer submit female collect'
+GANACHE_HD_PATH = "m/44'/60'/0'/0"
+
+# eth-tester no tiene mempool: rechaza los nonces futuros en lugar de encolarlos
+FUTURE_NONCE_RE = re.compile(r'Invalid transaction nonce: Expected (\d+), but got (\d+)')
+
+
+class LocalChainNode:
+    """Nodo JSON-RPC en proceso (eth-tester + py-evm) servido por HTTP en localhost.
+
+    Sirve para benchmarks y pruebas de carga sin red: mismas cuentas que
+    Ganache en modo determinista, minado automático en cada transacción y
+    `latency` segundos de retardo opcional por petición HTTP para simular un
+    nodo remoto. py-evm no es thread-safe, así que las peticiones se
+    ejecutan de una en una. Como Ganache, una transacción con nonce futuro
+    espera (hasta `nonce_wait` segundos) a que lleguen las anteriores.
+    """
+
+    def __init__(self, port=0, accounts=10, latency=0.0, nonce_wait=5.0):
+        try:
+            from eth_tester import EthereumTester, PyEVMBackend
+            from web3 import EthereumTesterProvider
+        except ImportError as e:
+            raise ImportError("El nodo local necesita eth-tester y py-evm: pip install 'eth-tester[py-evm]'") from e
+
+        backend = PyEVMBackend.from_mnemonic(GANACHE_MNEMONIC, num_accounts=accounts, hd_path=GANACHE_HD_PATH)
+        provider = EthereumTesterProvider(EthereumTester(backend))
+        self._request = provider.request_func(Web3(provider), [])
+        self._lock = threading.Condition()
+        self.latency = latency
+        self.nonce_wait = nonce_wait
+        self.requests = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _call(self, request):
+        deadline = time.monotonic() + self.nonce_wait
+        with self._lock:
+            self.requests += 1
+            while True:
+                try:
+                    response = dict(self._request(request['method'], request.get('params', [])))
+                except Exception as e:
+                    response = {'error': {'code': -32000, 'message': str(e)}}
+                error = response.get('error')
+                match = FUTURE_NONCE_RE.search(str(error.get('message', ''))) if isinstance(error, dict) else None
+                remaining = deadline - time.monotonic()
+                if match is None or int(match.group(2)) < int(match.group(1)) or remaining <= 0:
+                    break
+                # Nonce futuro: esperar a que otra petición mine los anteriores
+                self._lock.wait(remaining)
+            self._lock.notify_all()
+        response['id'] = request.get('id')
+        response['jsonrpc'] = '2.0'
+        return json.loads(Web3.to_json(response))
+
+    def _handler_class(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if node.latency:
+                    time.sleep(node.latency)
+                result = [node._call(item) for item in body] if isinstance(body, list) else node._call(body)
+                data = json.dumps(result).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='local-chain-node', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,81 @@
+# management/commands/_entorno.py
+"""Entorno aislado para los comandos de benchmark y pruebas de carga"""
+import contextlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment
+
+from apps.blockchain.local_node import LocalChainNode
+
+
+@contextlib.contextmanager
+def base_de_datos_de_prueba(nombre):
+    """Base de datos de prueba en un fichero aparte: no se tocan los datos reales"""
+    setup_test_environment()
+    settings.DATABASES['default'].setdefault('TEST', {})
+    if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        settings.DATABASES['default']['TEST']['NAME'] = str(settings.BASE_DIR / f'{nombre}.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextlib.contextmanager
+def despliegues_de_prueba():
+    """Registro de despliegues en un directorio temporal: no se toca BLOCKCHAIN_DEPLOYMENTS_FILE"""
+    with tempfile.TemporaryDirectory(prefix='despliegues-') as directorio, \
+            override_settings(BLOCKCHAIN_DEPLOYMENTS_FILE=os.path.join(directorio, 'deployments.json')):
+        yield
+
+
+@contextlib.contextmanager
+def nodo_blockchain(provider_url=None, latencia_ms=0.0):
+    """Nodo eth-tester en proceso salvo que se indique un nodo existente; devuelve (nodo, url).
+
+    Los contratos desplegados durante la prueba se registran aparte (despliegues_de_prueba).
+    """
+    with despliegues_de_prueba():
+        if provider_url is not None:
+            yield None, provider_url
+            return
+        try:
+            node = LocalChainNode(latency=latencia_ms / 1000).start()
+        except ImportError as e:
+            raise CommandError(str(e))
+        try:
+            yield node, node.url
+        finally:
+            node.stop()
+
+
+class _SilentHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _LoadTestServer(ThreadedWSGIServer):
+    # La cola de socketserver (5) se desborda con decenas de clientes concurrentes
+    request_queue_size = 256
+
+
+@contextlib.contextmanager
+def servidor_http():
+    """Servidor WSGI multihilo de Django en un puerto libre de localhost; devuelve la URL base"""
+    server = _LoadTestServer(('127.0.0.1', 0), _SilentHandler, allow_reuse_address=False)
+    server.set_app(get_internal_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        yield f'http://{host}:{port}'
+    finally:
+        server.shutdown()
+        server.server_close()
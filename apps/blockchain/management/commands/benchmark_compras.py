@@ -0,0 +1,150 @@
+# management/commands/benchmark_compras.py
+import contextlib
+import io
+import json
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import numpy as np
+import web3
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blockchain.confirmer import ReceiptConfirmer
+from apps.blockchain.metrics import metrics
+from apps.blockchain.models import BlockchainOrden, BlockchainProducto
+from apps.blockchain.providers import pool_stats
+from apps.blockchain.service_loader import blockchain_service
+from apps.blockchain.services import BlockchainService
+
+from ._entorno import base_de_datos_de_prueba, nodo_blockchain
+
+OPERACION = 'purchase_product_on_blockchain'
+
+
+def _rpc_por_metodo():
+    """Llamadas JSON-RPC atribuidas a purchase_product_on_blockchain, por método"""
+    totales = {}
+    for name, labels, _, _, _, count, _ in metrics.snapshot():
+        labels = dict(labels)
+        if name == 'blockchain_rpc' and labels.get('operation') == OPERACION:
+            totales[labels['method']] = totales.get(labels['method'], 0) + count
+    return totales
+
+
+class Command(BaseCommand):
+    help = ('Benchmark de compras extremo a extremo: la vista comprar_producto contra un nodo '
+            'eth-tester en proceso (o --provider-url), con resultados en JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', default='1,4,16', help='Niveles de concurrencia separados por comas')
+        parser.add_argument('--compras', type=int, default=200, help='Compras por nivel')
+        parser.add_argument('--calentamiento', type=int, default=10, help='Compras previas sin medir')
+        parser.add_argument('--provider-url', default=None, help='Nodo existente (Ganache/Hardhat -d) en lugar del nodo en proceso')
+        parser.add_argument('--latencia-rpc', type=float, default=0.0, help='Milisegundos añadidos a cada petición del nodo en proceso')
+        parser.add_argument('--salida', default='benchmark_compras.json', help='Fichero JSON de resultados')
+        parser.add_argument('--etiqueta', default='', help='Versión o rama, para comparar resultados entre releases')
+        parser.add_argument('--verbose', action='store_true', help='No silenciar la salida de los servicios')
+
+    def _comprar(self, url, producto_id):
+        start = time.perf_counter()
+        response = Client().post(
+            url, data=json.dumps({'producto_id': producto_id, 'cantidad': 1}), content_type='application/json'
+        )
+        elapsed = time.perf_counter() - start
+        ok = response.status_code == 200 and bool(response.json()['orden']['blockchain_tx'])
+        return elapsed, ok
+
+    def _medir(self, service, node, url, producto, concurrencia, compras):
+        rpc_antes = _rpc_por_metodo()
+        http_antes = pool_stats()['requests']
+        nodo_antes = node.requests if node else None
+        confirmadas_antes = BlockchainOrden.objects.filter(estado='confirmada').count()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            resultados = list(pool.map(lambda _: self._comprar(url, producto.id), range(compras)))
+        duracion = time.perf_counter() - start
+
+        rpc = {m: n - rpc_antes.get(m, 0) for m, n in _rpc_por_metodo().items() if n - rpc_antes.get(m, 0)}
+        http = pool_stats()['requests'] - http_antes
+        nodo = node.requests - nodo_antes if node else None
+        # Un barrido del confirmador: las órdenes minadas pasan a confirmada
+        ReceiptConfirmer(service.w3).sweep()
+        confirmadas = BlockchainOrden.objects.filter(estado='confirmada').count() - confirmadas_antes
+
+        latencias = np.array([elapsed for elapsed, _ in resultados]) * 1000
+        return {
+            'concurrencia': concurrencia,
+            'compras': compras,
+            'errores': sum(1 for _, ok in resultados if not ok),
+            'confirmadas': confirmadas,
+            'duracion_s': round(duracion, 3),
+            'compras_por_s': round(compras / duracion, 2),
+            'p50_ms': round(float(np.percentile(latencias, 50)), 2),
+            'p90_ms': round(float(np.percentile(latencias, 90)), 2),
+            'p99_ms': round(float(np.percentile(latencias, 99)), 2),
+            'max_ms': round(float(latencias.max()), 2),
+            'rpc_por_orden': round(sum(rpc.values()) / compras, 2),
+            'rpc_por_metodo': rpc,
+            'http_por_orden': round(http / compras, 2),
+            'rpc_nodo_por_orden': round(nodo / compras, 2) if node else None,
+        }
+
+    def _report(self, nivel):
+        self.stdout.write(
+            f"c={nivel['concurrencia']:<4} {nivel['compras_por_s']:>8.1f} compras/s  "
+            f"p50 {nivel['p50_ms']:>8.1f} ms  p99 {nivel['p99_ms']:>8.1f} ms  "
+            f"{nivel['rpc_por_orden']:>5.2f} rpc/orden  errores {nivel['errores']}  "
+            f"confirmadas {nivel['confirmadas']}"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            niveles = [int(c) for c in options['concurrencia'].split(',') if c.strip()]
+        except ValueError:
+            raise CommandError('--concurrencia debe ser una lista de enteros, p. ej. 1,4,16')
+        compras = options['compras']
+
+        silencio = contextlib.nullcontext() if options['verbose'] else contextlib.redirect_stdout(io.StringIO())
+        with nodo_blockchain(options['provider_url'], options['latencia_rpc']) as (node, provider_url), \
+                base_de_datos_de_prueba('benchmark_compras'), silencio:
+            blockchain_service.configure(lambda: BlockchainService(provider_url=provider_url))
+            if not blockchain_service.wait_ready(timeout=60):
+                raise CommandError(f"No se pudo inicializar BlockchainService: {blockchain_service.error}")
+            service = blockchain_service.get()
+
+            vendedor, _ = User.objects.get_or_create(username='vendedor_benchmark')
+            producto = BlockchainProducto.objects.create(
+                nombre='Producto benchmark',
+                precio=Decimal('0.01'),
+                stock=options['calentamiento'] + compras * len(niveles),
+                vendedor=vendedor,
+            )
+            url = reverse('blockchain:comprar_producto_blockchain')
+            for _ in range(options['calentamiento']):
+                self._comprar(url, producto.id)
+
+            resultados = []
+            for concurrencia in niveles:
+                nivel = self._medir(service, node, url, producto, concurrencia, compras)
+                resultados.append(nivel)
+                self._report(nivel)
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'etiqueta': options['etiqueta'],
+            'nodo': 'eth-tester en proceso' if node else provider_url,
+            'latencia_rpc_ms': options['latencia_rpc'] if node else None,
+            'python': platform.python_version(),
+            'web3': web3.__version__,
+            'niveles': resultados,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados guardados en {options['salida']}"))
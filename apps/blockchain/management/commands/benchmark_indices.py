@@ -0,0 +1,200 @@
+# management/commands/benchmark_indices.py
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.blockchain.models import BlockchainOrden, BlockchainProducto
+from apps.blockchain.serialization import ordenes_recientes_values
+from apps.tienda.models import Orden, Producto
+
+from ._entorno import base_de_datos_de_prueba
+
+# Índices de las migraciones blockchain 0006 y tienda 0002
+INDICES = {
+    BlockchainOrden: ('orden_bc_fecha_desc', 'orden_bc_estado_id', 'orden_bc_tx_hash'),
+    BlockchainProducto: ('producto_bc_tx_hash',),
+    Orden: ('orden_estado_fecha',),
+    Producto: ('producto_estado',),
+}
+# Reparto de estados de las órdenes sintéticas
+ESTADOS_BC = [('confirmada', 0.95), ('pendiente', 0.02), ('fallida', 0.03)]
+ESTADOS_TIENDA = [('completada', 0.90), ('pendiente', 0.05), ('confirmada', 0.03), ('cancelada', 0.02)]
+
+
+def _tx_hash(i):
+    return f'0x{i:064x}'
+
+
+def _consultas(n_ordenes, n_productos):
+    """Consultas del dashboard, el confirmador y la conciliación por hash; cada una devuelve un queryset"""
+    hash_orden = _tx_hash(n_ordenes // 2)
+    hash_producto = _tx_hash(n_productos // 2)
+    return {
+        'dashboard: órdenes recientes': lambda: ordenes_recientes_values(BlockchainOrden.objects.all()),
+        'confirmador: pendientes': lambda: (
+            BlockchainOrden.objects.filter(estado='pendiente', blockchain_tx_hash__isnull=False, id__gt=0)
+            .order_by('id').values_list('id', 'blockchain_tx_hash', 'fecha_compra')[:200]
+        ),
+        'orden por tx_hash': lambda: BlockchainOrden.objects.filter(blockchain_tx_hash=hash_orden).values('id', 'estado'),
+        'producto por tx_hash': lambda: BlockchainProducto.objects.filter(
+            blockchain_tx_hash__in=[hash_producto, hash_producto[2:]], blockchain_product_id__isnull=True
+        ).values('id'),
+        'tienda: órdenes pendientes': lambda: (
+            Orden.objects.filter(estado='pendiente').order_by('-fecha_compra').values('id', 'total_pagado')[:50]
+        ),
+        'tienda: productos agotados': lambda: Producto.objects.filter(estado='agotado').values('id', 'nombre'),
+    }
+
+
+def _elegir(rng, reparto):
+    x = rng.random()
+    for valor, peso in reparto:
+        x -= peso
+        if x < 0:
+            return valor
+    return reparto[-1][0]
+
+
+class Command(BaseCommand):
+    help = ('Carga órdenes sintéticas (1M por defecto) en una base de datos de prueba y mide planes y tiempos '
+            'de las consultas del dashboard y de búsqueda por hash sin y con los índices nuevos')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ordenes', type=int, default=1_000_000, help='Órdenes sintéticas de cada tipo (blockchain y tienda)')
+        parser.add_argument('--productos', type=int, default=10_000, help='Productos de cada tipo')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por consulta (se informa la mediana)')
+        parser.add_argument('--lote', type=int, default=10_000, help='Filas por executemany durante la carga')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', default='benchmark_indices.json', help='Fichero JSON con planes y tiempos')
+
+    def _insertar(self, modelo, columnas, filas, lote):
+        """INSERT por executemany, sin instanciar modelos: la carga de 1M filas tarda segundos"""
+        tabla = connection.ops.quote_name(modelo._meta.db_table)
+        sql = (f"INSERT INTO {tabla} ({', '.join(connection.ops.quote_name(c) for c in columnas)}) "
+               f"VALUES ({', '.join(['%s'] * len(columnas))})")
+        with transaction.atomic(), connection.cursor() as cursor:
+            buffer = []
+            for fila in filas:
+                buffer.append(fila)
+                if len(buffer) >= lote:
+                    cursor.executemany(sql, buffer)
+                    buffer = []
+            if buffer:
+                cursor.executemany(sql, buffer)
+
+    def _cargar(self, n_ordenes, n_productos, lote, rng):
+        ops = connection.ops
+        vendedor = User.objects.create(username='vendedor_indices')
+        comprador = User.objects.create(username='comprador_indices')
+        ahora = timezone.now()
+        precio = ops.adapt_decimalfield_value(Decimal('10.00'), 10, 2)
+
+        self._insertar(BlockchainProducto, ['nombre', 'precio', 'stock', 'vendedor_id', 'activo', 'blockchain_tx_hash'], (
+            (f'Producto {i}', precio, 100, vendedor.id, True, _tx_hash(i) if rng.random() < 0.9 else None)
+            for i in range(n_productos)
+        ), lote)
+        self._insertar(Producto, ['nombre', 'descripcion', 'precio', 'stock', 'vendedor_id', 'estado', 'fecha_creacion'], (
+            (f'Producto {i}', '', precio, 100, vendedor.id, _elegir(rng, [('activo', 0.9), ('inactivo', 0.05), ('agotado', 0.05)]),
+             ops.adapt_datetimefield_value(ahora))
+            for i in range(n_productos)
+        ), lote)
+        bc_ids = list(BlockchainProducto.objects.values_list('id', flat=True))
+        tienda_ids = list(Producto.objects.values_list('id', flat=True))
+
+        def fecha(i):
+            # Un año de historial, no ordenado por id (como llegan las órdenes de varios workers)
+            return ops.adapt_datetimefield_value(ahora - timedelta(seconds=rng.randrange(365 * 86400)))
+
+        def orden_bc(i):
+            estado = _elegir(rng, ESTADOS_BC)
+            tx_hash = _tx_hash(i) if rng.random() < 0.97 else None
+            confirmada = estado != 'pendiente'
+            return (rng.choice(bc_ids), comprador.id, 1, precio, fecha(i), tx_hash, estado,
+                    rng.randrange(10_000_000) if confirmada else None, 21000 if confirmada else None,
+                    ops.adapt_datetimefield_value(ahora) if confirmada else None)
+
+        self._insertar(BlockchainOrden, [
+            'producto_id', 'comprador_id', 'cantidad', 'total_pagado', 'fecha_compra', 'blockchain_tx_hash',
+            'estado', 'block_number', 'gas_used', 'fecha_confirmacion',
+        ], (orden_bc(i) for i in range(n_ordenes)), lote)
+        self._insertar(Orden, [
+            'producto_id', 'comprador_id', 'cantidad', 'total_pagado', 'estado', 'fecha_compra', 'transaccion_hash',
+        ], (
+            (rng.choice(tienda_ids), comprador.id, 1, precio, _elegir(rng, ESTADOS_TIENDA), fecha(i), '')
+            for i in range(n_ordenes)
+        ), lote)
+
+    def _indices(self, crear):
+        """Crear o eliminar los índices nuevos; devuelve los segundos empleados"""
+        start = time.perf_counter()
+        with connection.schema_editor() as editor:
+            for modelo, nombres in INDICES.items():
+                for index in modelo._meta.indexes:
+                    if index.name in nombres:
+                        (editor.add_index if crear else editor.remove_index)(modelo, index)
+        with connection.cursor() as cursor:
+            # Estadísticas del planificador al día (sqlite_stat1 / pg_statistic)
+            cursor.execute('ANALYZE')
+        return time.perf_counter() - start
+
+    def _medir(self, consultas, repeticiones):
+        resultados = {}
+        for nombre, qs in consultas.items():
+            plan = qs().explain()
+            list(qs())  # calentamiento: páginas en caché
+            tiempos = []
+            for _ in range(repeticiones):
+                start = time.perf_counter()
+                filas = len(list(qs()))
+                tiempos.append((time.perf_counter() - start) * 1000)
+            resultados[nombre] = {'ms': round(statistics.median(tiempos), 3), 'filas': filas, 'plan': plan}
+        return resultados
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['semilla'])
+        with base_de_datos_de_prueba('benchmark_indices'):
+            self._indices(crear=False)
+            self.stdout.write(f"📥 Cargando {options['ordenes']:,} órdenes de cada tipo y {options['productos']:,} productos...")
+            start = time.perf_counter()
+            self._cargar(options['ordenes'], options['productos'], options['lote'], rng)
+            carga_s = time.perf_counter() - start
+            self.stdout.write(f"   {carga_s:.1f}s")
+
+            consultas = _consultas(options['ordenes'], options['productos'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            antes = self._medir(consultas, options['repeticiones'])
+            creacion_s = self._indices(crear=True)
+            self.stdout.write(f"🔧 Índices creados en {creacion_s:.1f}s")
+            despues = self._medir(consultas, options['repeticiones'])
+
+        self.stdout.write(f"\n{'consulta':<30} {'sin índices':>12} {'con índices':>12} {'mejora':>8}")
+        for nombre in consultas:
+            a, d = antes[nombre]['ms'], despues[nombre]['ms']
+            self.stdout.write(f"{nombre:<30} {a:>10.2f}ms {d:>10.2f}ms {a / d if d else 0:>7.0f}x")
+        self.stdout.write('\nPlanes con índices:')
+        for nombre in consultas:
+            self.stdout.write(f"  {nombre}: {' | '.join(despues[nombre]['plan'].splitlines())}")
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'base_de_datos': connection.vendor,
+            'ordenes': options['ordenes'],
+            'productos': options['productos'],
+            'carga_s': round(carga_s, 2),
+            'creacion_indices_s': round(creacion_s, 2),
+            'consultas': {
+                nombre: {'sin_indices': antes[nombre], 'con_indices': despues[nombre]} for nombre in consultas
+            },
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Resultados guardados en {options['salida']}"))
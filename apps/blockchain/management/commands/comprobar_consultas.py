@@ -0,0 +1,90 @@
+# management/commands/comprobar_consultas.py
+import contextlib
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from apps.blockchain.models import BlockchainOrden, BlockchainProducto
+from apps.blockchain.service_loader import blockchain_service
+from apps.tienda.models import Orden, Producto
+
+from ._entorno import base_de_datos_de_prueba
+
+ENDPOINTS = {
+    'tienda: lista_productos': '/api/productos/',
+    'blockchain: lista_productos': '/api/blockchain/blockchain-products/',
+    'dashboard_completo': '/api/dashboard/',
+    'dashboard_completo (async)': '/api/blockchain/async/dashboard/',
+}
+
+
+def _sin_nodo():
+    raise RuntimeError('comprobar_consultas solo mide SQL: sin nodo blockchain')
+
+
+class Command(BaseCommand):
+    help = ('Comprueba que el catálogo y el dashboard hacen el mismo número de consultas SQL '
+            'sea cual sea el número de productos y órdenes (sin N+1)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='10,100,1000', help='Tamaños de catálogo a comparar, separados por comas')
+
+    def _poblar(self, hasta):
+        """Completar hasta `hasta` productos (y una orden por producto) de cada tipo, con vendedores distintos"""
+        actuales = Producto.objects.count()
+        nuevos = range(actuales, hasta)
+        if not nuevos:
+            return
+        vendedores = User.objects.bulk_create([User(username=f'vendedor_consultas_{i}') for i in nuevos])
+        comprador, _ = User.objects.get_or_create(username='comprador_consultas')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', descripcion='', precio=Decimal('1.00'), stock=10, vendedor=v)
+            for i, v in zip(nuevos, vendedores)
+        ])
+        Orden.objects.bulk_create([
+            Orden(producto=p, comprador=comprador, total_pagado=p.precio) for p in productos
+        ])
+        productos = BlockchainProducto.objects.bulk_create([
+            BlockchainProducto(nombre=f'Producto {i}', precio=Decimal('0.01'), stock=10, vendedor=v,
+                               blockchain_tx_hash=f'0x{i:064x}')
+            for i, v in zip(nuevos, vendedores)
+        ])
+        BlockchainOrden.objects.bulk_create([
+            BlockchainOrden(producto=p, comprador=comprador, total_pagado=p.precio, blockchain_tx_hash=p.blockchain_tx_hash)
+            for p in productos
+        ])
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = sorted(int(t) for t in options['tamanos'].split(',') if t.strip())
+        except ValueError:
+            raise CommandError('--tamanos debe ser una lista de enteros, p. ej. 10,100,1000')
+
+        consultas = {nombre: [] for nombre in ENDPOINTS}
+        with base_de_datos_de_prueba('comprobar_consultas'), contextlib.redirect_stdout(io.StringIO()):
+            blockchain_service.configure(_sin_nodo)
+            blockchain_service.wait_ready(timeout=5)
+            client = Client()
+            for tamano in tamanos:
+                self._poblar(tamano)
+                for nombre, url in ENDPOINTS.items():
+                    with CaptureQueriesContext(connection) as ctx:
+                        response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(f"{url} devolvió {response.status_code}: {response.content[:200]!r}")
+                    consultas[nombre].append(len(ctx.captured_queries))
+
+        self.stdout.write(f"{'':<30}" + ''.join(f'{t:>10}' for t in tamanos))
+        fallos = []
+        for nombre, counts in consultas.items():
+            self.stdout.write(f'{nombre:<30}' + ''.join(f'{c:>10}' for c in counts))
+            if len(set(counts)) > 1:
+                fallos.append(nombre)
+        if fallos:
+            raise CommandError(f"Consultas que crecen con el catálogo (N+1): {', '.join(fallos)}")
+        self.stdout.write(self.style.SUCCESS('✅ Número de consultas constante en todos los endpoints'))
@@ -0,0 +1,37 @@
+# management/commands/confirmar_ordenes.py
+import time
+
+from django.core.management.base import BaseCommand
+from web3 import Web3
+
+from apps.blockchain.confirmer import ReceiptConfirmer
+from apps.blockchain.head_watcher import HeadWatcher
+from apps.blockchain.providers import get_http_provider
+
+
+class Command(BaseCommand):
+    help = 'Confirmar órdenes pendientes con un barrido de recibos por bloque nuevo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider-url', default='http://localhost:8545')
+        parser.add_argument('--once', action='store_true', help='Hacer un único barrido y salir')
+        parser.add_argument('--interval', type=float, default=None, help='Segundos entre sondeos de la cabeza')
+
+    def handle(self, *args, **options):
+        w3 = Web3(get_http_provider(options['provider_url']))
+        confirmer = ReceiptConfirmer(w3)
+
+        if options['once']:
+            counts = confirmer.sweep(w3.eth.block_number)
+            self.stdout.write(self.style.SUCCESS(f"✅ Barrido completado: {counts}"))
+            return
+
+        watcher = HeadWatcher(w3, interval=options['interval'])
+        watcher.subscribe(confirmer.sweep)
+        self.stdout.write(f"🔗 Confirmando órdenes cada bloque nuevo en {options['provider_url']} (Ctrl+C para salir)")
+        watcher.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            watcher.stop()
@@ -0,0 +1,124 @@
+# management/commands/estres_stock.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from apps.tienda.models import Orden, Producto
+from apps.tienda.stock import StockInsuficiente, comprar, con_reintentos
+
+from ._entorno import base_de_datos_de_prueba
+
+MODOS = ('insercion', 'antiguo', 'reserva')
+
+
+class Command(BaseCommand):
+    help = ('Estrés de compras concurrentes sobre un mismo producto: comprueba que la reserva de stock '
+            '(UPDATE condicional) no sobrevende y compara su rendimiento con una inserción simple')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=64, help='Compradores concurrentes')
+        parser.add_argument('--compras', type=int, default=20, help='Compras por hilo')
+        parser.add_argument('--stock', type=int, default=500, help='Stock inicial (menor que hilos x compras para agotarlo)')
+        parser.add_argument('--modos', default=','.join(MODOS),
+                            help='insercion (solo INSERT de la orden), antiguo (leer, comprobar y save()), reserva')
+
+    def _comprador(self, modo, producto_id, comprador, compras, resultados, lock):
+        ok = agotado = errores = 0
+        try:
+            for _ in range(compras):
+                try:
+                    if modo == 'insercion':
+                        con_reintentos(lambda: Orden.objects.create(
+                            producto_id=producto_id, comprador=comprador, cantidad=1, total_pagado=Decimal('1.00')
+                        ))
+                    elif modo == 'antiguo':
+                        # El camino anterior de las vistas: comprobación en Python y save() de toda la fila
+                        producto = Producto.objects.get(id=producto_id)
+                        if producto.stock < 1:
+                            raise StockInsuficiente()
+                        Orden.objects.create(producto=producto, comprador=comprador, cantidad=1, total_pagado=producto.precio)
+                        producto.stock -= 1
+                        producto.save()
+                    else:
+                        comprar(Producto, producto_id, 1, lambda producto: Orden.objects.create(
+                            producto=producto, comprador=comprador, cantidad=1, total_pagado=producto.precio
+                        ))
+                    ok += 1
+                except StockInsuficiente:
+                    agotado += 1
+                except Exception:
+                    errores += 1
+        finally:
+            connection.close()
+        with lock:
+            resultados['ok'] += ok
+            resultados['agotado'] += agotado
+            resultados['errores'] += errores
+
+    def _ejecutar(self, modo, hilos, compras, stock, vendedor, comprador):
+        # En modo inserción el stock no limita: se mide solo el coste del INSERT
+        inicial = hilos * compras if modo == 'insercion' else stock
+        producto = Producto.objects.create(nombre=f'Estrés {modo}', descripcion='', precio=Decimal('1.00'),
+                                           stock=inicial, vendedor=vendedor)
+        resultados = {'ok': 0, 'agotado': 0, 'errores': 0}
+        lock = threading.Lock()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            for _ in range(hilos):
+                pool.submit(self._comprador, modo, producto.id, comprador, compras, resultados, lock)
+        duracion = time.perf_counter() - start
+
+        producto.refresh_from_db()
+        vendidas = Orden.objects.filter(producto=producto).aggregate(total=Sum('cantidad'))['total'] or 0
+        return {
+            'modo': modo,
+            'intentos': hilos * compras,
+            'duracion_s': duracion,
+            # Compras completadas o rechazadas por falta de stock, por segundo
+            'por_s': (resultados['ok'] + resultados['agotado']) / duracion,
+            **resultados,
+            'vendidas': vendidas,
+            'stock_final': producto.stock,
+            # Unidades vendidas por encima del stock inicial
+            'sobreventa': max(0, vendidas - inicial) if modo != 'insercion' else 0,
+            # Descuentos de stock perdidos: órdenes que no se reflejan en el stock
+            'perdidas': (vendidas - (inicial - producto.stock)) if modo != 'insercion' else 0,
+        }
+
+    def handle(self, *args, **options):
+        modos = [m.strip() for m in options['modos'].split(',') if m.strip()]
+        for modo in modos:
+            if modo not in MODOS:
+                raise CommandError(f"Modo desconocido: {modo!r} (válidos: {', '.join(MODOS)})")
+
+        resultados = []
+        with base_de_datos_de_prueba('estres_stock'):
+            vendedor = User.objects.create(username='vendedor_estres')
+            comprador = User.objects.create(username='comprador_estres')
+            self.stdout.write(
+                f"🧪 {connection.vendor}: {options['hilos']} hilos x {options['compras']} compras, stock {options['stock']}"
+            )
+            for modo in modos:
+                r = self._ejecutar(modo, options['hilos'], options['compras'], options['stock'], vendedor, comprador)
+                resultados.append(r)
+                self.stdout.write(
+                    f"{modo:<10} {r['por_s']:>8.1f} op/s  ok {r['ok']:<6} agotado {r['agotado']:<6} "
+                    f"errores {r['errores']:<4} vendidas {r['vendidas']:<6} stock final {r['stock_final']:<6} "
+                    f"sobreventa {r['sobreventa']:<4} descuentos perdidos {r['perdidas']}"
+                )
+
+        por_modo = {r['modo']: r for r in resultados}
+        if 'insercion' in por_modo and 'reserva' in por_modo and por_modo['insercion']['por_s']:
+            ratio = por_modo['reserva']['por_s'] / por_modo['insercion']['por_s']
+            self.stdout.write(f"📊 reserva / inserción simple: {ratio:.0%} del rendimiento")
+        reserva = por_modo.get('reserva')
+        if reserva:
+            if reserva['sobreventa'] or reserva['perdidas'] or reserva['stock_final'] < 0 or reserva['errores']:
+                raise CommandError('La reserva de stock ha sobrevendido, perdido descuentos o fallado')
+            self.stdout.write(self.style.SUCCESS('✅ Reserva de stock: cero sobreventa y cero descuentos perdidos'))
@@ -0,0 +1,38 @@
+# management/commands/indexar_bloques.py
+import time
+
+from django.core.management.base import BaseCommand
+from web3 import Web3
+
+from apps.blockchain.indexer import BlockIndexer
+from apps.blockchain.providers import get_http_provider
+
+
+class Command(BaseCommand):
+    help = 'Ingerir bloques y transacciones en el índice local (reanudable, tolera reorgs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider-url', default='http://localhost:8545')
+        parser.add_argument('--desde', type=int, default=None, help='Bloque inicial si no hay checkpoint')
+        parser.add_argument('--lote', type=int, default=None, help='Bloques por lote JSON-RPC')
+        parser.add_argument('--confirmaciones', type=int, default=None, help='Bloques a deshacer ante un reorg')
+        parser.add_argument('--follow', action='store_true', help='Seguir indexando bloques nuevos')
+        parser.add_argument('--interval', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        w3 = Web3(get_http_provider(options['provider_url']))
+        indexer = BlockIndexer(
+            w3,
+            confirmations=options['confirmaciones'],
+            batch_blocks=options['lote'],
+            start_block=options['desde'],
+        )
+
+        indexed = indexer.run()
+        self.stdout.write(self.style.SUCCESS(f"✅ {indexed} bloques indexados"))
+
+        while options['follow']:
+            time.sleep(options['interval'])
+            indexed = indexer.run()
+            if indexed:
+                self.stdout.write(f"📦 {indexed} bloques nuevos indexados")
@@ -0,0 +1,45 @@
+# management/commands/indexar_eventos.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from web3 import Web3
+
+from apps.blockchain.event_indexer import EventIndexer
+from apps.blockchain.providers import get_http_provider
+
+
+class Command(BaseCommand):
+    help = 'Ingerir los eventos del contrato ECommerce (productos, compras, stock) en tablas locales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider-url', default=None, help='Por defecto ALCHEMY_API_URL')
+        parser.add_argument('--address', default=None, help='Por defecto CONTRACT_ADDRESS')
+        parser.add_argument('--desde', type=int, default=None, help='Bloque inicial si no hay checkpoint')
+        parser.add_argument('--rango', type=int, default=None, help='Bloques por eth_getLogs inicial')
+        parser.add_argument('--confirmaciones', type=int, default=None)
+        parser.add_argument('--follow', action='store_true', help='Seguir indexando bloques nuevos')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        address = options['address'] or settings.CONTRACT_ADDRESS
+        if not address:
+            raise CommandError('Falta la dirección del contrato (--address o CONTRACT_ADDRESS)')
+
+        w3 = Web3(get_http_provider(options['provider_url'] or settings.ALCHEMY_API_URL))
+        indexer = EventIndexer(
+            w3,
+            address,
+            start_block=options['desde'],
+            chunk=options['rango'],
+            confirmations=options['confirmaciones'],
+        )
+
+        applied = indexer.run()
+        self.stdout.write(self.style.SUCCESS(f"✅ {applied} eventos indexados"))
+
+        while options['follow']:
+            time.sleep(options['interval'])
+            applied = indexer.run()
+            if applied:
+                self.stdout.write(f"📥 {applied} eventos nuevos indexados")
@@ -0,0 +1,60 @@
+# management/commands/medir_firmas.py
+import time
+
+from django.core.management.base import BaseCommand
+from eth_account import Account
+
+from apps.blockchain.signer import Signer, signer_stats
+
+# Clave de la primera cuenta de Ganache en modo determinista (-d)
+GANACHE_PRIVATE_KEY = '0x4f3edf983ac636a65a842ce7c78d9aa706d3b113bce9c46f30d7d21715b23b1d'
+
+
+class Command(BaseCommand):
+    help = 'Medir firmas por segundo: clave en cada firma, LocalAccount cacheada y pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n', type=int, default=2000, help='Transacciones a firmar en cada modo')
+        parser.add_argument('--workers', type=int, default=None, help='Procesos del pool (por defecto BLOCKCHAIN_SIGN_WORKERS)')
+
+    def _transactions(self, n):
+        return [{
+            'to': '0x' + '11' * 20,
+            'value': i,
+            'gas': 21000,
+            'maxFeePerGas': 2 * 10 ** 9,
+            'maxPriorityFeePerGas': 10 ** 9,
+            'nonce': i,
+            'chainId': 1337,
+        } for i in range(n)]
+
+    def _report(self, modo, n, seconds):
+        self.stdout.write(f"{modo:<28} {n / seconds:>10.1f} firmas/s  ({seconds:.2f}s)")
+
+    def handle(self, *args, **options):
+        n = options['n']
+        transactions = self._transactions(n)
+
+        start = time.perf_counter()
+        for tx in transactions:
+            Account.sign_transaction(tx, GANACHE_PRIVATE_KEY)
+        self._report('clave hex en cada firma', n, time.perf_counter() - start)
+
+        signer = Signer(GANACHE_PRIVATE_KEY, workers=1)
+        start = time.perf_counter()
+        for tx in transactions:
+            signer.sign(tx)
+        self._report('LocalAccount cacheada', n, time.perf_counter() - start)
+
+        signer = Signer(GANACHE_PRIVATE_KEY, workers=options['workers'])
+        if signer.workers < 2:
+            self.stdout.write(f"(pool omitido: {signer.workers} proceso; usar --workers N)")
+        else:
+            # Arrancar el pool fuera de la medida
+            signer.sign_many(transactions[:signer.parallel_min])
+            start = time.perf_counter()
+            signer.sign_many(transactions)
+            self._report(f'pool de {signer.workers} procesos', n, time.perf_counter() - start)
+            signer.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Acumulado del proceso: {signer_stats()}"))
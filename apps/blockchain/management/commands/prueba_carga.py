@@ -0,0 +1,274 @@
+# management/commands/prueba_carga.py
+import contextlib
+import io
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import numpy as np
+import requests
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.blockchain.models import BlockchainOrden, BlockchainProducto
+from apps.blockchain.service_loader import blockchain_service
+from apps.blockchain.services import BlockchainService
+from apps.tienda.models import Orden, Producto
+
+from ._entorno import base_de_datos_de_prueba, nodo_blockchain, servidor_http
+
+# Endpoint -> (método, ruta, tipo de producto que compra)
+ENDPOINTS = {
+    'productos': ('GET', '/api/productos/', None),
+    'comprar': ('POST', '/api/comprar/', 'tienda'),
+    'comprar_blockchain': ('POST', '/api/blockchain/blockchain-products/buy/', 'blockchain'),
+    'dashboard': ('GET', '/api/dashboard/', None),
+}
+PREFIJO = 'Carga '
+
+
+def _parse_mezcla(mezcla):
+    """'productos=4,comprar=3' -> {'productos': 4, 'comprar': 3}"""
+    pesos = {}
+    for parte in mezcla.split(','):
+        nombre, _, peso = parte.strip().partition('=')
+        if nombre not in ENDPOINTS:
+            raise CommandError(f"Endpoint desconocido en --mezcla: {nombre!r} (válidos: {', '.join(ENDPOINTS)})")
+        try:
+            pesos[nombre] = float(peso or 1)
+        except ValueError:
+            raise CommandError(f"Peso no válido en --mezcla: {parte!r}")
+    if not any(pesos.values()):
+        raise CommandError('--mezcla necesita al menos un endpoint con peso positivo')
+    return pesos
+
+
+def _comprobar_invariantes(modelo_producto, modelo_orden, stock_inicial, compras_ok, etiqueta):
+    """Stock nunca negativo y unidades vendidas == stock descontado, por producto"""
+    violaciones = []
+    vendidas = dict(
+        modelo_orden.objects.filter(producto_id__in=stock_inicial)
+        .values_list('producto_id').annotate(Sum('cantidad'))
+    )
+    ordenes = modelo_orden.objects.filter(producto_id__in=stock_inicial).count()
+    for producto_id, stock in modelo_producto.objects.filter(id__in=stock_inicial).values_list('id', 'stock'):
+        if stock < 0:
+            violaciones.append(f"{etiqueta} #{producto_id}: stock negativo ({stock})")
+        descontado = stock_inicial[producto_id] - stock
+        if descontado != vendidas.get(producto_id, 0):
+            violaciones.append(
+                f"{etiqueta} #{producto_id}: {vendidas.get(producto_id, 0)} unidades en órdenes "
+                f"pero el stock bajó {descontado}"
+            )
+    if ordenes != compras_ok:
+        violaciones.append(f"{etiqueta}: {compras_ok} compras respondidas con 200 pero {ordenes} órdenes en la base de datos")
+    return violaciones
+
+
+class Command(BaseCommand):
+    help = ('Prueba de carga HTTP concurrente sobre /api/productos/, /api/comprar/, la compra blockchain '
+            'y /api/dashboard/, con comprobación de invariantes de stock tras cada nivel')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', default='4,16,64', help='Niveles de clientes concurrentes separados por comas')
+        parser.add_argument('--duracion', type=float, default=10.0, help='Segundos por nivel')
+        parser.add_argument('--mezcla', default='productos=4,comprar=3,comprar_blockchain=2,dashboard=1',
+                            help='Pesos relativos de cada endpoint')
+        parser.add_argument('--productos', type=int, default=5, help='Productos de cada tipo para las compras')
+        parser.add_argument('--stock', type=int, default=100, help='Stock inicial de cada producto (poco stock = más contención)')
+        parser.add_argument('--url', default=None,
+                            help='Servidor ya arrancado; los invariantes se comprueban en la base de datos configurada')
+        parser.add_argument('--usar-bd-configurada', action='store_true',
+                            help='Con --url: confirmar que se crean (y se borran al terminar) productos y usuarios '
+                                 f'"{PREFIJO.strip()}" en la base de datos configurada')
+        parser.add_argument('--provider-url', default=None, help='Nodo existente en lugar del nodo eth-tester en proceso')
+        parser.add_argument('--latencia-rpc', type=float, default=0.0, help='Milisegundos añadidos a cada petición del nodo en proceso')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Timeout de cada petición HTTP')
+        parser.add_argument('--semilla', type=int, default=None, help='Semilla para repetir la misma secuencia de peticiones')
+        parser.add_argument('--salida', default='prueba_carga.json', help='Fichero JSON de resultados')
+        parser.add_argument('--estricto', action='store_true', help='Terminar con error si se viola algún invariante')
+        parser.add_argument('--verbose', action='store_true', help='No silenciar la salida de los servicios')
+
+    def _preparar_datos(self, productos, stock):
+        """Crear los productos de la prueba; devuelve (stock por producto de tienda, de blockchain, creados)"""
+        vendedor, vendedor_nuevo = User.objects.get_or_create(username='vendedor_carga')
+        # Los usuarios que crean las vistas con get_or_create, para no medir su carrera
+        _, comprador_nuevo = User.objects.get_or_create(username='comprador1')
+        tienda = [
+            Producto.objects.create(nombre=f'{PREFIJO}{i}', descripcion='Prueba de carga',
+                                    precio=Decimal('10.00'), stock=stock, vendedor=vendedor)
+            for i in range(productos)
+        ]
+        blockchain = [
+            BlockchainProducto.objects.create(nombre=f'{PREFIJO}{i}', precio=Decimal('0.01'),
+                                              stock=stock, vendedor=vendedor)
+            for i in range(productos)
+        ]
+        creados = {
+            'usuarios': [u for u, nuevo in ((vendedor.username, vendedor_nuevo), ('comprador1', comprador_nuevo)) if nuevo],
+            'tienda': [p.id for p in tienda],
+            'blockchain': [p.id for p in blockchain],
+        }
+        return {p.id: stock for p in tienda}, {p.id: stock for p in blockchain}, creados
+
+    def _limpiar_datos(self, creados):
+        """Borrar lo creado por _preparar_datos en la base de datos configurada (las órdenes caen en cascada)"""
+        Producto.objects.filter(id__in=creados['tienda']).delete()
+        BlockchainProducto.objects.filter(id__in=creados['blockchain']).delete()
+        User.objects.filter(username__in=creados['usuarios']).delete()
+        self.stdout.write(
+            f"🧹 Borrados {len(creados['tienda']) + len(creados['blockchain'])} productos de la prueba"
+            + (f" y los usuarios {', '.join(creados['usuarios'])}" if creados['usuarios'] else '')
+        )
+
+    def _cliente(self, base_url, pesos, ids, deadline, seed, timeout):
+        """Un cliente: peticiones en bucle hasta `deadline`; devuelve [(endpoint, estado, segundos)]"""
+        rng = random.Random(seed)
+        nombres, weights = list(pesos), list(pesos.values())
+        resultados = []
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                nombre = rng.choices(nombres, weights)[0]
+                metodo, ruta, tipo = ENDPOINTS[nombre]
+                body = {'producto_id': rng.choice(ids[tipo]), 'cantidad': 1} if tipo else None
+                start = time.perf_counter()
+                try:
+                    response = session.request(metodo, base_url + ruta, json=body, timeout=timeout)
+                    estado = response.status_code
+                except requests.RequestException as e:
+                    estado = type(e).__name__
+                resultados.append((nombre, estado, time.perf_counter() - start))
+        return resultados
+
+    def _nivel(self, base_url, pesos, ids, concurrencia, duracion, semilla, timeout):
+        deadline = time.monotonic() + duracion
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            futures = [
+                pool.submit(self._cliente, base_url, pesos, ids, deadline,
+                            None if semilla is None else semilla * 1000 + i, timeout)
+                for i in range(concurrencia)
+            ]
+            resultados = [r for f in futures for r in f.result()]
+        total_s = time.perf_counter() - start
+
+        por_endpoint = defaultdict(list)
+        for nombre, estado, elapsed in resultados:
+            por_endpoint[nombre].append((estado, elapsed))
+        endpoints = {}
+        for nombre, filas in sorted(por_endpoint.items()):
+            latencias = np.array([elapsed for _, elapsed in filas]) * 1000
+            estados = Counter(str(estado) for estado, _ in filas)
+            endpoints[nombre] = {
+                'peticiones': len(filas),
+                'por_s': round(len(filas) / total_s, 2),
+                'estados': dict(estados),
+                # 400 "Stock insuficiente" es una respuesta válida del negocio, no un fallo
+                'fallos': sum(n for estado, n in estados.items() if estado not in ('200', '400')),
+                'p50_ms': round(float(np.percentile(latencias, 50)), 2),
+                'p95_ms': round(float(np.percentile(latencias, 95)), 2),
+                'p99_ms': round(float(np.percentile(latencias, 99)), 2),
+                'max_ms': round(float(latencias.max()), 2),
+            }
+        return {
+            'concurrencia': concurrencia,
+            'duracion_s': round(total_s, 3),
+            'peticiones': len(resultados),
+            'por_s': round(len(resultados) / total_s, 2),
+            'endpoints': endpoints,
+        }, Counter(nombre for nombre, estado, _ in resultados if estado == 200)
+
+    def _report(self, nivel):
+        self.stdout.write(
+            f"\nc={nivel['concurrencia']}: {nivel['peticiones']} peticiones, {nivel['por_s']:.1f}/s"
+        )
+        for nombre, e in nivel['endpoints'].items():
+            estados = ' '.join(f'{k}:{v}' for k, v in sorted(e['estados'].items()))
+            self.stdout.write(
+                f"  {nombre:<20} {e['por_s']:>8.1f}/s  p50 {e['p50_ms']:>8.1f}  p95 {e['p95_ms']:>8.1f}  "
+                f"p99 {e['p99_ms']:>8.1f}  max {e['max_ms']:>8.1f} ms  [{estados}]"
+            )
+        if nivel['violaciones']:
+            self.stdout.write(self.style.ERROR(f"  ❌ {len(nivel['violaciones'])} invariantes violados:"))
+            for violacion in nivel['violaciones'][:10]:
+                self.stdout.write(f"     {violacion}")
+        else:
+            self.stdout.write(self.style.SUCCESS('  ✅ Invariantes de stock OK'))
+
+    def handle(self, *args, **options):
+        try:
+            niveles = [int(c) for c in options['concurrencia'].split(',') if c.strip()]
+        except ValueError:
+            raise CommandError('--concurrencia debe ser una lista de enteros, p. ej. 4,16,64')
+        pesos = _parse_mezcla(options['mezcla'])
+
+        externo = options['url'] is not None
+        if externo and not options['usar_bd_configurada']:
+            raise CommandError(
+                f"--url escribe productos y usuarios \"{PREFIJO.strip()}\" en la base de datos configurada "
+                f"({connection.settings_dict['NAME']}); añade --usar-bd-configurada para confirmarlo"
+            )
+        silencio = contextlib.nullcontext() if options['verbose'] else contextlib.redirect_stdout(io.StringIO())
+        with contextlib.ExitStack() as stack:
+            if externo:
+                base_url = options['url'].rstrip('/')
+                node = None
+            else:
+                node, provider_url = stack.enter_context(
+                    nodo_blockchain(options['provider_url'], options['latencia_rpc'])
+                )
+                stack.enter_context(base_de_datos_de_prueba('prueba_carga'))
+                blockchain_service.configure(lambda: BlockchainService(provider_url=provider_url))
+                with silencio:
+                    if not blockchain_service.wait_ready(timeout=60):
+                        raise CommandError(f"No se pudo inicializar BlockchainService: {blockchain_service.error}")
+                base_url = stack.enter_context(servidor_http())
+
+            stock_tienda, stock_blockchain, creados = self._preparar_datos(options['productos'], options['stock'])
+            if externo:
+                # Sin base de datos de prueba: lo creado se borra al salir, también si la prueba falla
+                stack.callback(self._limpiar_datos, creados)
+            ids = {'tienda': list(stock_tienda), 'blockchain': list(stock_blockchain)}
+            self.stdout.write(
+                f"🚀 {base_url} ({connection.vendor}, nodo {'eth-tester en proceso' if node else 'externo'}) "
+                f"mezcla {options['mezcla']}, {options['duracion']:g}s por nivel"
+            )
+
+            resultados = []
+            compras_ok = Counter()
+            for concurrencia in niveles:
+                with silencio:
+                    nivel, ok = self._nivel(base_url, pesos, ids, concurrencia, options['duracion'],
+                                            options['semilla'], options['timeout'])
+                compras_ok += ok
+                # Invariantes acumulados desde el principio de la prueba
+                nivel['violaciones'] = (
+                    _comprobar_invariantes(Producto, Orden, stock_tienda, compras_ok['comprar'], 'tienda')
+                    + _comprobar_invariantes(BlockchainProducto, BlockchainOrden, stock_blockchain,
+                                             compras_ok['comprar_blockchain'], 'blockchain')
+                )
+                resultados.append(nivel)
+                self._report(nivel)
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'url': options['url'] or 'servidor en proceso',
+            'base_de_datos': connection.vendor,
+            'mezcla': pesos,
+            'productos': options['productos'],
+            'stock': options['stock'],
+            'niveles': resultados,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Resultados guardados en {options['salida']}"))
+
+        violaciones = sum(len(nivel['violaciones']) for nivel in resultados)
+        if violaciones and options['estricto']:
+            raise CommandError(f"{violaciones} invariantes violados")
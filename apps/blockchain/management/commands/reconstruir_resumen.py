@@ -0,0 +1,52 @@
+# management/commands/reconstruir_resumen.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.blockchain.sales_summary import calcular_resumen, leer_resumen_completo, reconstruir
+
+VACIO_PRODUCTO = {'ordenes': 0, 'unidades': 0}
+VACIO_VENDEDOR = {'productos': 0, 'ordenes': 0, 'unidades': 0}
+
+
+def _diferencias(nombre, actual, esperado, vacio):
+    """Filas distintas entre el resumen incremental y el recalculado (las filas a cero equivalen a ausentes)"""
+    diferencias = []
+    for pk in sorted(set(actual) | set(esperado), key=str):
+        a = actual.get(pk) or {}
+        e = esperado.get(pk) or {}
+        for campo in sorted(set(a) | set(e)):
+            va, ve = a.get(campo, vacio.get(campo, 0)), e.get(campo, vacio.get(campo, 0))
+            if va != ve:
+                diferencias.append(f"{nombre} {pk}: {campo} = {va}, recalculado {ve}")
+    return diferencias
+
+
+class Command(BaseCommand):
+    help = 'Recalcular desde cero el resumen de ventas del dashboard (o solo comprobarlo con --comprobar)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comprobar', action='store_true',
+                            help='Comparar el resumen incremental con el recalculado sin modificarlo')
+
+    def handle(self, *args, **options):
+        if not options['comprobar']:
+            globales, por_producto, por_vendedor = reconstruir()
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Resumen reconstruido: {globales['total_ordenes']} órdenes, {globales['total_ventas']} en ventas, "
+                f"{len(por_producto)} productos con ventas, {len(por_vendedor)} vendedores"
+            ))
+            return
+
+        actual_global, actual_productos, actual_vendedores = leer_resumen_completo()
+        esperado_global, esperado_productos, esperado_vendedores = calcular_resumen()
+        diferencias = (
+            _diferencias('global', {'resumen': actual_global}, {'resumen': esperado_global}, {})
+            + _diferencias('producto', actual_productos, esperado_productos, VACIO_PRODUCTO)
+            + _diferencias('vendedor', actual_vendedores, esperado_vendedores, VACIO_VENDEDOR)
+        )
+        if diferencias:
+            for diferencia in diferencias[:20]:
+                self.stderr.write(f"❌ {diferencia}")
+            raise CommandError(f"{len(diferencias)} diferencias; ejecuta reconstruir_resumen para corregirlas")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Resumen coherente: {actual_global['total_ordenes']} órdenes, {actual_global['total_ventas']} en ventas"
+        ))
@@ -0,0 +1,73 @@
+# management/commands/registrar_productos.py
+import csv
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.blockchain.bulk import register_products_bulk
+from apps.blockchain.models import BlockchainProducto
+from apps.blockchain.sales_summary import productos_creados
+from apps.blockchain.services import BlockchainService
+
+
+class Command(BaseCommand):
+    help = 'Registrar un catálogo de productos (CSV o JSON con nombre, precio, stock) en blockchain en bloque'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='CSV con cabecera nombre,precio,stock o JSON con una lista de productos')
+        parser.add_argument('--provider-url', default='http://localhost:8545')
+        parser.add_argument('--vendedor', default='vendedor1')
+        parser.add_argument('--lote', type=int, default=1000, help='Productos por envío (reserva de nonces)')
+        parser.add_argument('--no-esperar', action='store_true', help='No esperar a los recibos')
+        parser.add_argument('--timeout', type=float, default=None, help='Segundos máximos esperando recibos por envío')
+
+    def _leer(self, archivo):
+        try:
+            with open(archivo, newline='', encoding='utf-8') as f:
+                if archivo.endswith('.json'):
+                    items = json.load(f)
+                else:
+                    items = list(csv.DictReader(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer {archivo}: {e}')
+
+        for i, item in enumerate(items):
+            if not item.get('nombre') or not item.get('precio'):
+                raise CommandError(f'Fila {i + 1}: nombre y precio son requeridos')
+        return items
+
+    def handle(self, *args, **options):
+        items = self._leer(options['archivo'])
+        service = BlockchainService(provider_url=options['provider_url'])
+        vendedor, _ = User.objects.get_or_create(username=options['vendedor'])
+
+        resumen = {}
+        inicio = time.perf_counter()
+        for start in range(0, len(items), options['lote']):
+            lote = items[start:start + options['lote']]
+            with transaction.atomic():
+                productos = BlockchainProducto.objects.bulk_create([
+                    BlockchainProducto(
+                        nombre=item['nombre'],
+                        precio=item['precio'],
+                        stock=int(item.get('stock') or 10),
+                        vendedor=vendedor
+                    ) for item in lote
+                ])
+                productos_creados(productos)
+            resultados = register_products_bulk(
+                service, productos, wait=not options['no_esperar'], timeout=options['timeout']
+            )
+            for resultado in resultados:
+                resumen[resultado['estado']] = resumen.get(resultado['estado'], 0) + 1
+                if resultado['estado'] in ('error', 'fallida'):
+                    self.stderr.write(f"❌ {resultado['nombre']}: {resultado.get('error', 'transacción revertida')}")
+            self.stdout.write(f"📤 {start + len(lote)}/{len(items)} productos enviados")
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(items)} productos en {duracion:.1f}s ({len(items) / duracion:.1f}/s): {resumen}"
+        ))
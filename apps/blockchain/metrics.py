@@ -0,0 +1,197 @@
+# apps/blockchain/metrics.py
+import asyncio
+import bisect
+import contextvars
+import functools
+import threading
+import time
+
+from django.conf import settings
+
+# Límites superiores (segundos) de los histogramas de latencia RPC y de operaciones
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# La confirmación de una orden va de segundos (Ganache) a minutos (Sepolia)
+CONFIRMATION_BUCKETS = (1.0, 2.0, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+NO_OPERATION = '-'
+
+# Operación de servicio en curso (p. ej. purchase_product_on_blockchain). contextvars
+# funciona igual en hilos WSGI que en tareas asyncio
+_operation = contextvars.ContextVar('blockchain_operation', default=NO_OPERATION)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'errors')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds, error):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+
+class Metrics:
+    """Contadores e histogramas del proceso, en memoria.
+
+    Registrar una muestra es un bisect y unas sumas bajo un lock, así que se
+    puede dejar activo en producción. Cada worker tiene sus propias métricas:
+    el scraper debe consultar cada proceso (o agregar por instancia).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, name, labels, seconds, error=False, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = _Histogram(buckets)
+            histogram.observe(seconds, error)
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                (name, labels, h.buckets, list(h.counts), h.sum, h.count, h.errors)
+                for (name, labels), h in sorted(self._series.items())
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+metrics = Metrics()
+
+_HELP = {
+    'blockchain_rpc': 'Peticiones JSON-RPC por método y operación de servicio que las origina',
+    'blockchain_operation': 'Operaciones de los servicios blockchain',
+    'blockchain_order_confirmation': 'Tiempo desde la compra hasta que el recibo de la orden está en un bloque',
+}
+
+
+def _enabled():
+    return getattr(settings, 'BLOCKCHAIN_METRICS_ENABLED', True)
+
+
+def current_operation():
+    return _operation.get()
+
+
+def observe_rpc(methods, seconds, error=False):
+    """Registrar una petición (o un lote) JSON-RPC; en un lote cada método cuenta la latencia del lote"""
+    if not _enabled():
+        return
+    operation = _operation.get()
+    for method in methods:
+        metrics.observe('blockchain_rpc', (('method', method), ('operation', operation)), seconds, error)
+
+
+def observe_confirmation(seconds, estado):
+    if _enabled():
+        metrics.observe(
+            'blockchain_order_confirmation', (('estado', estado),), max(seconds, 0.0),
+            buckets=CONFIRMATION_BUCKETS,
+        )
+
+
+def instrumented(fn=None, name=None):
+    """Decorador: atribuye las llamadas RPC del método a su nombre y mide su duración.
+
+    Si ya hay una operación en curso (un método instrumentado que llama a otro)
+    se conserva la exterior, que es la que ve el usuario.
+    """
+    def decorate(fn):
+        operation = name or fn.__name__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _operation.get() != NO_OPERATION:
+                    return await fn(*args, **kwargs)
+                token = _operation.set(operation)
+                start = time.perf_counter()
+                error = True
+                try:
+                    result = await fn(*args, **kwargs)
+                    error = False
+                    return result
+                finally:
+                    _operation.reset(token)
+                    if _enabled():
+                        metrics.observe('blockchain_operation', (('operation', operation),),
+                                        time.perf_counter() - start, error)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _operation.get() != NO_OPERATION:
+                return fn(*args, **kwargs)
+            token = _operation.set(operation)
+            start = time.perf_counter()
+            error = True
+            try:
+                result = fn(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                _operation.reset(token)
+                if _enabled():
+                    metrics.observe('blockchain_operation', (('operation', operation),), time.perf_counter() - start, error)
+        return wrapper
+
+    return decorate(fn) if fn is not None else decorate
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}' if items else ''
+
+
+def _format_le(bound):
+    return f"{bound:g}"
+
+
+def render_text():
+    """Métricas en el formato de texto de Prometheus (version 0.0.4)"""
+    lines = []
+    by_name = {}
+    for name, labels, buckets, counts, total, count, errors in metrics.snapshot():
+        by_name.setdefault(name, []).append((labels, buckets, counts, total, count, errors))
+
+    for name, series in by_name.items():
+        help_text = _HELP.get(name, name)
+        lines.append(f"# HELP {name}_total {help_text} (total)")
+        lines.append(f"# TYPE {name}_total counter")
+        for labels, _, _, _, count, _ in series:
+            lines.append(f"{name}_total{_labels(labels)} {count}")
+
+        lines.append(f"# HELP {name}_errors_total {help_text} (con error)")
+        lines.append(f"# TYPE {name}_errors_total counter")
+        for labels, _, _, _, _, errors in series:
+            lines.append(f"{name}_errors_total{_labels(labels)} {errors}")
+
+        lines.append(f"# HELP {name}_seconds {help_text} (latencia)")
+        lines.append(f"# TYPE {name}_seconds histogram")
+        for labels, buckets, counts, total, count, _ in series:
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_seconds_bucket{_labels(labels, [('le', _format_le(bound))])} {cumulative}")
+            lines.append(f"{name}_seconds_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_seconds_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_seconds_count{_labels(labels)} {count}")
+    return '\n'.join(lines) + '\n'
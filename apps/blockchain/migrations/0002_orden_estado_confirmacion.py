@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:12
+
+from django.db import migrations, models
+from django.db.models import Q
+
+# Mismo criterio que confirmer.TX_HASH_RE (el confirmador añade el 0x que falte)
+HASH_REAL = r'^(0x)?[0-9a-fA-F]{64}$'
+
+
+def estado_ordenes_existentes(apps, schema_editor):
+    """Órdenes anteriores al confirmador en segundo plano.
+
+    Sin hash o con un hash simulado (modo fallback) nunca tendrán recibo: pasan a
+    'fallida', como las marca el confirmador. Las de hash real siguen 'pendiente'
+    y el siguiente barrido las confirma con su bloque y gas.
+    """
+    BlockchainOrden = apps.get_model('blockchain', 'BlockchainOrden')
+    BlockchainOrden.objects.filter(
+        Q(blockchain_tx_hash__isnull=True) | ~Q(blockchain_tx_hash__regex=HASH_REAL)
+    ).update(estado='fallida')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blockchainorden',
+            name='block_number',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='blockchainorden',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('confirmada', 'Confirmada'), ('fallida', 'Fallida')], default='pendiente', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='blockchainorden',
+            name='fecha_confirmacion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='blockchainorden',
+            name='gas_used',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(estado_ordenes_existentes, migrations.RunPython.noop),
+    ]
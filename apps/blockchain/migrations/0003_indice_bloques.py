@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0002_orden_estado_confirmacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloqueIndexado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block_number', models.BigIntegerField(unique=True)),
+                ('block_hash', models.CharField(max_length=66, unique=True)),
+                ('parent_hash', models.CharField(max_length=66)),
+                ('timestamp', models.BigIntegerField()),
+                ('tx_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CheckpointIndexador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('block_number', models.BigIntegerField()),
+                ('block_hash', models.CharField(max_length=66)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TransaccionIndexada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tx_hash', models.CharField(max_length=66, unique=True)),
+                ('block_number', models.BigIntegerField()),
+                ('tx_index', models.IntegerField()),
+                ('from_address', models.CharField(db_index=True, max_length=42)),
+                ('to_address', models.CharField(blank=True, db_index=True, max_length=42, null=True)),
+                ('value_wei', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('gas_price_wei', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('gas_used', models.BigIntegerField(blank=True, null=True)),
+                ('status', models.SmallIntegerField(blank=True, null=True)),
+                ('timestamp', models.BigIntegerField()),
+                ('bloque', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transacciones', to='blockchain.bloqueindexado')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-block_number', '-tx_index'], name='tx_idx_bloque_desc')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0003_indice_bloques'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompraOnChain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purchase_id', models.BigIntegerField(unique=True)),
+                ('product_id', models.BigIntegerField(db_index=True)),
+                ('comprador', models.CharField(db_index=True, max_length=42)),
+                ('cantidad', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('total_wei', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('product_data', models.TextField(blank=True)),
+                ('tx_hash', models.CharField(db_index=True, max_length=66)),
+                ('block_number', models.BigIntegerField()),
+                ('log_index', models.IntegerField()),
+                ('timestamp', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductoOnChain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(unique=True)),
+                ('nombre', models.CharField(max_length=200)),
+                ('precio_wei', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('stock', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('creador', models.CharField(max_length=42)),
+                ('tx_hash', models.CharField(db_index=True, max_length=66)),
+                ('block_number', models.BigIntegerField()),
+                ('timestamp', models.BigIntegerField()),
+                ('actualizado_en_bloque', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def inicializar_resumen(apps, schema_editor):
+    """Calcular el resumen de los datos existentes; a partir de aquí se mantiene en cada escritura.
+
+    Agregación copiada de sales_summary.calcular_resumen sobre los modelos
+    históricos, para que la migración no dependa del código actual.
+    """
+    Producto = apps.get_model('blockchain', 'BlockchainProducto')
+    Orden = apps.get_model('blockchain', 'BlockchainOrden')
+    ResumenVentas = apps.get_model('blockchain', 'ResumenVentas')
+    ResumenProducto = apps.get_model('blockchain', 'ResumenProducto')
+    ResumenVendedor = apps.get_model('blockchain', 'ResumenVendedor')
+
+    en_cadena = Q(blockchain_tx_hash__isnull=False) & ~Q(blockchain_tx_hash='')
+    ventas = dict(ordenes=Count('id'), unidades=Sum('cantidad'), total_ventas=Sum('total_pagado'))
+
+    globales = {
+        **Producto.objects.aggregate(total_productos=Count('id'), productos_blockchain=Count('id', filter=en_cadena)),
+        **Orden.objects.aggregate(
+            total_ordenes=Count('id'), ordenes_blockchain=Count('id', filter=en_cadena), total_ventas=Sum('total_pagado')
+        ),
+    }
+    globales['total_ventas'] = globales['total_ventas'] or 0
+    ResumenVentas.objects.create(pk=1, **globales)
+
+    ResumenProducto.objects.bulk_create([
+        ResumenProducto(producto_id=row.pop('producto_id'), **row)
+        for row in Orden.objects.values('producto_id').annotate(**ventas).order_by()
+    ], batch_size=500)
+
+    por_vendedor = {
+        row['vendedor_id']: ResumenVendedor(vendedor_id=row['vendedor_id'], productos=row['productos'])
+        for row in Producto.objects.values('vendedor_id').annotate(productos=Count('id')).order_by()
+    }
+    for row in Orden.objects.values('producto__vendedor_id').annotate(**ventas).order_by():
+        resumen = por_vendedor[row['producto__vendedor_id']]
+        resumen.ordenes, resumen.unidades, resumen.total_ventas = row['ordenes'], row['unidades'], row['total_ventas']
+    ResumenVendedor.objects.bulk_create(por_vendedor.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blockchain', '0004_eventos_ecommerce'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='blockchain.blockchainproducto')),
+                ('ordenes', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenVendedor',
+            fields=[
+                ('vendedor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_ventas', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('productos', models.IntegerField(default=0)),
+                ('ordenes', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_productos', models.IntegerField(default=0)),
+                ('productos_blockchain', models.IntegerField(default=0)),
+                ('total_ordenes', models.IntegerField(default=0)),
+                ('ordenes_blockchain', models.IntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+        ),
+        migrations.RunPython(inicializar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0005_resumen_ventas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blockchainorden',
+            index=models.Index(fields=['-fecha_compra'], name='orden_bc_fecha_desc'),
+        ),
+        migrations.AddIndex(
+            model_name='blockchainorden',
+            index=models.Index(fields=['estado', 'id'], name='orden_bc_estado_id'),
+        ),
+        migrations.AddIndex(
+            model_name='blockchainorden',
+            index=models.Index(fields=['blockchain_tx_hash'], name='orden_bc_tx_hash'),
+        ),
+        migrations.AddIndex(
+            model_name='blockchainproducto',
+            index=models.Index(fields=['blockchain_tx_hash'], name='producto_bc_tx_hash'),
+        ),
+    ]
@@ -1,7 +1,41 @@
 # apps/blockchain/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 
+NUEVO = object()
+
+
+def recordar_guardado(instance, valores=None):
+    """Recordar los campos del resumen tal como están en la BD (tras cargar o guardar la fila)"""
+    if valores is None:
+        valores = {c: instance.__dict__[c] for c in instance.CAMPOS_RESUMEN if c in instance.__dict__}
+    instance._guardado = valores
+
+
+def valores_anteriores(instance):
+    """Campos del resumen guardados en la BD antes de este save() (NUEVO si la fila no existe)"""
+    if instance._state.adding:
+        return NUEVO
+    valores = dict(instance.__dict__.get('_guardado', {}))
+    faltan = [c for c in instance.CAMPOS_RESUMEN if c not in valores]
+    if faltan:
+        # Campos diferidos al cargar: se consultan los valores actuales
+        fila = type(instance)._base_manager.filter(pk=instance.pk).values(*faltan).first()
+        valores.update(fila or dict.fromkeys(faltan))
+    return valores
+
+
+def valores_guardados(instance, anterior, update_fields=None):
+    """Campos del resumen tal como quedan en la BD después de save(update_fields=...)"""
+    if update_fields is not None:
+        update_fields = {instance._meta.get_field(nombre).attname for nombre in update_fields}
+    valores = {}
+    for campo in instance.CAMPOS_RESUMEN:
+        escrito = campo in instance.__dict__ and (update_fields is None or campo in update_fields)
+        # Un campo diferido o fuera de update_fields no se escribe: conserva el valor anterior
+        valores[campo] = instance.__dict__[campo] if escrito or anterior is NUEVO else anterior[campo]
+    return valores
+
 class BlockchainProducto(models.Model):
     nombre = models.CharField(max_length=200)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
@@ -11,16 +45,186 @@ class BlockchainProducto(models.Model):
     blockchain_tx_hash = models.CharField(max_length=100, blank=True, null=True)  # ¡ESTE CAMPO!
     blockchain_product_id = models.IntegerField(blank=True, null=True)
     
+    # Campos de los que depende el resumen de ventas (sales_summary.py)
+    CAMPOS_RESUMEN = ('vendedor_id', 'blockchain_tx_hash')
+    
+    class Meta:
+        indexes = [
+            # Conciliación por hash de registro (indexar_eventos, registro en bloque)
+            models.Index(fields=['blockchain_tx_hash'], name='producto_bc_tx_hash'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores guardados: save() detecta si el producto pasa a estar en blockchain
+        recordar_guardado(instance)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # El resumen de ventas se actualiza en la misma transacción que la fila
+        from .sales_summary import producto_guardado
+        with transaction.atomic(using=kwargs.get('using')):
+            anterior = valores_anteriores(self)
+            super().save(*args, **kwargs)
+            actual = valores_guardados(self, anterior, kwargs.get('update_fields'))
+            producto_guardado(self, anterior, actual)
+        recordar_guardado(self, actual)
+    
     def __str__(self):
         return self.nombre
 
 class BlockchainOrden(models.Model):
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('confirmada', 'Confirmada'),
+        ('fallida', 'Fallida')
+    ]
+    
     producto = models.ForeignKey(BlockchainProducto, on_delete=models.CASCADE)
     comprador = models.ForeignKey(User, on_delete=models.CASCADE)
     cantidad = models.IntegerField(default=1)
     total_pagado = models.DecimalField(max_digits=10, decimal_places=2)
     fecha_compra = models.DateTimeField(auto_now_add=True)
     blockchain_tx_hash = models.CharField(max_length=100, blank=True, null=True)  # ¡Y ESTE!
+    # Estado on-chain: lo actualiza el confirmador en segundo plano (ver confirmer.py)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    block_number = models.BigIntegerField(blank=True, null=True)
+    gas_used = models.BigIntegerField(blank=True, null=True)
+    fecha_confirmacion = models.DateTimeField(blank=True, null=True)
+    
+    CAMPOS_RESUMEN = ('producto_id', 'cantidad', 'total_pagado', 'blockchain_tx_hash')
+    
+    class Meta:
+        indexes = [
+            # Órdenes recientes del dashboard: order_by('-fecha_compra')[:10] sin ordenar la tabla
+            models.Index(fields=['-fecha_compra'], name='orden_bc_fecha_desc'),
+            # Barrido del confirmador: estado='pendiente' paginado por id
+            models.Index(fields=['estado', 'id'], name='orden_bc_estado_id'),
+            # Conciliación de recibos por hash de transacción
+            models.Index(fields=['blockchain_tx_hash'], name='orden_bc_tx_hash'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        recordar_guardado(instance)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        from .sales_summary import orden_guardada
+        with transaction.atomic(using=kwargs.get('using')):
+            anterior = valores_anteriores(self)
+            super().save(*args, **kwargs)
+            actual = valores_guardados(self, anterior, kwargs.get('update_fields'))
+            orden_guardada(self, anterior, actual)
+        recordar_guardado(self, actual)
+    
+    def __str__(self):
+        return f"Orden #{self.id}"
+
+class BloqueIndexado(models.Model):
+    """Bloque ingerido por el indexador (ver indexer.py)"""
+    block_number = models.BigIntegerField(unique=True)
+    block_hash = models.CharField(max_length=66, unique=True)
+    parent_hash = models.CharField(max_length=66)
+    timestamp = models.BigIntegerField()
+    tx_count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"Bloque #{self.block_number}"
+
+class TransaccionIndexada(models.Model):
+    """Transacción (con datos de su recibo) ingerida por el indexador"""
+    tx_hash = models.CharField(max_length=66, unique=True)
+    bloque = models.ForeignKey(BloqueIndexado, on_delete=models.CASCADE, related_name='transacciones')
+    block_number = models.BigIntegerField()
+    tx_index = models.IntegerField()
+    from_address = models.CharField(max_length=42, db_index=True)
+    to_address = models.CharField(max_length=42, blank=True, null=True, db_index=True)
+    value_wei = models.DecimalField(max_digits=78, decimal_places=0)
+    gas_price_wei = models.DecimalField(max_digits=78, decimal_places=0)
+    gas_used = models.BigIntegerField(blank=True, null=True)
+    status = models.SmallIntegerField(blank=True, null=True)
+    timestamp = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-block_number', '-tx_index'], name='tx_idx_bloque_desc'),
+        ]
+    
+    def __str__(self):
+        return self.tx_hash
+
+class CheckpointIndexador(models.Model):
+    """Último bloque ingerido por cada indexador, para poder reanudar"""
+    nombre = models.CharField(max_length=50, unique=True)
+    block_number = models.BigIntegerField()
+    block_hash = models.CharField(max_length=66)
+    actualizado = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.nombre} @ {self.block_number}"
+
+class ProductoOnChain(models.Model):
+    """Estado de un producto del contrato ECommerce, reconstruido desde sus eventos"""
+    product_id = models.BigIntegerField(unique=True)
+    nombre = models.CharField(max_length=200)
+    precio_wei = models.DecimalField(max_digits=78, decimal_places=0)
+    stock = models.DecimalField(max_digits=78, decimal_places=0)
+    creador = models.CharField(max_length=42)
+    tx_hash = models.CharField(max_length=66, db_index=True)
+    block_number = models.BigIntegerField()
+    timestamp = models.BigIntegerField()
+    actualizado_en_bloque = models.BigIntegerField()
+    
+    def __str__(self):
+        return f"{self.nombre} (#{self.product_id})"
+
+class CompraOnChain(models.Model):
+    """Evento ProductPurchased del contrato ECommerce"""
+    purchase_id = models.BigIntegerField(unique=True)
+    product_id = models.BigIntegerField(db_index=True)
+    comprador = models.CharField(max_length=42, db_index=True)
+    cantidad = models.DecimalField(max_digits=78, decimal_places=0)
+    total_wei = models.DecimalField(max_digits=78, decimal_places=0)
+    product_data = models.TextField(blank=True)
+    tx_hash = models.CharField(max_length=66, db_index=True)
+    block_number = models.BigIntegerField()
+    log_index = models.IntegerField()
+    timestamp = models.BigIntegerField()
+    
+    def __str__(self):
+        return f"Compra on-chain #{self.purchase_id}"
+
+class ResumenVentas(models.Model):
+    """Totales del dashboard, mantenidos en cada escritura (ver sales_summary.py): una sola fila"""
+    total_productos = models.IntegerField(default=0)
+    productos_blockchain = models.IntegerField(default=0)
+    total_ordenes = models.IntegerField(default=0)
+    ordenes_blockchain = models.IntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.total_ordenes} órdenes, {self.total_ventas} en ventas"
+
+class ResumenProducto(models.Model):
+    """Ventas acumuladas de un producto"""
+    producto = models.OneToOneField(BlockchainProducto, on_delete=models.CASCADE, primary_key=True, related_name='resumen')
+    ordenes = models.IntegerField(default=0)
+    unidades = models.IntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"Resumen de {self.producto_id}"
+
+class ResumenVendedor(models.Model):
+    """Productos y ventas acumuladas de un vendedor"""
+    vendedor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='resumen_ventas')
+    productos = models.IntegerField(default=0)
+    ordenes = models.IntegerField(default=0)
+    unidades = models.IntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     
     def __str__(self):
-        return f"Orden #{self.id}"
\ No newline at end of file
+        return f"Resumen del vendedor {self.vendedor_id}"
@@ -0,0 +1,185 @@
+# apps/blockchain/nonce_manager.py
+import asyncio
+import threading
+
+import aiohttp
+import requests
+from web3 import AsyncWeb3
+from web3.exceptions import BadResponseFormat, Web3Exception
+
+from .providers import not_sent
+
+# Fragmentos de los mensajes que devuelven Ganache, Hardhat y Geth cuando el nonce no cuadra
+NONCE_ERROR_MARKERS = (
+    'nonce too low',
+    'nonce too high',
+    'nonce has already been used',
+    'incorrect nonce',
+    'invalid nonce',
+    'replacement transaction underpriced',
+)
+
+
+def is_nonce_error(error):
+    """Detectar si una excepción del nodo se debe a un nonce desincronizado"""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+def is_rejected(error):
+    """El nonce no se consumió: el nodo respondió con un error o la petición no llegó a salir.
+
+    Tras un timeout de lectura, una desconexión o una respuesta ilegible el nodo
+    pudo aceptar la transacción, así que su nonce no se puede reutilizar.
+    """
+    if isinstance(error, (requests.RequestException, aiohttp.ClientError, asyncio.TimeoutError, OSError)):
+        return not_sent(error)
+    if isinstance(error, BadResponseFormat):
+        return False
+    # web3 lanza ValueError con el error JSON-RPC del nodo; el resto son validaciones locales
+    return isinstance(error, (ValueError, TypeError, Web3Exception))
+
+
+class NonceManager:
+    """Asignador de nonces en proceso para una cuenta emisora.
+
+    Solo consulta la cadena al arrancar, tras un error de nonce o cuando
+    detecta un hueco; el resto de asignaciones no cuestan ningún RPC.
+    """
+
+    def __init__(self, w3, address):
+        self.w3 = w3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next_nonce = None
+        self._needs_resync = True
+
+    def _sync_locked(self):
+        # 'pending' incluye las transacciones que ya están en el mempool del nodo
+        self._next_nonce = self.w3.eth.get_transaction_count(self.address, 'pending')
+        self._needs_resync = False
+
+    def resync(self):
+        """Forzar la resincronización con la cadena"""
+        with self._lock:
+            self._sync_locked()
+            return self._next_nonce
+
+    def next_nonce(self):
+        """Reservar el siguiente nonce libre"""
+        with self._lock:
+            if self._needs_resync:
+                self._sync_locked()
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def reserve(self, count):
+        """Reservar `count` nonces consecutivos para un envío en bloque; devuelve el primero"""
+        with self._lock:
+            if self._needs_resync:
+                self._sync_locked()
+            start = self._next_nonce
+            self._next_nonce += count
+            return start
+
+    async def aresync(self, async_w3):
+        """Resincronizar desde un AsyncWeb3 (sin bloquear el event loop)"""
+        chain_nonce = await async_w3.eth.get_transaction_count(self.address, 'pending')
+        with self._lock:
+            self._next_nonce = chain_nonce
+            self._needs_resync = False
+            return chain_nonce
+
+    async def anext_nonce(self, async_w3):
+        """Versión asyncio de next_nonce"""
+        if self._needs_resync:
+            chain_nonce = await async_w3.eth.get_transaction_count(self.address, 'pending')
+            with self._lock:
+                # Otra corrutina o hilo pudo resincronizar mientras esperábamos
+                if self._needs_resync:
+                    self._next_nonce = chain_nonce
+                    self._needs_resync = False
+        with self._lock:
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def release(self, nonce):
+        """Devolver un nonce que no llegó a enviarse"""
+        self.release_range(nonce, 1)
+
+    def release_range(self, start, count):
+        """Devolver `count` nonces consecutivos desde `start` que no llegaron a enviarse"""
+        with self._lock:
+            if self._next_nonce is not None and start + count == self._next_nonce:
+                self._next_nonce = start
+            else:
+                # Ya se repartieron nonces posteriores: queda un hueco en la secuencia
+                self._needs_resync = True
+
+    def invalidate(self):
+        """Resincronizar en la próxima asignación (no se sabe qué nonces llegaron al nodo)"""
+        with self._lock:
+            self._needs_resync = True
+
+    def send(self, send_fn, retries=1):
+        """Ejecutar send_fn(nonce) gestionando el nonce y reintentando si el nodo lo rechaza"""
+        for attempt in range(retries + 1):
+            nonce = self.next_nonce()
+            try:
+                return send_fn(nonce)
+            except Exception as e:
+                if is_nonce_error(e):
+                    print(f"🔁 Nonce {nonce} rechazado para {self.address}, resincronizando: {e}")
+                    self.resync()
+                    if attempt < retries:
+                        continue
+                elif is_rejected(e):
+                    self.release(nonce)
+                else:
+                    print(f"⚠️  No se sabe si la transacción con nonce {nonce} llegó al nodo, resincronizando: {e}")
+                    self.invalidate()
+                raise
+
+    async def asend(self, async_w3, send_fn, retries=1):
+        """Versión asyncio de send: `send_fn(nonce)` debe ser una corrutina"""
+        for attempt in range(retries + 1):
+            nonce = await self.anext_nonce(async_w3)
+            try:
+                return await send_fn(nonce)
+            except Exception as e:
+                if is_nonce_error(e):
+                    print(f"🔁 Nonce {nonce} rechazado para {self.address}, resincronizando: {e}")
+                    await self.aresync(async_w3)
+                    if attempt < retries:
+                        continue
+                elif is_rejected(e):
+                    self.release(nonce)
+                else:
+                    print(f"⚠️  No se sabe si la transacción con nonce {nonce} llegó al nodo, resincronizando: {e}")
+                    self.invalidate()
+                raise
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_nonce_manager(w3, address):
+    """Obtener el NonceManager compartido del proceso para (endpoint, cuenta).
+
+    Los servicios síncronos y los AsyncWeb3 del mismo endpoint comparten el
+    mismo contador, así que no se pisan aunque convivan en un worker ASGI.
+    """
+    endpoint = getattr(w3.provider, 'endpoint_uri', None) or repr(w3.provider)
+    key = (str(endpoint), address.lower())
+    is_async = isinstance(w3, AsyncWeb3)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = NonceManager(None if is_async else w3, address)
+            _managers[key] = manager
+        elif manager.w3 is None and not is_async:
+            manager.w3 = w3
+        return manager
@@ -0,0 +1,649 @@
+# apps/blockchain/providers.py
+import asyncio
+import json
+import threading
+import time
+import weakref
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+from web3 import AsyncWeb3, Web3
+
+from .metrics import observe_rpc
+
+# Contadores del pool compartido: peticiones HTTP frente a conexiones TCP/TLS nuevas
+_stats = {
+    'requests': 0,
+    'new_connections': 0,
+    'async_requests': 0,
+    'async_new_connections': 0,
+    'async_reused_connections': 0,
+    'coalesced_requests': 0,
+    'async_coalesced_requests': 0,
+}
+_stats_lock = threading.Lock()
+
+_sessions = {}
+_session_lock = threading.Lock()
+_async_sessions = weakref.WeakKeyDictionary()
+# El loop solo guarda referencias débiles a sus generadores asíncronos
+_async_closers = {}
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _CountingConnectionMixin:
+    # connect() se llama una vez por socket abierto (también al reconectar)
+    def connect(self):
+        _count('new_connections')
+        return super().connect()
+
+
+class CountingHTTPConnection(_CountingConnectionMixin, HTTPConnection):
+    pass
+
+
+class CountingHTTPSConnection(_CountingConnectionMixin, HTTPSConnection):
+    pass
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CountingHTTPConnection
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CountingHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter que cuenta peticiones y conexiones nuevas del pool"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        _count('requests')
+        return super().send(request, **kwargs)
+
+
+def _build_session(retries):
+    pool_size = _setting('BLOCKCHAIN_HTTP_POOL_SIZE', 20)
+    # Solo se reintentan errores de conexión y respuestas 429/503, que indican que la
+    # petición no llegó a procesarse. Un timeout de lectura o un 502/504 de un gateway
+    # pueden llegar después de que el nodo aceptara la transacción: reintentarlos la duplicaría
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=_setting('BLOCKCHAIN_HTTP_BACKOFF', 0.2),
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset(['POST']),
+        raise_on_status=False,
+    )
+    adapter = PooledHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(retry=True):
+    """Sesión requests keep-alive compartida por todos los servicios del proceso.
+
+    Con `retry=False` los fallos se devuelven al momento: es la que usa el
+    RPCRouter, que en lugar de reintentar contra el mismo nodo cambia de endpoint.
+    """
+    session = _sessions.get(retry)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(retry)
+            if session is None:
+                retries = _setting('BLOCKCHAIN_HTTP_RETRIES', 3) if retry else 0
+                session = _sessions[retry] = _build_session(retries)
+    return session
+
+
+def get_timeout():
+    """Timeout (conexión, lectura) de las peticiones RPC"""
+    return (
+        _setting('BLOCKCHAIN_HTTP_CONNECT_TIMEOUT', 3.0),
+        _setting('BLOCKCHAIN_HTTP_READ_TIMEOUT', 10.0),
+    )
+
+
+async def _on_connection_create_end(session, context, params):
+    _count('async_new_connections')
+
+
+async def _on_connection_reuseconn(session, context, params):
+    _count('async_reused_connections')
+
+
+async def _on_request_start(session, context, params):
+    _count('async_requests')
+
+
+async def _close_with_loop(loop, session):
+    # Generador asíncrono que nunca termina: al apagar el loop, asyncio.run (y el
+    # loop que abre async_to_sync en cada vista async bajo WSGI) llama a
+    # shutdown_asyncgens(), que lo cierra y con él la sesión y sus conexiones
+    try:
+        yield
+    finally:
+        if _async_sessions.get(loop) is session:
+            del _async_sessions[loop]
+        if _async_closers.get(loop, (None,))[0] is session:
+            del _async_closers[loop]
+        await session.close()
+
+
+async def get_async_session():
+    """Sesión aiohttp compartida para el event loop actual (se cierra cuando el loop se apaga)"""
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(_on_connection_create_end)
+        trace.on_connection_reuseconn.append(_on_connection_reuseconn)
+        trace.on_request_start.append(_on_request_start)
+        connector = aiohttp.TCPConnector(
+            limit=_setting('BLOCKCHAIN_HTTP_POOL_SIZE', 20),
+            keepalive_timeout=30,
+        )
+        connect_timeout, read_timeout = get_timeout()
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout),
+            trace_configs=[trace],
+        )
+        _async_sessions[loop] = session
+        closer = _close_with_loop(loop, session)
+        await closer.asend(None)
+        _async_closers[loop] = (session, closer)
+    return session
+
+
+# Lecturas cuyo resultado pueden compartir llamadas idénticas que coinciden en el tiempo.
+# eth_getTransactionCount queda fuera: el NonceManager necesita la respuesta de su propia petición
+COALESCE_METHODS = frozenset([
+    'web3_clientVersion',
+    'net_version',
+    'eth_chainId',
+    'eth_syncing',
+    'eth_accounts',
+    'eth_blockNumber',
+    'eth_gasPrice',
+    'eth_maxPriorityFeePerGas',
+    'eth_feeHistory',
+    'eth_getBalance',
+    'eth_getCode',
+    'eth_getStorageAt',
+    'eth_call',
+    'eth_estimateGas',
+    'eth_getBlockByNumber',
+    'eth_getBlockByHash',
+    'eth_getTransactionByHash',
+    'eth_getTransactionReceipt',
+    'eth_getLogs',
+])
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    return str(value)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Una sola petición en curso por clave; las llamadas concurrentes esperan su resultado.
+
+    No es una caché: en cuanto la petición termina la clave se libera y la
+    siguiente llamada vuelve a ir al nodo. Sólo se comparten las llamadas que
+    de verdad coinciden en el tiempo, así que el volumen RPC crece con las
+    preguntas distintas y no con los usuarios concurrentes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._async_calls = weakref.WeakKeyDictionary()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            _count('coalesced_requests')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            # También KeyboardInterrupt/SystemExit: sin error, quien espera recibiría None
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key, fn):
+        """Versión asyncio de do(): las llamadas se comparten dentro del mismo event loop.
+
+        La petición corre en su propia tarea, que pertenece al vuelo y no a
+        quien la inició: cancelar a cualquiera de los que esperan (también al
+        primero, p. ej. porque el cliente se desconectó) no cancela a los demás.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.get(loop)
+        if calls is None:
+            calls = self._async_calls[loop] = {}
+        task = calls.get(key)
+        if task is not None:
+            _count('async_coalesced_requests')
+        else:
+            task = calls[key] = loop.create_task(fn())
+
+            def done(t):
+                if calls.get(key) is t:
+                    del calls[key]
+                # Evitar el aviso "exception was never retrieved" si todos dejaron de esperar
+                t.cancelled() or t.exception()
+
+            task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+
+_single_flight = SingleFlight()
+
+
+def _coalesce_key(endpoint_uri, method, params):
+    if method not in COALESCE_METHODS or not _setting('BLOCKCHAIN_RPC_COALESCE', True):
+        return None
+    return (str(endpoint_uri), method, json.dumps(params, sort_keys=True, default=_json_default))
+
+
+def _coalesced(endpoint_uri, method, params, fn):
+    key = _coalesce_key(endpoint_uri, method, params)
+    return fn() if key is None else _single_flight.do(key, fn)
+
+
+async def _acoalesced(endpoint_uri, method, params, fn):
+    key = _coalesce_key(endpoint_uri, method, params)
+    return await fn() if key is None else await _single_flight.ado(key, fn)
+
+
+def _observed(method, start, response):
+    # Un error JSON-RPC (revert, nonce...) también cuenta como error del método
+    observe_rpc((method,), time.perf_counter() - start, isinstance(response, dict) and 'error' in response)
+    return response
+
+
+def _observed_error(method, start):
+    observe_rpc((method,), time.perf_counter() - start, True)
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider que usa la sesión compartida en lugar de una por hilo.
+
+    Las lecturas idénticas concurrentes comparten una sola petición (SingleFlight);
+    se comparte la respuesta en bruto y cada llamada la decodifica por su cuenta.
+    """
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+
+        def send():
+            response = get_session().post(self.endpoint_uri, data=request_data, **self.get_request_kwargs())
+            response.raise_for_status()
+            return response.content
+
+        start = time.perf_counter()
+        try:
+            response = self.decode_rpc_response(_coalesced(self.endpoint_uri, method, params, send))
+        except Exception:
+            _observed_error(method, start)
+            raise
+        return _observed(method, start, response)
+
+
+class PooledAsyncHTTPProvider(AsyncWeb3.AsyncHTTPProvider):
+    """AsyncHTTPProvider que usa la sesión aiohttp compartida del event loop"""
+
+    async def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        session = await get_async_session()
+
+        async def send():
+            async with session.post(self.endpoint_uri, data=request_data, **self.get_request_kwargs()) as response:
+                response.raise_for_status()
+                return await response.read()
+
+        start = time.perf_counter()
+        try:
+            response = self.decode_rpc_response(await _acoalesced(self.endpoint_uri, method, params, send))
+        except Exception:
+            _observed_error(method, start)
+            raise
+        return _observed(method, start, response)
+
+
+# Envíos y lecturas que dependen del mempool o de las cuentas del nodo: siempre al primario
+PRIMARY_METHODS = frozenset([
+    'eth_sendRawTransaction',
+    'eth_sendTransaction',
+    'eth_sign',
+    'eth_signTransaction',
+    'eth_signTypedData_v4',
+    'eth_accounts',
+    'eth_getTransactionCount',
+    'personal_sendTransaction',
+    'personal_unlockAccount',
+])
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class NoHealthyEndpointError(requests.ConnectionError):
+    """Todos los endpoints del router tienen el circuit breaker abierto"""
+
+
+class EndpointHealth:
+    """Latencia y tasa de error (EWMA) de un endpoint y el estado de su circuit breaker"""
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+    def score(self):
+        # Un endpoint sin muestras se prueba primero; los errores encarecen la latencia
+        return (self.latency or 0.0) / max(1.0 - self.error_rate, 0.05)
+
+    def as_dict(self):
+        return {
+            'url': self.url,
+            'state': self.state,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 4),
+            'requests': self.requests,
+            'failures': self.failures,
+        }
+
+
+def not_sent(error):
+    """El error garantiza que la petición no llegó al nodo (no se abrió la conexión)"""
+    if isinstance(error, (requests.ConnectTimeout, aiohttp.ClientConnectorError, NoHealthyEndpointError)):
+        return True
+    # requests envuelve NewConnectionError (conexión rechazada, DNS) en un MaxRetryError
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class RPCRouter:
+    """Reparte las peticiones JSON-RPC entre varios nodos de la misma red.
+
+    Las lecturas van al endpoint sano con menor latencia EWMA (penalizada por
+    su tasa de error) y, si fallan, se repiten en el siguiente. Las escrituras
+    (PRIMARY_METHODS) van al primario; sólo si su breaker está abierto, o la
+    conexión ni siquiera se estableció, pasan al siguiente en orden de
+    configuración. Un endpoint con `failures` fallos seguidos o con una tasa de
+    error por encima de `max_error_rate` abre el breaker durante `cooldown`
+    segundos; después deja pasar una única petición de prueba (half-open).
+    """
+
+    def __init__(self, endpoints, alpha=None, failures=None, max_error_rate=None, cooldown=None):
+        self.endpoints = [EndpointHealth(url) for url in endpoints]
+        self.primary = self.endpoints[0].url
+        self.alpha = alpha or _setting('BLOCKCHAIN_RPC_EWMA_ALPHA', 0.3)
+        self.max_failures = failures or _setting('BLOCKCHAIN_RPC_BREAKER_FAILURES', 3)
+        self.max_error_rate = max_error_rate or _setting('BLOCKCHAIN_RPC_BREAKER_ERROR_RATE', 0.5)
+        self.cooldown = cooldown if cooldown is not None else _setting('BLOCKCHAIN_RPC_BREAKER_COOLDOWN', 30)
+        self._lock = threading.Lock()
+
+    def _available(self, health, now):
+        if health.state == OPEN and now - health.opened_at >= self.cooldown:
+            health.state = HALF_OPEN
+            health.probing = False
+        return health.state == CLOSED or (health.state == HALF_OPEN and not health.probing)
+
+    def _candidates(self, write):
+        now = time.monotonic()
+        with self._lock:
+            candidates = [h for h in self.endpoints if self._available(h, now)]
+        if not write:
+            candidates.sort(key=EndpointHealth.score)
+        return candidates
+
+    def _acquire(self, health):
+        # En half-open sólo una petición a la vez comprueba si el nodo volvió
+        with self._lock:
+            if health.state == OPEN or (health.state == HALF_OPEN and health.probing):
+                return False
+            if health.state == HALF_OPEN:
+                health.probing = True
+            return True
+
+    def _record(self, health, elapsed, ok):
+        with self._lock:
+            health.requests += 1
+            health.latency = elapsed if health.latency is None else (
+                self.alpha * elapsed + (1 - self.alpha) * health.latency
+            )
+            health.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * health.error_rate
+            health.probing = False
+            if ok:
+                health.consecutive_failures = 0
+                if health.state != CLOSED:
+                    health.state = CLOSED
+                    print(f"✅ RPC {health.url}: circuit breaker cerrado")
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.max_failures or (
+                health.requests >= 10 and health.error_rate >= self.max_error_rate
+            ):
+                if health.state != OPEN:
+                    print(f"⚠️  RPC {health.url}: circuit breaker abierto ({health.consecutive_failures} fallos seguidos)")
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    def send(self, methods, send_fn):
+        """Ejecutar `send_fn(url)` en el endpoint que toca para `methods` y devolver su resultado"""
+        write = any(method in PRIMARY_METHODS for method in methods)
+        last_error = None
+        for health in self._candidates(write):
+            if not self._acquire(health):
+                continue
+            start = time.perf_counter()
+            try:
+                result = send_fn(health.url)
+            except requests.RequestException as e:
+                self._record(health, time.perf_counter() - start, False)
+                # Tras un timeout de lectura o una desconexión con el cuerpo ya enviado el nodo
+                # pudo aceptar la transacción: no reenviarla a otro
+                if write and not not_sent(e):
+                    raise
+                last_error = e
+                continue
+            self._record(health, time.perf_counter() - start, True)
+            return result
+        raise last_error or NoHealthyEndpointError(f"Sin endpoints RPC disponibles: {self.urls()}")
+
+    async def asend(self, methods, send_fn):
+        """Versión asyncio de send; `send_fn(url)` es una corrutina"""
+        write = any(method in PRIMARY_METHODS for method in methods)
+        last_error = None
+        for health in self._candidates(write):
+            if not self._acquire(health):
+                continue
+            start = time.perf_counter()
+            try:
+                result = await send_fn(health.url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self._record(health, time.perf_counter() - start, False)
+                if write and not not_sent(e):
+                    raise
+                last_error = e
+                continue
+            self._record(health, time.perf_counter() - start, True)
+            return result
+        raise last_error or NoHealthyEndpointError(f"Sin endpoints RPC disponibles: {self.urls()}")
+
+    def urls(self):
+        return [h.url for h in self.endpoints]
+
+    def stats(self):
+        with self._lock:
+            return {'primary': self.primary, 'endpoints': [h.as_dict() for h in self.endpoints]}
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(endpoint_uri):
+    """Router compartido para `endpoint_uri` como primario, o None si no tiene réplicas.
+
+    BLOCKCHAIN_RPC_ENDPOINTS lista nodos de una misma red; sólo se enruta
+    cuando el endpoint pedido es uno de ellos (Ganache local y Sepolia no se mezclan).
+    """
+    endpoints = _setting('BLOCKCHAIN_RPC_ENDPOINTS', [])
+    endpoint_uri = str(endpoint_uri)
+    if endpoint_uri not in endpoints or len(endpoints) < 2:
+        return None
+    with _routers_lock:
+        router = _routers.get(endpoint_uri)
+        if router is None:
+            router = _routers[endpoint_uri] = RPCRouter(
+                [endpoint_uri] + [url for url in endpoints if url != endpoint_uri]
+            )
+        return router
+
+
+class RoutedHTTPProvider(PooledHTTPProvider):
+    """PooledHTTPProvider que reparte las peticiones con un RPCRouter.
+
+    endpoint_uri sigue siendo el primario, así NonceManager, HeadWatcher y el
+    FeeOracle se comparten igual que sin router.
+    """
+
+    def __init__(self, router, **kwargs):
+        super().__init__(router.primary, **kwargs)
+        self.router = router
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+
+        def send(url):
+            response = get_session(retry=False).post(url, data=request_data, **self.get_request_kwargs())
+            response.raise_for_status()
+            return response.content
+
+        start = time.perf_counter()
+        try:
+            raw_response = _coalesced(self.endpoint_uri, method, params, lambda: self.router.send([method], send))
+            response = self.decode_rpc_response(raw_response)
+        except Exception:
+            _observed_error(method, start)
+            raise
+        return _observed(method, start, response)
+
+
+class RoutedAsyncHTTPProvider(PooledAsyncHTTPProvider):
+    """Versión asyncio de RoutedHTTPProvider"""
+
+    def __init__(self, router, **kwargs):
+        super().__init__(router.primary, **kwargs)
+        self.router = router
+
+    async def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        session = await get_async_session()
+
+        async def send(url):
+            async with session.post(url, data=request_data, **self.get_request_kwargs()) as response:
+                response.raise_for_status()
+                return await response.read()
+
+        start = time.perf_counter()
+        try:
+            raw_response = await _acoalesced(
+                self.endpoint_uri, method, params, lambda: self.router.asend([method], send)
+            )
+            response = self.decode_rpc_response(raw_response)
+        except Exception:
+            _observed_error(method, start)
+            raise
+        return _observed(method, start, response)
+
+
+def get_http_provider(endpoint_uri):
+    """Provider síncrono sobre el pool HTTP compartido (enrutado si el endpoint tiene réplicas)"""
+    router = get_router(endpoint_uri)
+    if router is not None:
+        return RoutedHTTPProvider(router, request_kwargs={'timeout': get_timeout()})
+    return PooledHTTPProvider(endpoint_uri, request_kwargs={'timeout': get_timeout()})
+
+
+def get_async_http_provider(endpoint_uri):
+    """Provider asyncio sobre el pool aiohttp compartido (enrutado si el endpoint tiene réplicas)"""
+    router = get_router(endpoint_uri)
+    if router is not None:
+        return RoutedAsyncHTTPProvider(router)
+    return PooledAsyncHTTPProvider(endpoint_uri)
+
+
+def pool_stats():
+    """Peticiones, conexiones nuevas y reutilizadas del pool compartido"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['reused_connections'] = max(stats['requests'] - stats['new_connections'], 0)
+    stats['reuse_ratio'] = (
+        round(stats['reused_connections'] / stats['requests'], 4) if stats['requests'] else 0.0
+    )
+    with _routers_lock:
+        routers = list(_routers.values())
+    stats['routers'] = [router.stats() for router in routers]
+    return stats
@@ -0,0 +1,213 @@
+# apps/blockchain/sales_summary.py
+from collections import Counter
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import NUEVO, BlockchainOrden, BlockchainProducto, ResumenProducto, ResumenVendedor, ResumenVentas
+
+# Fila única de ResumenVentas
+RESUMEN_GLOBAL = 1
+CAMPOS_GLOBALES = ('total_productos', 'productos_blockchain', 'total_ordenes', 'ordenes_blockchain', 'total_ventas')
+# Mismo criterio que 'on_blockchain' en la serialización: hash presente y no vacío
+EN_CADENA = Q(blockchain_tx_hash__isnull=False) & ~Q(blockchain_tx_hash='')
+CENTIMOS = Decimal('0.01')
+
+
+def _incrementar(model, pk, crear=True, **deltas):
+    """UPDATE campo = campo + delta sobre una fila del resumen; la crea la primera vez"""
+    deltas = {campo: delta for campo, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    expresiones = {campo: F(campo) + delta for campo, delta in deltas.items()}
+    if model.objects.filter(pk=pk).update(**expresiones) or not crear:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(pk=pk, **deltas)
+    except IntegrityError:
+        # Otra petición creó la fila entre el UPDATE y el INSERT
+        model.objects.filter(pk=pk).update(**expresiones)
+
+
+def productos_creados(productos):
+    """Sumar productos nuevos; llamar en la misma transacción que su bulk_create (save() ya lo hace)"""
+    productos = list(productos)
+    _incrementar(
+        ResumenVentas, RESUMEN_GLOBAL,
+        total_productos=len(productos),
+        productos_blockchain=sum(1 for p in productos if p.blockchain_tx_hash),
+    )
+    for vendedor_id, n in Counter(p.vendedor_id for p in productos).items():
+        _incrementar(ResumenVendedor, vendedor_id, productos=n)
+
+
+def productos_actualizados(anteriores, productos):
+    """Tras un bulk_update de blockchain_tx_hash: `anteriores` son los hashes previos, en el mismo orden"""
+    delta = sum(bool(p.blockchain_tx_hash) - bool(a) for a, p in zip(anteriores, productos))
+    _incrementar(ResumenVentas, RESUMEN_GLOBAL, productos_blockchain=delta)
+
+
+def producto_guardado(producto, anterior, actual):
+    """Tras save(): `anterior` y `actual` son los campos del resumen antes y después (models.valores_guardados)"""
+    if anterior is NUEVO:
+        productos_creados([producto])
+        return
+    delta = bool(actual['blockchain_tx_hash']) - bool(anterior['blockchain_tx_hash'])
+    _incrementar(ResumenVentas, RESUMEN_GLOBAL, productos_blockchain=delta)
+    if actual['vendedor_id'] != anterior['vendedor_id']:
+        # El producto cambia de vendedor y se lleva sus ventas (ResumenProducto ya las tiene sumadas)
+        ventas = ResumenProducto.objects.filter(pk=producto.pk).values('ordenes', 'unidades', 'total_ventas').first() or {}
+        _incrementar(ResumenVendedor, anterior['vendedor_id'], crear=False, productos=-1,
+                     **{campo: -valor for campo, valor in ventas.items()})
+        _incrementar(ResumenVendedor, actual['vendedor_id'], productos=1, **ventas)
+
+
+def _vendedor_de(producto_id):
+    return BlockchainProducto.objects.filter(pk=producto_id).values_list('vendedor_id', flat=True).first()
+
+
+def orden_guardada(orden, anterior, actual):
+    """Tras save(): aplica la diferencia entre los campos del resumen antes y después"""
+    total = Decimal(str(actual['total_pagado']))
+    if anterior is NUEVO:
+        _incrementar(ResumenVentas, RESUMEN_GLOBAL, total_ordenes=1,
+                     ordenes_blockchain=bool(actual['blockchain_tx_hash']), total_ventas=total)
+        _incrementar(ResumenProducto, orden.producto_id, ordenes=1, unidades=actual['cantidad'], total_ventas=total)
+        _incrementar(ResumenVendedor, orden.producto.vendedor_id,
+                     ordenes=1, unidades=actual['cantidad'], total_ventas=total)
+        return
+
+    total_anterior = Decimal(str(anterior['total_pagado']))
+    _incrementar(
+        ResumenVentas, RESUMEN_GLOBAL,
+        ordenes_blockchain=bool(actual['blockchain_tx_hash']) - bool(anterior['blockchain_tx_hash']),
+        total_ventas=total - total_anterior,
+    )
+    if anterior['producto_id'] == actual['producto_id']:
+        unidades = actual['cantidad'] - anterior['cantidad']
+        if unidades or total != total_anterior:
+            _incrementar(ResumenProducto, orden.producto_id, unidades=unidades, total_ventas=total - total_anterior)
+            _incrementar(ResumenVendedor, orden.producto.vendedor_id,
+                         unidades=unidades, total_ventas=total - total_anterior)
+        return
+
+    # Orden movida a otro producto: se resta del anterior (y su vendedor) y se suma al actual
+    _incrementar(ResumenProducto, anterior['producto_id'], crear=False,
+                 ordenes=-1, unidades=-anterior['cantidad'], total_ventas=-total_anterior)
+    vendedor_id = _vendedor_de(anterior['producto_id'])
+    if vendedor_id is not None:
+        _incrementar(ResumenVendedor, vendedor_id, crear=False,
+                     ordenes=-1, unidades=-anterior['cantidad'], total_ventas=-total_anterior)
+    _incrementar(ResumenProducto, orden.producto_id, ordenes=1, unidades=actual['cantidad'], total_ventas=total)
+    _incrementar(ResumenVendedor, orden.producto.vendedor_id, ordenes=1, unidades=actual['cantidad'], total_ventas=total)
+
+
+@receiver(post_delete, sender=BlockchainProducto)
+def _producto_borrado(sender, instance, **kwargs):
+    # post_delete se envía dentro de la transacción del borrado (también en cascada)
+    _incrementar(ResumenVentas, RESUMEN_GLOBAL, crear=False,
+                 total_productos=-1, productos_blockchain=-bool(instance.blockchain_tx_hash))
+    _incrementar(ResumenVendedor, instance.vendedor_id, crear=False, productos=-1)
+
+
+@receiver(post_delete, sender=BlockchainOrden)
+def _orden_borrada(sender, instance, **kwargs):
+    total = Decimal(str(instance.total_pagado))
+    _incrementar(ResumenVentas, RESUMEN_GLOBAL, crear=False, total_ordenes=-1,
+                 ordenes_blockchain=-bool(instance.blockchain_tx_hash), total_ventas=-total)
+    _incrementar(ResumenProducto, instance.producto_id, crear=False,
+                 ordenes=-1, unidades=-instance.cantidad, total_ventas=-total)
+    # En cascada el producto se borra después de sus órdenes: aún se puede consultar
+    vendedor_id = _vendedor_de(instance.producto_id)
+    if vendedor_id is not None:
+        _incrementar(ResumenVendedor, vendedor_id, crear=False,
+                     ordenes=-1, unidades=-instance.cantidad, total_ventas=-total)
+
+
+def leer_resumen():
+    """Totales del dashboard: una consulta por clave primaria, sin importar el historial"""
+    resumen = ResumenVentas.objects.filter(pk=RESUMEN_GLOBAL).values(*CAMPOS_GLOBALES).first()
+    return resumen or dict.fromkeys(CAMPOS_GLOBALES, 0)
+
+
+async def aleer_resumen():
+    resumen = await ResumenVentas.objects.filter(pk=RESUMEN_GLOBAL).values(*CAMPOS_GLOBALES).afirst()
+    return resumen or dict.fromkeys(CAMPOS_GLOBALES, 0)
+
+
+def _centimos(value):
+    return Decimal(value or 0).quantize(CENTIMOS)
+
+
+def calcular_resumen(Producto=BlockchainProducto, Orden=BlockchainOrden):
+    """Recalcular todo desde las tablas de productos y órdenes; devuelve (global, por producto, por vendedor)"""
+    globales = {
+        **Producto.objects.aggregate(total_productos=Count('id'), productos_blockchain=Count('id', filter=EN_CADENA)),
+        **Orden.objects.aggregate(
+            total_ordenes=Count('id'), ordenes_blockchain=Count('id', filter=EN_CADENA), total_ventas=Sum('total_pagado')
+        ),
+    }
+    globales['total_ventas'] = _centimos(globales['total_ventas'])
+
+    por_producto = {
+        row['producto_id']: {
+            'ordenes': row['ordenes'], 'unidades': row['unidades'], 'total_ventas': _centimos(row['total_ventas'])
+        }
+        for row in Orden.objects.values('producto_id').annotate(
+            ordenes=Count('id'), unidades=Sum('cantidad'), total_ventas=Sum('total_pagado')
+        ).order_by()
+    }
+
+    vacio = {'productos': 0, 'ordenes': 0, 'unidades': 0, 'total_ventas': _centimos(0)}
+    por_vendedor = {}
+    for row in Producto.objects.values('vendedor_id').annotate(productos=Count('id')).order_by():
+        por_vendedor[row['vendedor_id']] = {**vacio, 'productos': row['productos']}
+    for row in Orden.objects.values('producto__vendedor_id').annotate(
+        ordenes=Count('id'), unidades=Sum('cantidad'), total_ventas=Sum('total_pagado')
+    ).order_by():
+        por_vendedor.setdefault(row['producto__vendedor_id'], dict(vacio)).update(
+            ordenes=row['ordenes'], unidades=row['unidades'], total_ventas=_centimos(row['total_ventas'])
+        )
+    return globales, por_producto, por_vendedor
+
+
+def leer_resumen_completo():
+    """Estado actual de las tablas de resumen, con el mismo formato que calcular_resumen()"""
+    globales = leer_resumen()
+    globales['total_ventas'] = _centimos(globales['total_ventas'])
+    por_producto = {
+        row.pop('producto_id'): {**row, 'total_ventas': _centimos(row['total_ventas'])}
+        for row in ResumenProducto.objects.values('producto_id', 'ordenes', 'unidades', 'total_ventas')
+    }
+    por_vendedor = {
+        row.pop('vendedor_id'): {**row, 'total_ventas': _centimos(row['total_ventas'])}
+        for row in ResumenVendedor.objects.values('vendedor_id', 'productos', 'ordenes', 'unidades', 'total_ventas')
+    }
+    return globales, por_producto, por_vendedor
+
+
+def guardar_resumen(resumen, Ventas=ResumenVentas, PorProducto=ResumenProducto, PorVendedor=ResumenVendedor):
+    """Sustituir las tablas de resumen por `resumen` (el resultado de calcular_resumen)"""
+    globales, por_producto, por_vendedor = resumen
+    with transaction.atomic():
+        Ventas.objects.update_or_create(pk=RESUMEN_GLOBAL, defaults=globales)
+        PorProducto.objects.all().delete()
+        PorProducto.objects.bulk_create(
+            [PorProducto(producto_id=pk, **valores) for pk, valores in por_producto.items()], batch_size=500
+        )
+        PorVendedor.objects.all().delete()
+        PorVendedor.objects.bulk_create(
+            [PorVendedor(vendedor_id=pk, **valores) for pk, valores in por_vendedor.items()], batch_size=500
+        )
+
+
+def reconstruir():
+    """Recalcular el resumen desde cero (sin escrituras concurrentes el resultado es exacto)"""
+    with transaction.atomic():
+        resumen = calcular_resumen()
+        guardar_resumen(resumen)
+    return resumen
@@ -0,0 +1,61 @@
+# apps/blockchain/serialization.py
+
+# Proyecciones values(): los campos relacionados llegan en el mismo JOIN,
+# así que serializar N filas cuesta una consulta y no N + 1
+PRODUCTO_CAMPOS = (
+    'id', 'nombre', 'precio', 'stock', 'vendedor__username', 'blockchain_tx_hash',
+    'resumen__unidades', 'resumen__total_ventas',
+)
+ORDEN_CAMPOS = (
+    'id', 'producto__nombre', 'comprador__username', 'cantidad', 'total_pagado',
+    'fecha_compra', 'blockchain_tx_hash', 'estado', 'block_number',
+)
+
+
+def productos_values(qs):
+    return qs.values(*PRODUCTO_CAMPOS).order_by('id')
+
+
+def ordenes_recientes_values(qs, limite=10):
+    return qs.values(*ORDEN_CAMPOS).order_by('-fecha_compra')[:limite]
+
+
+def producto_data(row):
+    return {
+        'id': row['id'],
+        'nombre': row['nombre'],
+        'precio': str(row['precio']),
+        'stock': row['stock'],
+        'vendedor': row['vendedor__username'],
+        'blockchain_tx': row['blockchain_tx_hash'],
+        'on_blockchain': bool(row['blockchain_tx_hash']),
+        'unidades_vendidas': row['resumen__unidades'] or 0,
+        'ventas': str(row['resumen__total_ventas'] or 0)
+    }
+
+
+def orden_data(row):
+    return {
+        'id': row['id'],
+        'producto_nombre': row['producto__nombre'],
+        'comprador': row['comprador__username'],
+        'cantidad': row['cantidad'],
+        'total': str(row['total_pagado']),
+        'fecha_compra': row['fecha_compra'].strftime("%Y-%m-%d %H:%M"),
+        'blockchain_tx': row['blockchain_tx_hash'],
+        'on_blockchain': bool(row['blockchain_tx_hash']),
+        'estado': row['estado'],
+        'block_number': row['block_number']
+    }
+
+
+def estadisticas_data(resumen, blockchain_info):
+    """Estadísticas del dashboard a partir de la fila de ResumenVentas (ver sales_summary.py)"""
+    return {
+        'total_productos': resumen['total_productos'],
+        'total_ordenes': resumen['total_ordenes'],
+        'productos_blockchain': resumen['productos_blockchain'],
+        'ordenes_blockchain': resumen['ordenes_blockchain'],
+        'total_ventas': float(resumen['total_ventas']),
+        'transacciones_totales': blockchain_info.get('transaction_count', 0)
+    }
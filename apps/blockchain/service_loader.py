@@ -0,0 +1,146 @@
+# apps/blockchain/service_loader.py
+import threading
+import time
+
+from django.conf import settings
+
+NOT_INITIALIZED = "NOT_INITIALIZED"
+CONNECTING = "CONNECTING"
+CONNECTED = "CONNECTED"
+DEGRADED = "DEGRADED"
+
+
+class FallbackBlockchainService:
+    """Servicio de emergencia mientras Ganache no está disponible"""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def get_blockchain_info(self):
+        return {
+            'connected': False,
+            'status': self.loader.status,
+            'message': 'Ganache no disponible - Usando modo fallback'
+        }
+
+    def get_accounts(self): return []
+
+    def send_test_transaction(self): return {'success': False, 'error': 'Modo fallback'}
+
+    def create_product_on_blockchain(self, name, price): return None
+
+    def purchase_product_on_blockchain(self, product_id, quantity, total): return None
+
+
+class LazyBlockchainService:
+    """Envoltorio que construye BlockchainService fuera del arranque del worker.
+
+    La conexión (y el despliegue del contrato) se hacen en un hilo en segundo
+    plano; mientras tanto, o si falla, las llamadas van al servicio fallback.
+    """
+
+    def __init__(self, factory=None):
+        self._factory = factory
+        self._service = None
+        self._fallback = FallbackBlockchainService(self)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._failed_at = None
+        self.status = NOT_INITIALIZED
+        self.error = None
+
+    def _build(self):
+        if self._factory is not None:
+            return self._factory()
+        from .services import BlockchainService
+        return BlockchainService()
+
+    def _initialize(self):
+        try:
+            service = self._build()
+        except Exception as e:
+            with self._lock:
+                self.status = DEGRADED
+                self.error = str(e)
+                self._failed_at = time.monotonic()
+            print(f"🔗 Blockchain Service: {DEGRADED} ({e})")
+        else:
+            with self._lock:
+                self._service = service
+                self.status = CONNECTED
+                self.error = None
+            print("🔗 Blockchain Service: CONECTADO a Ganache")
+            self._start_background_jobs(service)
+        finally:
+            self._ready.set()
+
+    def _start_background_jobs(self, service):
+        if getattr(settings, 'BLOCKCHAIN_CONFIRMER_ENABLED', True):
+            from .confirmer import start_confirmer
+            start_confirmer(service.w3)
+        if getattr(settings, 'BLOCKCHAIN_INDEXER_ENABLED', False):
+            from .indexer import start_indexer
+            start_indexer(service.w3)
+
+    def warm_up(self):
+        """Lanzar la inicialización en segundo plano (idempotente)"""
+        with self._lock:
+            if self.status in (CONNECTING, CONNECTED):
+                return
+            if self.status == DEGRADED:
+                retry_after = getattr(settings, 'BLOCKCHAIN_RETRY_INTERVAL', 30)
+                if time.monotonic() - self._failed_at < retry_after:
+                    return
+            self.status = CONNECTING
+            self._ready.clear()
+            self._thread = threading.Thread(
+                target=self._initialize, name='blockchain-warmup', daemon=True
+            )
+            self._thread.start()
+
+    def configure(self, factory):
+        """Cambiar la fábrica del servicio (benchmarks, nodo local) y volver a inicializar"""
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._factory = factory
+            self._service = None
+            self.status = NOT_INITIALIZED
+            self.error = None
+
+    def wait_ready(self, timeout=None):
+        """Esperar a que termine la inicialización (para comandos y scripts)"""
+        self.warm_up()
+        self._ready.wait(timeout)
+        return self.is_ready
+
+    @property
+    def is_ready(self):
+        return self.status == CONNECTED
+
+    def get(self):
+        """Servicio real si está listo; si no, fallback sin bloquear"""
+        if self.status != CONNECTED:
+            self.warm_up()
+        return self._service if self._service is not None else self._fallback
+
+    def state(self):
+        return {'status': self.status, 'error': self.error}
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+# Instancia compartida del proceso (la usan las vistas, wsgi.py y asgi.py)
+blockchain_service = LazyBlockchainService()
+
+
+def warm_up_server():
+    """Conectar y desplegar en segundo plano al arrancar un servidor (wsgi.py, asgi.py).
+
+    runserver carga wsgi.py en el proceso que sirve peticiones, así que
+    también lo cubre; los comandos de manage.py no conectan hasta que usan el servicio.
+    """
+    if getattr(settings, 'BLOCKCHAIN_WARMUP', True):
+        blockchain_service.warm_up()
@@ -4,11 +4,120 @@ import json
 import time
 from django.conf import settings
 
+from .batch_fetch import JsonRpcBatchError, batch_request, hex_to_int
+from .contract_registry import registry
+from .deployments import DeploymentError, get_or_deploy_contract
+from .fees import get_fee_oracle
+from .head_watcher import get_head_watcher
+from .info_cache import BlockKeyedCache
+from .metrics import instrumented
+from .nonce_manager import get_nonce_manager
+from .providers import get_http_provider
+from .signer import get_signer
+
+# ABI de un contrato simple de tienda
+SIMPLE_STORE_ABI = [
+    {
+        "inputs": [],
+        "stateMutability": "nonpayable",
+        "type": "constructor"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {
+                "indexed": True,
+                "internalType": "uint256",
+                "name": "productId",
+                "type": "uint256"
+            },
+            {
+                "indexed": False,
+                "internalType": "string",
+                "name": "name",
+                "type": "string"
+            },
+            {
+                "indexed": False,
+                "internalType": "uint256",
+                "name": "price",
+                "type": "uint256"
+            }
+        ],
+        "name": "ProductCreated",
+        "type": "event"
+    },
+    {
+        "inputs": [
+            {
+                "internalType": "string",
+                "name": "_name",
+                "type": "string"
+            },
+            {
+                "internalType": "uint256",
+                "name": "_price",
+                "type": "uint256"
+            }
+        ],
+        "name": "createProduct",
+        "outputs": [
+            {
+                "internalType": "uint256",
+                "name": "",
+                "type": "uint256"
+            }
+        ],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {
+                "internalType": "uint256",
+                "name": "_productId",
+                "type": "uint256"
+            }
+        ],
+        "name": "getProduct",
+        "outputs": [
+            {
+                "internalType": "string",
+                "name": "",
+                "type": "string"
+            },
+            {
+                "internalType": "uint256",
+                "name": "",
+                "type": "uint256"
+            },
+            {
+                "internalType": "address",
+                "name": "",
+                "type": "address"
+            }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# Bytecode de un contrato simple compilado
+# En una aplicación real, esto vendría de la compilación de Solidity
+SIMPLE_STORE_BYTECODE = "0x608060405234801561001057600080fd5b50336000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff1602179055506102c4806100606000396000f3fe608060405260043610610046576000357c010000000000000000000000000000000000000000000000000000000090048063a0a8e46c1461004b578063c6888fa114610076575b600080fd5b34801561005757600080fd5b506100606100a1565b6040518082815260200191505060405180910390f35b34801561008257600080fd5b5061009f60048036036100b0565b005b60008054905090565b5056fea2646970667358221220123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef64736f6c634300060c0033"
+
+# Registrado una vez por proceso: selectores y fábrica del Contract precalculados
+SIMPLE_STORE = registry.register('SimpleStore', SIMPLE_STORE_ABI, SIMPLE_STORE_BYTECODE, 'services.py')
+
+
 class BlockchainService:
-    def __init__(self, provider_url='http://localhost:8545'):
+    def __init__(self, provider_url='http://localhost:8545', network='ganache'):
         try:
+            # Nombre de la red para la caché de despliegues
+            self.network = network
+            
             # Conectar a Ganache
-            self.w3 = Web3(Web3.HTTPProvider(provider_url))
+            self.w3 = Web3(get_http_provider(provider_url))
             
             if not self.w3.is_connected():
                 print("❌ No se pudo conectar a Ganache. Verifica que esté ejecutándose en puerto 8545")
@@ -16,10 +125,27 @@ class BlockchainService:
                 raise Exception("No se pudo conectar a Ganache")
             
             # Configurar cuenta por defecto (primera cuenta de Ganache)
-            self.default_account = self.w3.eth.accounts[0]
+            accounts = self.w3.eth.accounts
+            self.default_account = accounts[0]
+            # Destino de las compras y chain id: fijos mientras viva el proceso (sin RPC por orden)
+            self.purchase_account = accounts[1] if len(accounts) > 1 else accounts[0]
+            self.chain_id = self.w3.eth.chain_id
             
             # Private key de la primera cuenta de Ganache (conocida para desarrollo)
             self.private_key = "0x4f3edf983ac636a65a842ce7c78d9aa706d3b113bce9c46f30d7d21715b23b1d"
+            # Cuenta local derivada una sola vez por proceso
+            self.signer = get_signer(self.private_key)
+            
+            # Nonces gestionados en proceso (una única consulta al arrancar)
+            self.nonce_manager = get_nonce_manager(self.w3, self.default_account)
+            self.nonce_manager.resync()
+            
+            # Tarifas EIP-1559 muestreadas una vez por bloque (sin RPC al enviar)
+            self.fees = get_fee_oracle(self.w3)
+            
+            # Info de la cadena cacheada por bloque: un refresco por bloque nuevo para todos los dashboards
+            self._info_cache = BlockKeyedCache(self._fetch_blockchain_info, ttl=settings.BLOCKCHAIN_INFO_TTL)
+            get_head_watcher(self.w3).subscribe(self._info_cache.on_new_block)
             
             print("✅ Conectado exitosamente a Ganache")
             print(f"📦 Último bloque: {self.w3.eth.block_number}")
@@ -33,141 +159,69 @@ class BlockchainService:
             print(f"❌ Error inicializando BlockchainService: {e}")
             raise
     
+    @instrumented
     def deploy_simple_contract(self):
-        """Desplegar un contrato simple para la demo"""
+        """Desplegar un contrato simple para la demo (o reutilizar el ya desplegado)"""
         try:
-            # ABI de un contrato simple de tienda
-            contract_abi = [
-                {
-                    "inputs": [],
-                    "stateMutability": "nonpayable",
-                    "type": "constructor"
-                },
-                {
-                    "anonymous": False,
-                    "inputs": [
-                        {
-                            "indexed": True,
-                            "internalType": "uint256",
-                            "name": "productId",
-                            "type": "uint256"
-                        },
-                        {
-                            "indexed": False,
-                            "internalType": "string",
-                            "name": "name",
-                            "type": "string"
-                        },
-                        {
-                            "indexed": False,
-                            "internalType": "uint256",
-                            "name": "price",
-                            "type": "uint256"
-                        }
-                    ],
-                    "name": "ProductCreated",
-                    "type": "event"
-                },
-                {
-                    "inputs": [
-                        {
-                            "internalType": "string",
-                            "name": "_name",
-                            "type": "string"
-                        },
-                        {
-                            "internalType": "uint256",
-                            "name": "_price",
-                            "type": "uint256"
-                        }
-                    ],
-                    "name": "createProduct",
-                    "outputs": [
-                        {
-                            "internalType": "uint256",
-                            "name": "",
-                            "type": "uint256"
-                        }
-                    ],
-                    "stateMutability": "nonpayable",
-                    "type": "function"
-                },
-                {
-                    "inputs": [
-                        {
-                            "internalType": "uint256",
-                            "name": "_productId",
-                            "type": "uint256"
-                        }
-                    ],
-                    "name": "getProduct",
-                    "outputs": [
-                        {
-                            "internalType": "string",
-                            "name": "",
-                            "type": "string"
-                        },
-                        {
-                            "internalType": "uint256",
-                            "name": "",
-                            "type": "uint256"
-                        },
-                        {
-                            "internalType": "address",
-                            "name": "",
-                            "type": "address"
-                        }
-                    ],
-                    "stateMutability": "view",
-                    "type": "function"
-                }
-            ]
+            contract_address, reused = get_or_deploy_contract(
+                self.w3,
+                self.network,
+                SIMPLE_STORE_ABI,
+                SIMPLE_STORE_BYTECODE,
+                self._deploy_contract,
+                code_hash=SIMPLE_STORE.code_hash
+            )
+            if reused:
+                print(f"♻️  Reutilizando contrato desplegado en: {contract_address}")
             
-            # Bytecode de un contrato simple compilado
-            # En una aplicación real, esto vendría de la compilación de Solidity
-            contract_bytecode = "0x608060405234801561001057600080fd5b50336000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff1602179055506102c4806100606000396000f3fe608060405260043610610046576000357c010000000000000000000000000000000000000000000000000000000090048063a0a8e46c1461004b578063c6888fa114610076575b600080fd5b34801561005757600080fd5b506100606100a1565b6040518082815260200191505060405180910390f35b34801561008257600080fd5b5061009f60048036036100b0565b005b60008054905090565b5056fea2646970667358221220123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef64736f6c634300060c0033"
+            # Guardar referencia al contrato
+            self.contract = SIMPLE_STORE.contract(self.w3, contract_address)
             
-            # Crear contrato
-            contract = self.w3.eth.contract(
-                abi=contract_abi,
-                bytecode=contract_bytecode
-            )
+            return contract_address
             
+        except Exception as e:
+            print(f"⚠️  No se pudo desplegar contrato, usando modo simulación: {e}")
+            # En caso de error, usar una dirección mock pero mantener conexión
+            self.contract = None
+            return "0xSIMULATION_MODE_CONTRACT_ADDRESS"
+    
+    def _deploy_contract(self):
+        """Enviar el despliegue y esperar el recibo; devuelve (dirección, tx_hash)"""
+        # Crear contrato
+        contract = SIMPLE_STORE.contract(self.w3)
+        
+        def send(nonce):
             # Construir transacción de despliegue
             transaction = contract.constructor().build_transaction({
                 'from': self.default_account,
-                'nonce': self.w3.eth.get_transaction_count(self.default_account),
+                'nonce': nonce,
                 'gas': 2000000,
-                'gasPrice': self.w3.to_wei('20', 'gwei')
+                **self.fees.fee_params()
             })
             
             # Firmar transacción
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, private_key=self.private_key)
+            signed_txn = self.signer.sign(transaction)
             
             # Enviar transacción
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            # Esperar a que se mine
-            tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            contract_address = tx_receipt.contractAddress
-            
-            print(f"✅ Contrato desplegado en: {contract_address}")
-            print(f"📄 TX Hash: {tx_hash.hex()}")
-            
-            # Guardar referencia al contrato
-            self.contract = self.w3.eth.contract(
-                address=contract_address,
-                abi=contract_abi
+            return self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        
+        tx_hash = self.nonce_manager.send(send)
+        
+        # Esperar a que se mine
+        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        contract_address = tx_receipt.contractAddress
+        if tx_receipt.status != 1 or not contract_address:
+            # Revertido: no hay contrato (se sigue en modo simulación y no se registra)
+            raise DeploymentError(
+                f"El despliegue {self.w3.to_hex(tx_hash)} falló (status {tx_receipt.status}, gas {tx_receipt.gasUsed})"
             )
-            
-            return contract_address
-            
-        except Exception as e:
-            print(f"⚠️  No se pudo desplegar contrato, usando modo simulación: {e}")
-            # En caso de error, usar una dirección mock pero mantener conexión
-            self.contract = None
-            return "0xSIMULATION_MODE_CONTRACT_ADDRESS"
+        
+        print(f"✅ Contrato desplegado en: {contract_address}")
+        print(f"📄 TX Hash: {tx_hash.hex()}")
+        
+        return contract_address, tx_hash.hex()
     
+    @instrumented
     def create_product_on_blockchain(self, name, price):
         """Crear producto en blockchain Ganache"""
         try:
@@ -180,21 +234,24 @@ class BlockchainService:
             # Convertir precio a wei
             price_wei = self.w3.to_wei(price, 'ether')
             
-            # Construir transacción
-            transaction = self.contract.functions.createProduct(
-                name, price_wei
-            ).build_transaction({
-                'from': self.default_account,
-                'nonce': self.w3.eth.get_transaction_count(self.default_account),
-                'gas': 200000,
-                'gasPrice': self.w3.to_wei('20', 'gwei')
-            })
-            
-            # Firmar transacción
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, private_key=self.private_key)
+            def send(nonce):
+                # Construir transacción
+                transaction = self.contract.functions.createProduct(
+                    name, price_wei
+                ).build_transaction({
+                    'from': self.default_account,
+                    'nonce': nonce,
+                    'gas': 200000,
+                    **self.fees.fee_params()
+                })
+                
+                # Firmar transacción
+                signed_txn = self.signer.sign(transaction)
+                
+                # Enviar transacción
+                return self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
             
-            # Enviar transacción
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            tx_hash = self.nonce_manager.send(send)
             
             # Esperar confirmación (opcional para demo, puedes quitarlo para mayor velocidad)
             # tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
@@ -209,43 +266,41 @@ class BlockchainService:
             # Fallback a simulación
             return f"0xERROR_{int(time.time())}"
     
+    @instrumented
     def purchase_product_on_blockchain(self, product_id, quantity, total):
-        """Generar transacción REAL en Ganache para una compra"""
+        """Generar transacción REAL en Ganache para una compra (sin esperar a que se mine)"""
         try:
-            if not self.w3.is_connected():
-                print("❌ No conectado a Ganache")
-                return None
-                
-            # Usar la primera cuenta de Ganache
-            from_account = self.w3.eth.accounts[0]
-            to_account = self.w3.eth.accounts[1] if len(self.w3.eth.accounts) > 1 else from_account
+            from_account = self.default_account
+            to_account = self.purchase_account
             
             print(f"🔗 Creando transacción en Ganache...")
             print(f"   De: {from_account}")
             print(f"   Para: {to_account}")
             print(f"   Producto ID: {product_id}, Cantidad: {quantity}, Total: ${total}")
             
-            # Crear transacción en Ganache
-            transaction = {
-                'from': from_account,
-                'to': to_account,
-                'value': self.w3.to_wei(0.001, 'ether'),  # Valor de la transacción
-                'gas': 21000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': self.w3.eth.get_transaction_count(from_account),
-            }
+            def send(nonce):
+                # Firmada en local con tarifas y chain id en memoria: eth_sendRawTransaction es el único RPC
+                transaction = {
+                    'from': from_account,
+                    'to': to_account,
+                    'value': self.w3.to_wei(0.001, 'ether'),  # Valor de la transacción
+                    'gas': 21000,
+                    **self.fees.fee_params(),
+                    'nonce': nonce,
+                    'chainId': self.chain_id,
+                }
+                return self.w3.eth.send_raw_transaction(self.signer.sign(transaction).raw_transaction)
             
             # Firmar y enviar transacción a Ganache
             print("⏳ Enviando transacción a Ganache...")
-            tx_hash = self.w3.eth.send_transaction(transaction)
-            tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            tx_hash = self.nonce_manager.send(send)
             
+            # No esperamos el recibo: el confirmador en segundo plano (confirmer.py)
+            # actualizará la orden con el bloque y el gas usado
             tx_hash_hex = self.w3.to_hex(tx_hash)
             
-            print(f"✅ Transacción Ganache exitosa:")
+            print(f"📤 Transacción Ganache enviada (pendiente de confirmación):")
             print(f"   TX Hash: {tx_hash_hex}")
-            print(f"   Bloque: {tx_receipt.blockNumber}")
-            print(f"   Gas usado: {tx_receipt.gasUsed}")
             
             return tx_hash_hex
             
@@ -253,29 +308,46 @@ class BlockchainService:
             print(f"❌ Error en transacción Ganache: {e}")
             return None
     
+    @instrumented
     def get_blockchain_info(self):
-        """Obtener información de la blockchain Ganache"""
+        """Obtener información de la blockchain Ganache (cacheada por bloque)"""
         try:
-            balance_wei = self.w3.eth.get_balance(self.default_account)
-            balance_eth = self.w3.from_wei(balance_wei, 'ether')
-            
-            return {
-                'connected': True,
-                'network': 'Ganache Local',
-                'block_number': self.w3.eth.block_number,
-                'default_account': self.default_account,
-                'balance_eth': float(balance_eth),
-                'contract_address': self.contract_address,
-                'accounts_available': len(self.w3.eth.accounts),
-                'gas_price': self.w3.from_wei(self.w3.eth.gas_price, 'gwei'),
-                'is_listening': self.w3.net.listening
-            }
+            # Copia: las vistas añaden claves a la respuesta
+            return dict(self._info_cache.get())
         except Exception as e:
             return {
                 'connected': False,
                 'error': str(e)
             }
     
+    def _fetch_blockchain_info(self):
+        """Todas las consultas en un único lote JSON-RPC; devuelve (info, bloque)"""
+        results = batch_request(self.w3, [
+            ('eth_getBalance', [self.default_account, 'latest']),
+            ('eth_blockNumber', []),
+            ('eth_accounts', []),
+            ('eth_gasPrice', []),
+            ('net_listening', []),
+        ])
+        for result in results:
+            if isinstance(result, JsonRpcBatchError):
+                raise result
+        balance_wei, block_number, accounts, gas_price, listening = results
+        block_number = hex_to_int(block_number)
+        
+        return {
+            'connected': True,
+            'network': 'Ganache Local',
+            'block_number': block_number,
+            'default_account': self.default_account,
+            'balance_eth': float(self.w3.from_wei(hex_to_int(balance_wei), 'ether')),
+            'contract_address': self.contract_address,
+            'accounts_available': len(accounts),
+            'gas_price': self.w3.from_wei(hex_to_int(gas_price), 'gwei'),
+            'is_listening': listening
+        }, block_number
+    
+    @instrumented
     def get_accounts(self):
         """Obtener cuentas disponibles en Ganache"""
         try:
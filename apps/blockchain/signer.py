@@ -0,0 +1,148 @@
+# apps/blockchain/signer.py
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from eth_account import Account
+
+SignedTx = namedtuple('SignedTx', ['raw_transaction', 'hash'])
+
+_accounts = {}
+_accounts_lock = threading.Lock()
+
+
+def get_local_account(private_key):
+    """LocalAccount cacheada por clave: la derivación de la clave se hace una vez por proceso"""
+    account = _accounts.get(private_key)
+    if account is None:
+        with _accounts_lock:
+            account = _accounts.get(private_key)
+            if account is None:
+                account = _accounts[private_key] = Account.from_key(private_key)
+    return account
+
+
+def _signed_tx(signed):
+    raw = getattr(signed, 'raw_transaction', None)
+    return SignedTx(bytes(raw if raw is not None else signed.rawTransaction), bytes(signed.hash))
+
+
+# --- Procesos del pool: cada uno deriva la cuenta una sola vez en el initializer ---
+
+_worker_account = None
+
+
+def _init_worker(private_key):
+    global _worker_account
+    _worker_account = Account.from_key(private_key)
+
+
+def _sign_chunk(transactions):
+    return [_signed_tx(_worker_account.sign_transaction(tx)) for tx in transactions]
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.signatures = 0
+        self.seconds = 0.0
+        self.parallel_batches = 0
+
+    def record(self, count, seconds, parallel=False):
+        with self.lock:
+            self.signatures += count
+            self.seconds += seconds
+            if parallel:
+                self.parallel_batches += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'signatures': self.signatures,
+                'seconds': round(self.seconds, 4),
+                'signatures_per_second': round(self.signatures / self.seconds, 1) if self.seconds else None,
+                'parallel_batches': self.parallel_batches,
+            }
+
+
+_stats = _Stats()
+
+
+class Signer:
+    """Firma de transacciones de una cuenta local.
+
+    `sign` firma en el hilo actual con la LocalAccount cacheada; `sign_many`
+    reparte los lotes grandes entre un pool de procesos (la firma ECDSA es
+    CPU pura y el GIL la serializa entre hilos).
+    """
+
+    def __init__(self, private_key, workers=None):
+        self.account = get_local_account(private_key)
+        self.address = self.account.address
+        self.workers = workers or settings.BLOCKCHAIN_SIGN_WORKERS or os.cpu_count() or 1
+        self.parallel_min = settings.BLOCKCHAIN_SIGN_PARALLEL_MIN
+        self._private_key = private_key
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def sign(self, transaction):
+        start = time.perf_counter()
+        signed = _signed_tx(self.account.sign_transaction(transaction))
+        _stats.record(1, time.perf_counter() - start)
+        return signed
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: hacer fork de un worker con hilos (HeadWatcher, pools HTTP) no es seguro
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self._private_key,),
+                )
+            return self._pool
+
+    def sign_many(self, transactions):
+        """Firmar una lista de transacciones; devuelve SignedTx en el mismo orden"""
+        if len(transactions) < self.parallel_min or self.workers < 2:
+            start = time.perf_counter()
+            signed = [_signed_tx(self.account.sign_transaction(tx)) for tx in transactions]
+            _stats.record(len(signed), time.perf_counter() - start)
+            return signed
+
+        start = time.perf_counter()
+        size = -(-len(transactions) // self.workers)
+        chunks = [transactions[i:i + size] for i in range(0, len(transactions), size)]
+        signed = []
+        for chunk_result in self._get_pool().map(_sign_chunk, chunks):
+            signed.extend(chunk_result)
+        _stats.record(len(signed), time.perf_counter() - start, parallel=True)
+        return signed
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_signers = {}
+_signers_lock = threading.Lock()
+
+
+def get_signer(private_key):
+    """Signer compartido por clave (y con él su pool de procesos)"""
+    with _signers_lock:
+        signer = _signers.get(private_key)
+        if signer is None:
+            signer = _signers[private_key] = Signer(private_key)
+        return signer
+
+
+def signer_stats():
+    return _stats.as_dict()
@@ -0,0 +1,631 @@
+# apps/blockchain/tests.py
+import importlib
+import os
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
+import requests
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from web3 import Web3
+
+from . import batch_fetch
+from .bulk import register_products_bulk
+from .alchemy_integration import BlockchainService as AlchemyService
+from .chain_cache import ChainCache
+from .deployments import DeploymentError, DeploymentStore, contract_hash, get_or_deploy_contract
+from .event_indexer import product_data, producto_on_chain_data
+from .head_watcher import get_head_watcher, known_head
+from .indexer import CHECKPOINT_BLOQUES, BlockIndexer
+from .local_node import LocalChainNode
+from .models import (
+    BlockchainOrden, BlockchainProducto, BloqueIndexado, CheckpointIndexador, ProductoOnChain, ResumenProducto,
+)
+from .nonce_manager import NonceManager
+from .providers import CLOSED, OPEN, RoutedHTTPProvider, RPCRouter
+from .sales_summary import calcular_resumen, leer_resumen_completo
+from .service_loader import blockchain_service
+from .services import SIMPLE_STORE, BlockchainService
+from apps.blockchain.management.commands.benchmark_compras import _rpc_por_metodo
+from apps.blockchain.management.commands.benchmark_indices import _consultas
+from apps.tienda.models import Orden, Producto
+
+
+def _puerto_cerrado():
+    """URL de un puerto de localhost en el que no escucha nadie (conexión rechazada)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f'http://127.0.0.1:{port}'
+
+
+class _NodoQueCorta:
+    """Acepta la conexión, lee la petición entera y cierra sin responder (como un nodo que cae a mitad)"""
+
+    def __init__(self):
+        self.peticiones = 0
+        self._sock = socket.socket()
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen()
+        self.url = f'http://127.0.0.1:{self._sock.getsockname()[1]}'
+        threading.Thread(target=self._servir, daemon=True).start()
+
+    def _servir(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with conn:
+                data = b''
+                while b'\r\n\r\n' not in data:
+                    data += conn.recv(65536)
+                head, body = data.split(b'\r\n\r\n', 1)
+                length = int(next(
+                    line.split(b':')[1] for line in head.split(b'\r\n') if line.lower().startswith(b'content-length')
+                ))
+                while len(body) < length:
+                    body += conn.recv(65536)
+                self.peticiones += 1
+
+    def stop(self):
+        self._sock.close()
+
+
+class RPCRouterTests(SimpleTestCase):
+    """Router contra nodos locales (eth-tester) con latencia inyectada"""
+
+    def setUp(self):
+        self.lento = LocalChainNode(latency=0.05).start()
+        self.rapido = LocalChainNode().start()
+        self.addCleanup(self.lento.stop)
+        self.addCleanup(self.rapido.stop)
+
+    def _w3(self, *urls, **kwargs):
+        router = RPCRouter(list(urls), **kwargs)
+        return Web3(RoutedHTTPProvider(router, request_kwargs={'timeout': (1, 2)})), router
+
+    def test_lecturas_al_nodo_mas_rapido(self):
+        w3, router = self._w3(self.lento.url, self.rapido.url)
+        for _ in range(20):
+            w3.eth.block_number
+        # Cada nodo recibe al menos una muestra; después manda la latencia
+        self.assertLessEqual(self.lento.requests, 2)
+        self.assertGreaterEqual(self.rapido.requests, 18)
+
+    def test_breaker_abre_nodo_caido_y_las_lecturas_siguen(self):
+        caido = _puerto_cerrado()
+        w3, router = self._w3(caido, self.rapido.url, failures=2, cooldown=60)
+        for _ in range(5):
+            self.assertEqual(w3.eth.block_number, 0)
+        estados = {h.url: h.state for h in router.endpoints}
+        self.assertEqual(estados[caido], OPEN)
+        self.assertEqual(estados[self.rapido.url], CLOSED)
+
+    def test_escritura_al_primario(self):
+        w3, router = self._w3(self.lento.url, self.rapido.url)
+        w3.provider.make_request('eth_sendRawTransaction', ['0x00'])
+        self.assertEqual((self.lento.requests, self.rapido.requests), (1, 0))
+
+    def test_escritura_cambia_de_nodo_si_no_se_pudo_conectar(self):
+        w3, router = self._w3(_puerto_cerrado(), self.rapido.url)
+        w3.provider.make_request('eth_sendRawTransaction', ['0x00'])
+        self.assertEqual(self.rapido.requests, 1)
+
+    def test_escritura_no_se_reenvia_si_el_nodo_corta_tras_recibirla(self):
+        nodo = _NodoQueCorta()
+        self.addCleanup(nodo.stop)
+        w3, router = self._w3(nodo.url, self.rapido.url)
+        with self.assertRaises(requests.ConnectionError):
+            w3.provider.make_request('eth_sendRawTransaction', ['0x00'])
+        self.assertEqual(nodo.peticiones, 1)
+        self.assertEqual(self.rapido.requests, 0)
+
+
+class ChainCacheTests(SimpleTestCase):
+
+    def _bloque(self, n):
+        return {'number': hex(n), 'hash': f'0x{n:064x}', 'transactions': ['0x' + 'ab' * 32] * 20}
+
+    def test_presupuesto_de_memoria_cuenta_lo_que_ocupa(self):
+        cache = ChainCache(max_bytes=20_000, confirmations=0)
+        cache.put_many('g', 'block', [(str(n), self._bloque(n), n) for n in range(100)], head=100)
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 20_000)
+        self.assertGreater(stats['evictions'], 0)
+        # Lo que se lee es una copia: modificarla no altera la caché
+        bloque = cache.get_many('g', 'block', ['99'])['99']
+        bloque['transactions'].clear()
+        self.assertEqual(len(cache.get_many('g', 'block', ['99'])['99']['transactions']), 20)
+
+    def test_sqlite_borra_las_entradas_mas_antiguas(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'cache.sqlite3')
+        cache = ChainCache(max_bytes=10**6, confirmations=0, path=path, max_disk_bytes=30_000)
+        for n in range(100):
+            cache.put_many('g', 'block', [(str(n), self._bloque(n), n)], head=100)
+        self.assertLessEqual(cache.stats()['disk_bytes'], 30_000)
+        cache.clear()
+        self.assertEqual(cache.get_many('g', 'block', ['0']), {})
+        self.assertIn('99', cache.get_many('g', 'block', ['99']))
+
+
+@override_settings(BLOCKCHAIN_CHAIN_NAMESPACE_TTL=3600)
+class ChainNamespaceTests(SimpleTestCase):
+    """Un nodo reiniciado (nuevo génesis) no debe servir bloques de la cadena anterior"""
+
+    def setUp(self):
+        self.w3 = Web3(Web3.HTTPProvider('http://nodo-reiniciado:8545'))
+        self.addCleanup(batch_fetch._chain_namespaces.clear)
+
+    def _genesis(self, hash_):
+        return mock.patch.object(batch_fetch, 'batch_request', return_value=[{'hash': hash_}])
+
+    def test_cabeza_que_retrocede_vuelve_a_comprobar_el_genesis(self):
+        with self._genesis('0xaaa') as rpc:
+            self.assertEqual(batch_fetch._chain_namespace(self.w3, head=500), '0xaaa')
+            self.assertEqual(batch_fetch._chain_namespace(self.w3, head=510), '0xaaa')
+            self.assertEqual(rpc.call_count, 1)
+        with self._genesis('0xbbb'):
+            self.assertEqual(batch_fetch._chain_namespace(self.w3, head=3), '0xbbb')
+
+    def test_se_comprueba_de_nuevo_al_vencer_el_plazo(self):
+        with self._genesis('0xaaa'):
+            batch_fetch._chain_namespace(self.w3, head=10)
+        with self._genesis('0xbbb'), override_settings(BLOCKCHAIN_CHAIN_NAMESPACE_TTL=0):
+            self.assertEqual(batch_fetch._chain_namespace(self.w3, head=20), '0xbbb')
+
+
+class BlockReceiptsTests(SimpleTestCase):
+    """eth_getBlockReceipts sólo se desactiva si el nodo dice que no existe"""
+
+    def setUp(self):
+        self.w3 = Web3(Web3.HTTPProvider('http://nodo-recibos:8545'))
+        self.addCleanup(batch_fetch._block_receipts_unsupported.clear)
+        self.bloques = [{'number': '0x1', 'transactions': ['0xaa']}]
+
+    def _recibos(self, error):
+        respuestas = [
+            [batch_fetch.JsonRpcBatchError('eth_getBlockReceipts', error)],
+            [{'transactionHash': '0xaa', 'blockNumber': '0x1'}],
+        ]
+        with mock.patch.object(batch_fetch, 'batch_request', side_effect=respuestas):
+            return batch_fetch.fetch_receipts(self.w3, self.bloques, head=10, cache=False)
+
+    def test_error_transitorio_no_desactiva_el_metodo(self):
+        recibos = self._recibos({'code': -32000, 'message': 'request timed out'})
+        self.assertIn('0xaa', recibos)
+        self.assertNotIn('http://nodo-recibos:8545', batch_fetch._block_receipts_unsupported)
+
+    def test_metodo_inexistente_lo_desactiva(self):
+        self._recibos({'code': -32601, 'message': 'the method eth_getBlockReceipts does not exist'})
+        self.assertIn('http://nodo-recibos:8545', batch_fetch._block_receipts_unsupported)
+
+
+class NonceManagerTests(SimpleTestCase):
+    """Un nonce sólo se devuelve si el error demuestra que el nodo no aceptó la transacción"""
+
+    def setUp(self):
+        nodo = LocalChainNode().start()
+        self.addCleanup(nodo.stop)
+        self.w3 = Web3(Web3.HTTPProvider(nodo.url))
+        self.cuenta = self.w3.eth.accounts[0]
+        self.manager = NonceManager(self.w3, self.cuenta)
+
+    def _enviar(self, nonce):
+        return self.w3.eth.send_transaction({'from': self.cuenta, 'to': self.cuenta, 'value': 0, 'nonce': nonce})
+
+    def test_error_del_nodo_devuelve_el_nonce(self):
+        def rechazada(nonce):
+            raise ValueError({'code': -32000, 'message': 'insufficient funds for gas * price + value'})
+        with self.assertRaises(ValueError):
+            self.manager.send(rechazada)
+        self.assertEqual(self.manager.next_nonce(), 0)
+
+    def test_timeout_tras_enviar_no_reutiliza_el_nonce(self):
+        def aceptada_sin_respuesta(nonce):
+            self._enviar(nonce)
+            raise requests.ReadTimeout('sin respuesta del nodo')
+        with self.assertRaises(requests.ReadTimeout):
+            self.manager.send(aceptada_sin_respuesta)
+        # Sin reintento: reutilizar el nonce 0 fallaría con "nonce too low"
+        self.manager.send(self._enviar, retries=0)
+        self.assertEqual(self.w3.eth.get_transaction_count(self.cuenta), 2)
+
+
+class ProductDataTests(SimpleTestCase):
+    """getProduct por web3, por lotes (eth_abi) o desde el índice devuelve el mismo diccionario"""
+
+    def test_direcciones_en_formato_checksum(self):
+        creador = '0x90F8bf6A479f320ead074411a4B0e7944Ea8c9C1'
+        por_web3 = product_data((1, 'Producto', 10, 5, creador, 1700000000))
+        por_lotes = product_data((1, 'Producto', 10, 5, creador.lower(), 1700000000))
+        indexado = producto_on_chain_data(ProductoOnChain(
+            product_id=1, nombre='Producto', precio_wei=Decimal(10), stock=Decimal(5),
+            creador=creador.lower(), timestamp=1700000000,
+        ))
+        self.assertEqual(por_web3['creator'], creador)
+        self.assertEqual(por_lotes, por_web3)
+        self.assertEqual(indexado, por_web3)
+
+
+class LocalChainNodeTests(SimpleTestCase):
+    """Como el mempool de Ganache: un nonce futuro espera a los anteriores en lugar de fallar"""
+
+    def test_nonce_futuro_espera_a_los_anteriores(self):
+        nodo = LocalChainNode().start()
+        self.addCleanup(nodo.stop)
+        w3 = Web3(Web3.HTTPProvider(nodo.url))
+        cuenta = w3.eth.accounts[0]
+        enviar = lambda nonce: w3.eth.send_transaction({'from': cuenta, 'to': cuenta, 'value': 0, 'nonce': nonce})
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            futura = pool.submit(enviar, 1)
+            enviar(0)
+            futura.result(timeout=5)
+        self.assertEqual(w3.eth.get_transaction_count(cuenta), 2)
+        # Un nonce ya usado sigue fallando en el acto
+        with self.assertRaises(ValueError):
+            enviar(0)
+
+
+class ContractSpecTests(SimpleTestCase):
+
+    @override_settings(CONTRACT_ADDRESS='')
+    def test_servicio_sin_direccion_de_contrato(self):
+        # CONTRACT_ADDRESS vacío (valor por defecto): contrato sin dirección, como w3.eth.contract(address='')
+        service = AlchemyService()
+        self.assertIsNone(service.contract.address)
+
+
+class DespliegueTests(SimpleTestCase):
+    """BlockchainService contra el nodo local: despliegue revertido y coste RPC de una compra"""
+
+    def setUp(self):
+        nodo = LocalChainNode().start()
+        self.addCleanup(nodo.stop)
+        self.url = nodo.url
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.fichero = os.path.join(tmp.name, 'deployments.json')
+
+    def test_despliegue_revertido(self):
+        # El bytecode de la demo revierte en py-evm: status 0 y contractAddress None
+        with override_settings(BLOCKCHAIN_DEPLOYMENTS_FILE=self.fichero):
+            service = BlockchainService(provider_url=self.url)
+        self.assertIsNone(service.contract)
+        self.assertEqual(service.contract_address, '0xSIMULATION_MODE_CONTRACT_ADDRESS')
+        self.assertFalse(os.path.exists(self.fichero))
+
+    def test_compra_con_un_solo_rpc(self):
+        with override_settings(BLOCKCHAIN_DEPLOYMENTS_FILE=self.fichero):
+            service = BlockchainService(provider_url=self.url)
+        service.purchase_product_on_blockchain(1, 1, 10)  # en frío: primer muestreo de tarifas
+
+        # Métricas atribuidas a la operación (como benchmark_compras): no cuenta el sondeo del HeadWatcher
+        antes = _rpc_por_metodo()
+        self.assertIsNotNone(service.purchase_product_on_blockchain(1, 1, 10))
+        despues = _rpc_por_metodo()
+        self.assertEqual(
+            {m: n - antes.get(m, 0) for m, n in despues.items() if n - antes.get(m, 0)},
+            {'eth_sendRawTransaction': 1},
+        )
+
+    def test_no_se_registra_sin_direccion(self):
+        store = DeploymentStore(self.fichero)
+        w3 = Web3(Web3.HTTPProvider(self.url))
+        with self.assertRaises(DeploymentError):
+            get_or_deploy_contract(w3, 'pruebas', [], '0x00', lambda: (None, '0xabc'), store=store)
+        self.assertEqual(store.candidates('pruebas', contract_hash([], '0x00')), [])
+
+
+class HeadWatcherTests(SimpleTestCase):
+
+    def test_un_watcher_por_endpoint(self):
+        nodos = [LocalChainNode().start() for _ in range(2)]
+        for nodo in nodos:
+            self.addCleanup(nodo.stop)
+        w3_a, w3_b = (Web3(Web3.HTTPProvider(nodo.url)) for nodo in nodos)
+        # Avanzar sólo la cadena B
+        w3_b.eth.send_transaction({'from': w3_b.eth.accounts[0], 'to': w3_b.eth.accounts[1], 'value': 1})
+
+        watcher_a, watcher_b = get_head_watcher(w3_a), get_head_watcher(w3_b)
+        self.assertIsNot(watcher_a, watcher_b)
+        self.assertIs(get_head_watcher(Web3(Web3.HTTPProvider(nodos[0].url))), watcher_a)
+        for watcher in (watcher_a, watcher_b):
+            watcher.start()
+            self.addCleanup(watcher.stop)
+            watcher.poll()
+        self.assertEqual((known_head(w3_a), known_head(w3_b)), (0, 1))
+
+
+def _sin_nodo():
+    raise RuntimeError('Pruebas de SQL: sin nodo blockchain')
+
+
+class ConsultasConstantesTests(TestCase):
+    """Catálogo y dashboard hacen las mismas consultas con 5 o con 50 productos (sin N+1)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Servicio en modo fallback: el dashboard no debe depender de un nodo
+        blockchain_service.configure(_sin_nodo)
+        blockchain_service.wait_ready(timeout=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        blockchain_service.configure(None)
+        super().tearDownClass()
+
+    def _poblar(self, hasta):
+        """Completar hasta `hasta` productos con vendedores distintos y una orden por producto"""
+        nuevos = range(BlockchainProducto.objects.count(), hasta)
+        vendedores = User.objects.bulk_create([User(username=f'vendedor_{i}') for i in nuevos])
+        comprador, _ = User.objects.get_or_create(username='comprador')
+        productos = BlockchainProducto.objects.bulk_create([
+            BlockchainProducto(nombre=f'Producto {i}', precio=Decimal('0.01'), stock=10, vendedor=v,
+                               blockchain_tx_hash=f'0x{i:064x}')
+            for i, v in zip(nuevos, vendedores)
+        ])
+        BlockchainOrden.objects.bulk_create([
+            BlockchainOrden(producto=p, comprador=comprador, total_pagado=p.precio, blockchain_tx_hash=p.blockchain_tx_hash)
+            for p in productos
+        ])
+
+    def _comprobar(self, url, consultas):
+        for tamano in (5, 50):
+            self._poblar(tamano)
+            with self.subTest(tamano=tamano), self.assertNumQueries(consultas):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_lista_productos(self):
+        self._comprobar('/api/blockchain/blockchain-products/', 1)
+
+    def test_dashboard_completo(self):
+        # Productos, órdenes recientes y resumen de ventas
+        self._comprobar('/api/dashboard/', 3)
+
+    def test_dashboard_completo_async(self):
+        self._comprobar('/api/blockchain/async/dashboard/', 3)
+
+    def test_parametros_no_enteros(self):
+        for url in ('/api/blockchain/transactions-detailed/', '/api/blockchain/async/transactions-detailed/'):
+            for parametro in ('bloques', 'limite', 'pagina', 'bloque_min'):
+                with self.subTest(url=url, parametro=parametro):
+                    self.assertEqual(self.client.get(url, {parametro: 'diez'}).status_code, 400)
+
+
+class EstadoOrdenesExistentesTests(TestCase):
+    """Migración 0002: las órdenes sin hash real no se quedan pendientes para siempre"""
+
+    def test_estado_segun_el_hash(self):
+        migracion = importlib.import_module('apps.blockchain.migrations.0002_orden_estado_confirmacion')
+        vendedor = User.objects.create(username='vendedor')
+        producto = BlockchainProducto.objects.create(nombre='Producto', precio=Decimal('1.00'), vendedor=vendedor)
+        hashes = [None, '', '0xSIM1700000000', '0xERROR_1700000000', 'ab' * 32, '0x' + 'cd' * 32]
+        ordenes = [
+            BlockchainOrden.objects.create(producto=producto, comprador=vendedor, total_pagado=1, blockchain_tx_hash=h)
+            for h in hashes
+        ]
+        migracion.estado_ordenes_existentes(django_apps, None)
+        estados = dict(BlockchainOrden.objects.values_list('id', 'estado'))
+        self.assertEqual(
+            [estados[o.id] for o in ordenes],
+            ['fallida', 'fallida', 'fallida', 'fallida', 'pendiente', 'pendiente'],
+        )
+
+
+class ResumenVentasTests(TestCase):
+    """El resumen mantenido en cada save() coincide con recalcularlo desde las tablas"""
+
+    def setUp(self):
+        vendedores = [User.objects.create(username=f'vendedor_{i}') for i in range(2)]
+        self.comprador = User.objects.create(username='comprador')
+        self.productos = [
+            BlockchainProducto.objects.create(nombre=f'Producto {i}', precio=Decimal('2.50'), vendedor=v)
+            for i, v in enumerate(vendedores)
+        ]
+        self.orden = BlockchainOrden.objects.create(
+            producto=self.productos[0], comprador=self.comprador, cantidad=2, total_pagado=Decimal('5.00')
+        )
+
+    def _comprobar(self):
+        globales, por_producto, por_vendedor = leer_resumen_completo()
+        # Un producto sin órdenes o un vendedor sin productos conservan su fila a cero
+        por_producto = {pk: fila for pk, fila in por_producto.items() if fila['ordenes']}
+        por_vendedor = {pk: fila for pk, fila in por_vendedor.items() if fila['productos'] or fila['ordenes']}
+        self.assertEqual((globales, por_producto, por_vendedor), calcular_resumen())
+
+    def test_cambio_de_cantidad_y_total(self):
+        orden = BlockchainOrden.objects.get(pk=self.orden.pk)
+        orden.cantidad, orden.total_pagado, orden.blockchain_tx_hash = 3, Decimal('7.50'), '0xabc'
+        orden.save()
+        self._comprobar()
+
+    def test_cambio_de_producto(self):
+        self.orden.producto = self.productos[1]
+        self.orden.save()
+        self._comprobar()
+
+    def test_producto_cambia_de_vendedor(self):
+        producto = BlockchainProducto.objects.get(pk=self.productos[0].pk)
+        producto.vendedor = self.productos[1].vendedor
+        producto.save()
+        self._comprobar()
+
+    def test_update_fields_y_campos_diferidos(self):
+        # Lo que no se escribe en la BD no debe contar en el resumen
+        self.orden.cantidad, self.orden.estado = 9, 'confirmada'
+        self.orden.save(update_fields=['estado'])
+        self._comprobar()
+        orden = BlockchainOrden.objects.only('id', 'cantidad').get(pk=self.orden.pk)
+        orden.cantidad = 4
+        orden.save()
+        self._comprobar()
+        self.assertEqual(ResumenProducto.objects.get(pk=self.productos[0].pk).unidades, 4)
+
+
+class RegistroEnBloqueTests(TestCase):
+
+    def test_contrato_sin_direccion_no_envia_transacciones(self):
+        vendedor = User.objects.create(username='vendedor')
+        productos = [
+            BlockchainProducto.objects.create(nombre=f'Producto {i}', precio=Decimal('1.00'), vendedor=vendedor)
+            for i in range(3)
+        ]
+        service = mock.Mock()
+        service.contract = SIMPLE_STORE.contract(Web3(Web3.HTTPProvider(_puerto_cerrado())))
+        resultados = register_products_bulk(service, productos)
+        self.assertEqual({r['estado'] for r in resultados}, {'simulada'})
+        service.nonce_manager.reserve.assert_not_called()
+
+
+class IndicesTests(TestCase):
+    """Las consultas de benchmark_indices usan los índices de blockchain 0006 y tienda 0002"""
+
+    def test_planes_de_consulta(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Los nombres de índice del plan se comprueban con EXPLAIN QUERY PLAN de SQLite')
+        consultas = _consultas(n_ordenes=100, n_productos=10)
+        esperado = {
+            'dashboard: órdenes recientes': 'orden_bc_fecha_desc',
+            'confirmador: pendientes': 'orden_bc_estado_id',
+            'orden por tx_hash': 'orden_bc_tx_hash',
+            'producto por tx_hash': 'producto_bc_tx_hash',
+            'tienda: órdenes pendientes': 'orden_estado_fecha',
+            'tienda: productos agotados': 'producto_estado',
+        }
+        for nombre, indice in esperado.items():
+            with self.subTest(consulta=nombre):
+                self.assertIn(indice, consultas[nombre]().explain())
+
+
+class CompraConcurrenteTests(TransactionTestCase):
+    """Compras simultáneas por HTTP contra un mismo producto: ni sobreventa ni descuentos perdidos"""
+
+    HILOS = 16
+    COMPRAS = 5
+    STOCK = 40  # menos que HILOS x COMPRAS: el producto se agota durante la prueba
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        blockchain_service.configure(_sin_nodo)
+        blockchain_service.wait_ready(timeout=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        blockchain_service.configure(None)
+        super().tearDownClass()
+
+    def _comprar_en_paralelo(self, url, producto_id):
+        def comprador():
+            client = Client()
+            codigos = []
+            try:
+                for _ in range(self.COMPRAS):
+                    response = client.post(url, {'producto_id': producto_id, 'cantidad': 1},
+                                           content_type='application/json')
+                    codigos.append((response.status_code, response.json().get('error')))
+            finally:
+                connection.close()
+            return codigos
+
+        with ThreadPoolExecutor(max_workers=self.HILOS) as pool:
+            resultados = [c for hilo in pool.map(lambda _: comprador(), range(self.HILOS)) for c in hilo]
+        ok = sum(1 for codigo, _ in resultados if codigo == 200)
+        agotado = sum(1 for codigo, error in resultados if error == 'Stock insuficiente')
+        # Ninguna compra falla por otro motivo (p. ej. 'database is locked' agotados los reintentos)
+        self.assertEqual(ok + agotado, self.HILOS * self.COMPRAS, resultados)
+        return ok, agotado
+
+    def _comprobar(self, modelo_orden, producto, ok, agotado):
+        producto.refresh_from_db()
+        vendidas = modelo_orden.objects.filter(producto=producto).aggregate(total=Sum('cantidad'))['total'] or 0
+        self.assertGreaterEqual(producto.stock, 0)
+        self.assertLessEqual(vendidas, self.STOCK)
+        # Cada orden descontó su unidad y cada 200 tiene su orden
+        self.assertEqual(vendidas, self.STOCK - producto.stock)
+        self.assertEqual(vendidas, ok)
+        self.assertGreater(agotado, 0)
+        return vendidas
+
+    def test_tienda(self):
+        vendedor = User.objects.create(username='vendedor')
+        producto = Producto.objects.create(nombre='Concurrido', descripcion='', precio=Decimal('1.00'),
+                                           stock=self.STOCK, vendedor=vendedor)
+        ok, agotado = self._comprar_en_paralelo('/api/comprar/', producto.id)
+        self._comprobar(Orden, producto, ok, agotado)
+
+    def test_blockchain(self):
+        vendedor = User.objects.create(username='vendedor')
+        producto = BlockchainProducto.objects.create(nombre='Concurrido', precio=Decimal('0.01'),
+                                                     stock=self.STOCK, vendedor=vendedor)
+        ok, agotado = self._comprar_en_paralelo('/api/blockchain/blockchain-products/buy/', producto.id)
+        vendidas = self._comprobar(BlockchainOrden, producto, ok, agotado)
+        # El resumen de ventas se actualiza en la misma transacción que la reserva
+        self.assertEqual(ResumenProducto.objects.get(producto=producto).unidades, vendidas)
+
+
+class BlockIndexerTests(TestCase):
+
+    def setUp(self):
+        nodo = LocalChainNode().start()
+        self.addCleanup(nodo.stop)
+        self.w3 = Web3(Web3.HTTPProvider(nodo.url))
+        for _ in range(3):
+            self.w3.eth.send_transaction({'from': self.w3.eth.accounts[0], 'to': self.w3.eth.accounts[1], 'value': 1})
+        self.indexer = BlockIndexer(self.w3, confirmations=2, batch_blocks=10)
+        self.assertEqual(self.indexer.run(), 4)
+
+    def test_fallo_transitorio_del_bloque_del_checkpoint_no_deshace(self):
+        self.w3.eth.send_transaction({'from': self.w3.eth.accounts[0], 'to': self.w3.eth.accounts[1], 'value': 1})
+        fetch_blocks = batch_fetch.fetch_blocks
+
+        def sin_el_primero(w3, numbers, **kwargs):
+            # El nodo falla el primer elemento del lote: fetch_blocks lo omite
+            return fetch_blocks(w3, numbers, **kwargs)[1:]
+
+        with mock.patch('apps.blockchain.indexer.fetch_blocks', side_effect=sin_el_primero):
+            self.assertEqual(self.indexer.run_once(), 0)
+        self.assertEqual(CheckpointIndexador.objects.get(nombre=CHECKPOINT_BLOQUES).block_number, 3)
+        self.assertEqual(BloqueIndexado.objects.count(), 4)
+        # Con el nodo ya sano se sigue desde donde estaba
+        self.assertEqual(self.indexer.run_once(), 1)
+
+    def test_cadena_mas_corta_que_el_checkpoint_deshace(self):
+        self.assertEqual(self.indexer.run_once(head=1), 0)
+        self.assertEqual(CheckpointIndexador.objects.get(nombre=CHECKPOINT_BLOQUES).block_number, 1)
+
+    @override_settings(BLOCKCHAIN_INDEX_CONFIRMATIONS=2, BLOCKCHAIN_CONFIRMER_ENABLED=False)
+    def test_vista_no_sirve_un_indice_parado(self):
+        blockchain_service.configure(lambda: mock.Mock(w3=self.w3))
+        self.addCleanup(blockchain_service.configure, None)
+        self.assertTrue(blockchain_service.wait_ready(timeout=5))
+        url = '/api/blockchain/transactions-detailed/'
+
+        # Al día: responde el índice, limitado a los `bloques` pedidos
+        data = self.client.get(url, {'bloques': 2}).json()
+        self.assertEqual((data['fuente'], data['bloque_indexado'], data['bloque_cabeza']), ('indice', 3, 3))
+        self.assertEqual(data['total_transacciones'], 2)
+
+        # El indexador se para y la cadena avanza más que su margen de confirmaciones
+        for _ in range(3):
+            self.w3.eth.send_transaction({'from': self.w3.eth.accounts[0], 'to': self.w3.eth.accounts[1], 'value': 1})
+        data = self.client.get(url, {'bloques': 2}).json()
+        self.assertEqual(data['fuente'], 'nodo')
+        self.assertEqual(data['total_transacciones'], 2)
+
+        # Un rango explícito de bloques sólo lo responde el índice, con su altura
+        data = self.client.get(url, {'bloque_min': 1}).json()
+        self.assertEqual((data['fuente'], data['bloque_indexado'], data['bloque_cabeza']), ('indice', 3, 6))
@@ -1,6 +1,6 @@
 # apps/blockchain/urls.py
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'blockchain'
 
@@ -9,14 +9,25 @@ urlpatterns = [
     path('', views.blockchain_info, name='blockchain_info'),
     path('accounts/', views.blockchain_accounts, name='blockchain_accounts'),
     path('test-transaction/', views.test_transaction, name='test_transaction'),
+    path('http-pool/', views.http_pool, name='http_pool'),
+    path('signer/', views.firmas, name='firmas'),
+    path('chain-cache/', views.cache_cadena, name='cache_cadena'),
+    path('metrics/', views.metricas, name='metricas'),
     
     # Productos de blockchain (diferentes de los de tienda)
     path('blockchain-products/', views.lista_productos, name='lista_productos_blockchain'),
     path('blockchain-products/create/', views.crear_producto, name='crear_producto_blockchain'),
+    path('blockchain-products/bulk-create/', views.crear_productos_lote, name='crear_productos_lote_blockchain'),
     path('blockchain-products/buy/', views.comprar_producto, name='comprar_producto_blockchain'),
     
     # Dashboard y transacciones
     path('dashboard/', views.dashboard_completo, name='dashboard_completo'),
     path('transactions-detailed/', views.transacciones_detalladas, name='transacciones_detalladas'),
+    
+    # Versiones async (servir con ASGI: backend.asgi)
+    path('async/', async_views.blockchain_info, name='blockchain_info_async'),
+    path('async/blockchain-products/buy/', async_views.comprar_producto, name='comprar_producto_async'),
+    path('async/dashboard/', async_views.dashboard_completo, name='dashboard_completo_async'),
+    path('async/transactions-detailed/', async_views.transacciones_detalladas, name='transacciones_detalladas_async'),
 
 ]
\ No newline at end of file
@@ -1,41 +1,51 @@
 # apps/blockchain/views.py
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
 import json
 
-from .models import BlockchainProducto, BlockchainOrden  # ✅ Nuevos nombres
+from .models import BlockchainProducto, BlockchainOrden, CheckpointIndexador  # ✅ Nuevos nombres
+from .batch_fetch import fetch_recent_transactions, hex_to_int
+from .bulk import register_products_bulk
+from .chain_cache import chain_cache_stats
+from .indexer import (
+    CHECKPOINT_BLOQUES, cabeza_cadena, filtrar_transacciones, indice_cubre, rango_explicito, transaccion_indexada_data,
+)
+from .metrics import render_text
+from .providers import pool_stats
+from .sales_summary import leer_resumen, productos_creados
+from .serialization import (
+    estadisticas_data, orden_data, ordenes_recientes_values, producto_data, productos_values,
+)
+from .signer import signer_stats
+from .service_loader import blockchain_service as services
 from apps.tienda.models import Producto, Orden
+from apps.tienda.stock import StockInsuficiente, cantidad_valida, comprar, con_reintentos
 
-# Inicialización del servicio blockchain
-services = None
-blockchain_status = "NOT_INITIALIZED"
+# Límites duros para los parámetros de transacciones_detalladas
+MAX_TX_DEPTH = 100
+MAX_TX_LIMIT = 500
+ERROR_PARAMETROS_TX = 'bloques, limite, pagina, bloque_min y bloque_max deben ser números enteros'
+# Productos por petición en el registro en bloque (para más, manage.py registrar_productos)
+MAX_BULK_PRODUCTS = 1000
 
-try:
-    from .services import BlockchainService
-    services = BlockchainService()
-    blockchain_status = "CONNECTED"
-    print("🔗 Blockchain Service: CONECTADO a Ganache")
-except Exception as e:
-    blockchain_status = f"ERROR: {str(e)}"
-    print(f"🔗 Blockchain Service: {blockchain_status}")
-    
-    # Servicio de emergencia
-    class FallbackBlockchainService:
-        def get_blockchain_info(self):
-            return {
-                'connected': False,
-                'status': blockchain_status,
-                'message': 'Ganache no disponible - Usando modo fallback'
-            }
-        def get_accounts(self): return []
-        def send_test_transaction(self): return {'success': False, 'error': 'Modo fallback'}
-    
-    services = FallbackBlockchainService()
+# El servicio blockchain se inicializa en segundo plano (ver BlockchainConfig.ready),
+# así el arranque del worker no depende de la latencia de la cadena
+
+def chain_unavailable():
+    """Respuesta 503 mientras el servicio no está listo"""
+    return JsonResponse({
+        'error': 'Blockchain no disponible',
+        **services.state()
+    }, status=503)
 
 @csrf_exempt
 def blockchain_info(request):
     """Información de la blockchain"""
     info = services.get_blockchain_info()
+    info['service_status'] = services.status
     return JsonResponse(info)
 
 @csrf_exempt
@@ -44,6 +54,26 @@ def blockchain_accounts(request):
     accounts = services.get_accounts()
     return JsonResponse({'accounts': accounts})
 
+@csrf_exempt
+def http_pool(request):
+    """Estadísticas del pool HTTP compartido (reutilización de conexiones)"""
+    return JsonResponse(pool_stats())
+
+@csrf_exempt
+def firmas(request):
+    """Firmas realizadas por el proceso y su ritmo (firmas por segundo)"""
+    return JsonResponse(signer_stats())
+
+@csrf_exempt
+def cache_cadena(request):
+    """Aciertos, fallos y ocupación de la caché de bloques y recibos finalizados"""
+    return JsonResponse(chain_cache_stats())
+
+@csrf_exempt
+def metricas(request):
+    """Métricas RPC y de confirmación de órdenes en formato de texto Prometheus"""
+    return HttpResponse(render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @csrf_exempt
 def test_transaction(request):
     """Probar transacciones"""
@@ -55,20 +85,10 @@ def test_transaction(request):
 @csrf_exempt
 def lista_productos(request):
     try:
-        productos = BlockchainProducto.objects.all()
+        # Una sola consulta (JOIN con el vendedor) sea cual sea el tamaño del catálogo
+        data = [producto_data(row) for row in productos_values(BlockchainProducto.objects.all())]
         
-        if productos.exists():
-            data = []
-            for producto in productos:
-                data.append({
-                    'id': producto.id,
-                    'nombre': producto.nombre,
-                    'precio': str(producto.precio),
-                    'stock': producto.stock,
-                    'vendedor': producto.vendedor.username,
-                    'blockchain_tx': producto.blockchain_tx_hash,
-                    'on_blockchain': bool(producto.blockchain_tx_hash)
-                })
+        if data:
             return JsonResponse(data, safe=False)
         else:
             # Crear productos de prueba
@@ -93,18 +113,7 @@ def lista_productos(request):
                 producto.save()
             
             # Devolver productos
-            productos = BlockchainProducto.objects.all()
-            data = []
-            for producto in productos:
-                data.append({
-                    'id': producto.id,
-                    'nombre': producto.nombre,
-                    'precio': str(producto.precio),
-                    'stock': producto.stock,
-                    'vendedor': producto.vendedor.username,
-                    'blockchain_tx': producto.blockchain_tx_hash,
-                    'on_blockchain': bool(producto.blockchain_tx_hash)
-                })
+            data = [producto_data(row) for row in productos_values(BlockchainProducto.objects.all())]
             return JsonResponse(data, safe=False)
             
     except Exception as e:
@@ -155,6 +164,50 @@ def crear_producto(request):
             return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'error': 'Método no permitido'}, status=405)
     
+@csrf_exempt
+def crear_productos_lote(request):
+    """Registrar muchos productos con nonces consecutivos y envío por lotes"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    try:
+        data = json.loads(request.body)
+        items = data.get('productos') or []
+        if not items:
+            return JsonResponse({'error': 'Se requiere una lista de productos'}, status=400)
+        if len(items) > MAX_BULK_PRODUCTS:
+            return JsonResponse({'error': f'Máximo {MAX_BULK_PRODUCTS} productos por petición'}, status=400)
+        for i, item in enumerate(items):
+            if not item.get('nombre') or not item.get('precio'):
+                return JsonResponse({'error': f'Producto {i}: nombre y precio son requeridos'}, status=400)
+        
+        if not services.is_ready:
+            return chain_unavailable()
+        
+        usuario, _ = User.objects.get_or_create(username='vendedor1')
+        with transaction.atomic():
+            productos = BlockchainProducto.objects.bulk_create([
+                BlockchainProducto(
+                    nombre=item['nombre'],
+                    precio=item['precio'],
+                    stock=item.get('stock', 10),
+                    vendedor=usuario
+                ) for item in items
+            ])
+            productos_creados(productos)
+        
+        resultados = register_products_bulk(services.get(), productos, wait=data.get('esperar', True))
+        
+        resumen = {}
+        for resultado in resultados:
+            resumen[resultado['estado']] = resumen.get(resultado['estado'], 0) + 1
+        return JsonResponse({
+            'mensaje': f'{len(productos)} productos enviados a blockchain',
+            'resumen': resumen,
+            'resultados': resultados
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
 @csrf_exempt
 def comprar_producto(request):
     if request.method == 'POST':
@@ -163,46 +216,50 @@ def comprar_producto(request):
             producto_id = data.get('producto_id')
             cantidad = data.get('cantidad', 1)
             
-            producto = BlockchainProducto.objects.get(id=producto_id)
-            comprador, _ = User.objects.get_or_create(username='comprador1')
+            if not cantidad_valida(cantidad):
+                return JsonResponse({'error': 'La cantidad debe ser un entero positivo'}, status=400)
             
-            if producto.stock < cantidad:
-                return JsonResponse({'error': 'Stock insuficiente'}, status=400)
+            comprador, _ = User.objects.get_or_create(username='comprador1')
             
-            total = producto.precio * cantidad
+            def crear_orden(producto):
+                return BlockchainOrden.objects.create(
+                    producto=producto,
+                    comprador=comprador,
+                    cantidad=cantidad,
+                    total_pagado=producto.precio * cantidad
+                )
             
-            orden = BlockchainOrden.objects.create(
-                producto=producto,
-                comprador=comprador,
-                cantidad=cantidad,
-                total_pagado=total
-            )
+            # Reserva de stock (UPDATE condicional) y orden en una transacción: sin sobreventa
+            producto, orden = comprar(BlockchainProducto, producto_id, cantidad, crear_orden)
+            total = orden.total_pagado
             
-            # Registrar compra en blockchain
+            # Registrar compra en blockchain, ya fuera de la transacción: el RPC no retiene el bloqueo
             tx_hash = services.purchase_product_on_blockchain(
                 producto_id, 
                 cantidad, 
                 float(total)
             )
             orden.blockchain_tx_hash = tx_hash
-            orden.save()
-            
-            producto.stock -= cantidad
-            producto.save()
+            # Sin transacción enviada no habrá recibo que confirmar
+            orden.estado = 'pendiente' if tx_hash else 'fallida'
+            con_reintentos(lambda: orden.save(update_fields=['blockchain_tx_hash', 'estado']))
             
             return JsonResponse({
-                'mensaje': 'Compra realizada exitosamente en blockchain',
+                'mensaje': 'Compra enviada a blockchain, pendiente de confirmación',
                 'orden': {
                     'id': orden.id,
                     'producto': producto.nombre,
                     'cantidad': cantidad,
                     'total': str(total),
-                    'blockchain_tx': tx_hash
+                    'blockchain_tx': tx_hash,
+                    'estado': orden.estado
                 }
             })
             
         except BlockchainProducto.DoesNotExist:
             return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+        except StockInsuficiente:
+            return JsonResponse({'error': 'Stock insuficiente'}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'error': 'Método no permitido'}, status=405)
@@ -212,44 +269,15 @@ def comprar_producto(request):
 def dashboard_completo(request):
     """Dashboard simplificado y robusto"""
     try:
-        # Productos
-        productos = BlockchainProducto.objects.all()
-        productos_data = [{
-            'id': p.id,
-            'nombre': p.nombre,
-            'precio': str(p.precio),
-            'stock': p.stock,
-            'vendedor': p.vendedor.username,
-            'blockchain_tx': p.blockchain_tx_hash,
-            'on_blockchain': bool(p.blockchain_tx_hash)
-        } for p in productos]
-
-        # Órdenes
-        todas_ordenes = BlockchainOrden.objects.all()
-        ordenes_recientes = todas_ordenes.order_by('-fecha_compra')[:10]
-        ordenes_data = [{
-            'id': o.id,
-            'producto_nombre': o.producto.nombre,
-            'comprador': o.comprador.username,
-            'cantidad': o.cantidad,
-            'total': str(o.total_pagado),
-            'fecha_compra': o.fecha_compra.strftime("%Y-%m-%d %H:%M"),
-            'blockchain_tx': o.blockchain_tx_hash,
-            'on_blockchain': bool(o.blockchain_tx_hash)
-        } for o in ordenes_recientes]
+        # Productos y órdenes: proyecciones con JOIN, número de consultas constante
+        productos_data = [producto_data(row) for row in productos_values(BlockchainProducto.objects.all())]
+        ordenes_data = [orden_data(row) for row in ordenes_recientes_values(BlockchainOrden.objects.all())]
 
         # Blockchain info
         blockchain_info = services.get_blockchain_info()
 
-        # Estadísticas
-        stats = {
-            'total_productos': productos.count(),
-            'total_ordenes': todas_ordenes.count(),
-            'productos_blockchain': productos.filter(blockchain_tx_hash__isnull=False).count(),
-            'ordenes_blockchain': todas_ordenes.filter(blockchain_tx_hash__isnull=False).count(),
-            'total_ventas': sum(float(o.total_pagado) for o in todas_ordenes),
-            'transacciones_totales': blockchain_info.get('transaction_count', 0)
-        }
+        # Estadísticas: resumen mantenido en cada escritura, coste constante
+        stats = estadisticas_data(leer_resumen(), blockchain_info)
 
         return JsonResponse({
             'estadisticas': stats,
@@ -261,49 +289,69 @@ def dashboard_completo(request):
     except Exception as e:
         return JsonResponse({'error': f'Error en dashboard: {str(e)}'}, status=500)
 
+def parametros_transacciones(params):
+    """(profundidad, límite, página, queryset del índice) de ?bloques=10&limite=50&pagina=2...
+
+    Lanza ValueError si un parámetro numérico no es un entero.
+    """
+    depth = max(1, min(int(params.get('bloques', settings.BLOCKCHAIN_TX_DEPTH)), MAX_TX_DEPTH))
+    limit = max(1, min(int(params.get('limite', settings.BLOCKCHAIN_TX_LIMIT)), MAX_TX_LIMIT))
+    pagina = max(1, int(params.get('pagina', 1)))
+    return depth, limit, pagina, filtrar_transacciones(params)
+
 @csrf_exempt
 def transacciones_detalladas(request):
     """Obtener transacciones blockchain detalladas"""
     try:
-        # Obtener últimas transacciones de la blockchain
-        latest_block = services.w3.eth.get_block('latest')
-        block_number = latest_block['number']
+        try:
+            depth, limit, pagina, qs = parametros_transacciones(request.GET)
+        except ValueError:
+            return JsonResponse({'error': ERROR_PARAMETROS_TX}, status=400)
+        
+        # Con el índice local (manage.py indexar_bloques) es una consulta a la BD, si está al día
+        checkpoint = CheckpointIndexador.objects.filter(nombre=CHECKPOINT_BLOQUES).first()
+        if checkpoint:
+            # Sin nodo no hay con qué comparar: se responde del índice indicando su altura
+            head = cabeza_cadena(services.w3) if services.is_ready else None
+            rango = rango_explicito(request.GET)
+            if head is None or rango or indice_cubre(checkpoint, head, depth):
+                if not rango:
+                    qs = qs.filter(block_number__gt=(head if head is not None else checkpoint.block_number) - depth)
+                offset = (pagina - 1) * limit
+                return JsonResponse({
+                    'fuente': 'indice',
+                    'bloque_indexado': checkpoint.block_number,
+                    'bloque_cabeza': head,
+                    'total_transacciones': qs.count(),
+                    'pagina': pagina,
+                    'por_pagina': limit,
+                    'transacciones': [transaccion_indexada_data(t) for t in qs[offset:offset + limit]]
+                })
+        
+        if not services.is_ready:
+            return chain_unavailable()
         
         transacciones_detalladas = []
         
-        # Revisar últimos 5 bloques para transacciones
-        for i in range(min(5, block_number + 1)):
-            try:
-                block = services.w3.eth.get_block(block_number - i)
-                for tx_hash in block['transactions']:
-                    tx = services.w3.eth.get_transaction(tx_hash)
-                    tx_receipt = services.w3.eth.get_transaction_receipt(tx_hash)
-                    
-                    transacciones_detalladas.append({
-                        'block_number': block['number'],
-                        'hash': tx_hash.hex(),
-                        'from': tx['from'],
-                        'to': tx['to'] if tx['to'] else 'Contract Creation',
-                        'value_eth': float(services.w3.from_wei(tx['value'], 'ether')),
-                        'gas_used': tx_receipt['gasUsed'] if tx_receipt else 0,
-                        'gas_price_gwei': float(services.w3.from_wei(tx['gasPrice'], 'gwei')),
-                        'status': 'Success' if tx_receipt and tx_receipt['status'] == 1 else 'Failed',
-                        'timestamp': block['timestamp'] if 'timestamp' in block else None
-                    })
-                    
-                    # Máximo 20 transacciones
-                    if len(transacciones_detalladas) >= 20:
-                        break
-                        
-            except Exception as e:
-                print(f"Error obteniendo bloque {block_number - i}: {e}")
-                continue
+        # Bloques y recibos por lotes JSON-RPC: número fijo de round trips
+        for block, tx, tx_receipt in fetch_recent_transactions(services.w3, depth=depth, limit=limit):
+            transacciones_detalladas.append({
+                'block_number': hex_to_int(block['number']),
+                'hash': tx['hash'],
+                'from': tx['from'],
+                'to': tx['to'] if tx['to'] else 'Contract Creation',
+                'value_eth': float(services.w3.from_wei(hex_to_int(tx['value']), 'ether')),
+                'gas_used': hex_to_int(tx_receipt['gasUsed']) if tx_receipt else 0,
+                'gas_price_gwei': float(services.w3.from_wei(hex_to_int(tx.get('gasPrice', '0x0')), 'gwei')),
+                'status': 'Success' if tx_receipt and hex_to_int(tx_receipt['status']) == 1 else 'Failed',
+                'timestamp': hex_to_int(block['timestamp']) if 'timestamp' in block else None
+            })
                 
         return JsonResponse({
+            'fuente': 'nodo',
             'total_transacciones': len(transacciones_detalladas),
             'transacciones': transacciones_detalladas
         })
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
-
@@ -4,11 +4,17 @@ import json
 import time
 from django.conf import settings
 
+from apps.blockchain.fees import get_fee_oracle
+from apps.blockchain.metrics import instrumented
+from apps.blockchain.nonce_manager import get_nonce_manager
+from apps.blockchain.providers import get_http_provider
+from apps.blockchain.signer import get_signer
+
 class BlockchainService:
     def __init__(self, provider_url='http://localhost:8545'):
         try:
             # Conectar a Ganache
-            self.w3 = Web3(Web3.HTTPProvider(provider_url))
+            self.w3 = Web3(get_http_provider(provider_url))
             
             if not self.w3.is_connected():
                 print("❌ No se pudo conectar a Ganache. Verifica que esté ejecutándose en puerto 8545")
@@ -19,6 +25,15 @@ class BlockchainService:
             
             # Private key de la primera cuenta de Ganache (conocida para desarrollo)
             self.private_key = "0x4f3edf983ac636a65a842ce7c78d9aa706d3b113bce9c46f30d7d21715b23b1d"
+            # Cuenta local derivada una sola vez por proceso
+            self.signer = get_signer(self.private_key)
+            
+            # Nonces gestionados en proceso (una única consulta al arrancar)
+            self.nonce_manager = get_nonce_manager(self.w3, self.default_account)
+            self.nonce_manager.resync()
+            
+            # Tarifas EIP-1559 muestreadas una vez por bloque (sin RPC al enviar)
+            self.fees = get_fee_oracle(self.w3)
             
             print("✅ Conectado exitosamente a Ganache")
             print(f"📦 Último bloque: {self.w3.eth.block_number}")
@@ -33,51 +48,59 @@ class BlockchainService:
             print(f"❌ Error inicializando BlockchainService: {e}")
             raise
     
+    @instrumented
     def create_product_on_blockchain(self, name, price):
         """Simular creación de producto enviando ETH (transacción real)"""
         try:
             # DEBE tener esta parte para enviar transacción REAL
             price_wei = self.w3.to_wei(0.0001, 'ether')
             
-            transaction = {
-                'to': self.default_account,
-                'value': price_wei,
-                'gas': 21000,
-                'gasPrice': self.w3.to_wei('20', 'gwei'),
-                'nonce': self.w3.eth.get_transaction_count(self.default_account),
-                'chainId': 1337
-            }
-            
-            # Estas 3 líneas son CLAVE:
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            def send(nonce):
+                transaction = {
+                    'to': self.default_account,
+                    'value': price_wei,
+                    'gas': 21000,
+                    **self.fees.fee_params(),
+                    'nonce': nonce,
+                    'chainId': 1337
+                }
+                
+                # Estas 3 líneas son CLAVE:
+                signed_txn = self.signer.sign(transaction)
+                return self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            
+            tx_hash = self.nonce_manager.send(send)
             return tx_hash.hex()  # ← Debe devolver el hash real
             
         except Exception as e:
             print(f"❌ Error real: {e}")
             return f"0xSIM_{name}_{int(time.time())}"
     
+    @instrumented
     def purchase_product_on_blockchain(self, product_id, quantity, total_price):
         """Registrar compra con transacción real"""
         try:
             # Convertir precio a wei (usamos una cantidad pequeña fija para demo)
             total_wei = self.w3.to_wei(0.0002, 'ether')
             
-            # Crear transacción real
-            transaction = {
-                'to': self.default_account,  # Enviarnos a nosotros mismos
-                'value': total_wei,
-                'gas': 21000,
-                'gasPrice': self.w3.to_wei('20', 'gwei'),
-                'nonce': self.w3.eth.get_transaction_count(self.default_account),
-                'chainId': 1337
-            }
-            
-            # Firmar transacción
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            
-            # Enviar transacción
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            def send(nonce):
+                # Crear transacción real
+                transaction = {
+                    'to': self.default_account,  # Enviarnos a nosotros mismos
+                    'value': total_wei,
+                    'gas': 21000,
+                    **self.fees.fee_params(),
+                    'nonce': nonce,
+                    'chainId': 1337
+                }
+                
+                # Firmar transacción
+                signed_txn = self.signer.sign(transaction)
+                
+                # Enviar transacción
+                return self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            
+            tx_hash = self.nonce_manager.send(send)
             
             print(f"✅ Compra registrada con transacción real")
             print(f"📄 TX Hash REAL: {tx_hash.hex()}")
@@ -89,6 +112,7 @@ class BlockchainService:
             print(f"❌ Error en transacción de compra: {e}")
             return f"0xBUY_{product_id}_{int(time.time())}"
     
+    @instrumented
     def get_blockchain_info(self):
         """Obtener información REAL de Ganache"""
         try:
@@ -117,6 +141,7 @@ class BlockchainService:
                 'error': str(e)
             }
     
+    @instrumented
     def get_accounts(self):
         """Obtener cuentas REALES de Ganache"""
         try:
@@ -135,21 +160,25 @@ class BlockchainService:
         except Exception as e:
             return {'error': str(e)}
     
+    @instrumented
     def send_test_transaction(self):
         """Método para probar transacciones"""
         try:
             # Enviar una pequeña cantidad a nosotros mismos
-            transaction = {
-                'to': self.default_account,
-                'value': self.w3.to_wei(0.0001, 'ether'),
-                'gas': 21000,
-                'gasPrice': self.w3.to_wei('20', 'gwei'),
-                'nonce': self.w3.eth.get_transaction_count(self.default_account),
-                'chainId': 1337
-            }
-            
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            def send(nonce):
+                transaction = {
+                    'to': self.default_account,
+                    'value': self.w3.to_wei(0.0001, 'ether'),
+                    'gas': 21000,
+                    **self.fees.fee_params(),
+                    'nonce': nonce,
+                    'chainId': 1337
+                }
+                
+                signed_txn = self.signer.sign(transaction)
+                return self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            
+            tx_hash = self.nonce_manager.send(send)
             
             return {
                 'success': True,
@@ -17,6 +17,11 @@ class Producto(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADOS, default='activo')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado'], name='producto_estado'),
+        ]
+    
     def __str__(self):
         return self.nombre
 
@@ -36,5 +41,11 @@ class Orden(models.Model):
     fecha_compra = models.DateTimeField(auto_now_add=True)
     transaccion_hash = models.CharField(max_length=100, blank=True)  # Para blockchain
     
+    class Meta:
+        indexes = [
+            # Filtro por estado con las más recientes primero (también sirve para filtrar solo por estado)
+            models.Index(fields=['estado', '-fecha_compra'], name='orden_estado_fecha'),
+        ]
+    
     def __str__(self):
         return f"Orden #{self.id} - {self.producto.nombre}"
\ No newline at end of file
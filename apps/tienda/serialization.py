@@ -0,0 +1,18 @@
+# apps/tienda/serialization.py
+
+# Proyección values() con el vendedor en el mismo JOIN: una consulta para todo el catálogo
+PRODUCTO_CAMPOS = ('id', 'nombre', 'precio', 'stock', 'vendedor__username')
+
+
+def productos_values(qs):
+    return qs.values(*PRODUCTO_CAMPOS).order_by('id')
+
+
+def producto_data(row):
+    return {
+        'id': row['id'],
+        'nombre': row['nombre'],
+        'precio': str(row['precio']),
+        'stock': row['stock'],
+        'vendedor': row['vendedor__username'],
+    }
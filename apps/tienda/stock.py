@@ -0,0 +1,63 @@
+# apps/tienda/stock.py
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+
+
+class StockInsuficiente(Exception):
+    """No queda stock para la cantidad pedida"""
+
+
+def reservar_stock(modelo, producto_id, cantidad):
+    """Descontar `cantidad` con un único UPDATE condicional (stock >= cantidad); True si se reservó.
+
+    Comprobación y descuento son la misma sentencia, así que dos compras
+    concurrentes no pueden vender la misma unidad. Llamar dentro de la
+    transacción que crea la orden.
+    """
+    return modelo.objects.filter(pk=producto_id, stock__gte=cantidad).update(stock=F('stock') - cantidad) == 1
+
+
+def es_bloqueo_sqlite(error):
+    return 'database is locked' in str(error) or 'database table is locked' in str(error)
+
+
+def con_reintentos(fn, intentos=None, espera=None):
+    """Ejecutar fn() reintentando mientras SQLite responda 'database is locked' (espera exponencial con jitter)"""
+    intentos = intentos or settings.STOCK_RETRY_ATTEMPTS
+    espera = settings.STOCK_RETRY_BACKOFF if espera is None else espera
+    for intento in range(intentos):
+        try:
+            return fn()
+        except OperationalError as e:
+            if not es_bloqueo_sqlite(e) or intento == intentos - 1:
+                raise
+            time.sleep(espera * (2 ** intento) * random.uniform(0.5, 1.5))
+
+
+def comprar(modelo_producto, producto_id, cantidad, crear_orden):
+    """Reservar stock y crear la orden en la misma transacción; devuelve (producto, orden).
+
+    El producto (precio, nombre) se lee antes, fuera del bloqueo; su `stock`
+    en memoria no incluye esta compra. La transacción empieza por el UPDATE,
+    así que en SQLite toma el bloqueo de escritura de entrada y solo contiene
+    el UPDATE y lo que haga `crear_orden(producto)`. Lanza
+    modelo_producto.DoesNotExist o StockInsuficiente.
+    """
+    producto = modelo_producto.objects.get(pk=producto_id)
+
+    def intento():
+        with transaction.atomic():
+            if not reservar_stock(modelo_producto, producto_id, cantidad):
+                raise StockInsuficiente(f'Stock insuficiente para el producto {producto_id}')
+            return crear_orden(producto)
+
+    return producto, con_reintentos(intento)
+
+
+def cantidad_valida(cantidad):
+    # bool es subclase de int: True no es una cantidad
+    return isinstance(cantidad, int) and not isinstance(cantidad, bool) and cantidad >= 1
@@ -0,0 +1,29 @@
+# apps/tienda/tests.py
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from .models import Orden, Producto
+
+
+class ListaProductosTests(TestCase):
+
+    def _poblar(self, hasta):
+        """Completar hasta `hasta` productos con vendedores distintos y una orden por producto"""
+        nuevos = range(Producto.objects.count(), hasta)
+        vendedores = User.objects.bulk_create([User(username=f'vendedor_{i}') for i in nuevos])
+        comprador, _ = User.objects.get_or_create(username='comprador')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', descripcion='', precio=Decimal('1.00'), stock=10, vendedor=v)
+            for i, v in zip(nuevos, vendedores)
+        ])
+        Orden.objects.bulk_create([Orden(producto=p, comprador=comprador, total_pagado=p.precio) for p in productos])
+
+    def test_una_consulta_sea_cual_sea_el_catalogo(self):
+        for tamano in (5, 50):
+            self._poblar(tamano)
+            with self.subTest(tamano=tamano), self.assertNumQueries(1):
+                response = self.client.get('/api/productos/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), tamano)
@@ -4,18 +4,13 @@ from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.models import User
 import json
 from .models import Producto, Orden
+from .serialization import producto_data, productos_values
+from .stock import StockInsuficiente, cantidad_valida, comprar
 
 @csrf_exempt
 def lista_productos(request):
     """Listar productos"""
-    productos = Producto.objects.all()
-    data = [{
-        'id': p.id,
-        'nombre': p.nombre,
-        'precio': str(p.precio),
-        'stock': p.stock,
-        'vendedor': p.vendedor.username,
-    } for p in productos]
+    data = [producto_data(row) for row in productos_values(Producto.objects.all())]
     return JsonResponse(data, safe=False)
 
 @csrf_exempt
@@ -55,22 +50,22 @@ def comprar_producto(request):
             producto_id = data.get('producto_id')
             cantidad = data.get('cantidad', 1)
             
-            producto = Producto.objects.get(id=producto_id)
-            comprador, _ = User.objects.get_or_create(username='comprador1')
+            if not cantidad_valida(cantidad):
+                return JsonResponse({'error': 'La cantidad debe ser un entero positivo'}, status=400)
             
-            if producto.stock < cantidad:
-                return JsonResponse({'error': 'Stock insuficiente'}, status=400)
+            comprador, _ = User.objects.get_or_create(username='comprador1')
             
-            total = producto.precio * cantidad
-            orden = Orden.objects.create(
-                producto=producto,
-                comprador=comprador,
-                cantidad=cantidad,
-                total_pagado=total
-            )
+            def crear_orden(producto):
+                return Orden.objects.create(
+                    producto=producto,
+                    comprador=comprador,
+                    cantidad=cantidad,
+                    total_pagado=producto.precio * cantidad
+                )
             
-            producto.stock -= cantidad
-            producto.save()
+            # Reserva de stock (UPDATE condicional) y orden en una transacción: sin sobreventa
+            producto, orden = comprar(Producto, producto_id, cantidad, crear_orden)
+            total = orden.total_pagado
             
             return JsonResponse({
                 'mensaje': 'Compra realizada exitosamente',
@@ -83,6 +78,8 @@ def comprar_producto(request):
             })
         except Producto.DoesNotExist:
             return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+        except StockInsuficiente:
+            return JsonResponse({'error': 'Stock insuficiente'}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'error': 'Método no permitido'}, status=405)
\ No newline at end of file
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Conectar con la cadena en segundo plano sin bloquear el arranque del worker
+from apps.blockchain.service_loader import warm_up_server  # noqa: E402
+
+warm_up_server()
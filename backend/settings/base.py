@@ -52,18 +52,117 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 # Database
+# SQLite: segundos que una escritura espera el bloqueo antes de fallar con 'database is locked'
+SQLITE_TIMEOUT = float(os.getenv('SQLITE_TIMEOUT', '20'))
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'timeout': SQLITE_TIMEOUT},
+        # Base de pruebas en fichero: la de memoria compartida ignora el timeout y las
+        # pruebas de compras concurrentes fallarían con 'database table is locked'
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Compras (apps/tienda/stock.py): reintentos de la transacción de reserva de stock
+# si SQLite sigue bloqueada tras SQLITE_TIMEOUT, con espera exponencial desde STOCK_RETRY_BACKOFF
+STOCK_RETRY_ATTEMPTS = int(os.getenv('STOCK_RETRY_ATTEMPTS', '5'))
+STOCK_RETRY_BACKOFF = float(os.getenv('STOCK_RETRY_BACKOFF', '0.05'))
+
 ALCHEMY_API_URL = os.getenv('ALCHEMY_API_URL', 'https://eth-sepolia.g.alchemy.com/v2/your-api-key')
 CONTRACT_ADDRESS = os.getenv('CONTRACT_ADDRESS', '')
 OWNER_PRIVATE_KEY = os.getenv('OWNER_PRIVATE_KEY', '')
 OWNER_ADDRESS = os.getenv('OWNER_ADDRESS', '')
 
+# Transacciones detalladas: bloques a revisar y máximo de transacciones devueltas
+BLOCKCHAIN_TX_DEPTH = int(os.getenv('BLOCKCHAIN_TX_DEPTH', '5'))
+BLOCKCHAIN_TX_LIMIT = int(os.getenv('BLOCKCHAIN_TX_LIMIT', '20'))
+
+# Inicialización del servicio blockchain en segundo plano al arrancar el servidor (wsgi.py,
+# asgi.py y runserver; los comandos de manage.py no conectan hasta que usan el servicio)
+BLOCKCHAIN_WARMUP = os.getenv('BLOCKCHAIN_WARMUP', 'true').lower() == 'true'
+# Segundos antes de reintentar la conexión tras un fallo (estado DEGRADED)
+BLOCKCHAIN_RETRY_INTERVAL = int(os.getenv('BLOCKCHAIN_RETRY_INTERVAL', '30'))
+
+# Confirmación de órdenes en segundo plano: un barrido de recibos por bloque nuevo.
+# Desactivar en los workers web si se ejecuta aparte con `manage.py confirmar_ordenes`
+BLOCKCHAIN_CONFIRMER_ENABLED = os.getenv('BLOCKCHAIN_CONFIRMER_ENABLED', 'true').lower() == 'true'
+BLOCKCHAIN_CONFIRMER_BATCH_SIZE = int(os.getenv('BLOCKCHAIN_CONFIRMER_BATCH_SIZE', '200'))
+BLOCKCHAIN_HEAD_POLL_INTERVAL = float(os.getenv('BLOCKCHAIN_HEAD_POLL_INTERVAL', '2'))
+
+# Lecturas de contrato por lotes: eth_call por POST JSON-RPC (get_products/get_purchases)
+BLOCKCHAIN_CALL_BATCH_SIZE = int(os.getenv('BLOCKCHAIN_CALL_BATCH_SIZE', '500'))
+
+# Registro en bloque (bulk.py): transacciones por lote JSON-RPC y espera máxima de recibos
+BLOCKCHAIN_BULK_SEND_BATCH = int(os.getenv('BLOCKCHAIN_BULK_SEND_BATCH', '100'))
+BLOCKCHAIN_BULK_RECEIPT_TIMEOUT = float(os.getenv('BLOCKCHAIN_BULK_RECEIPT_TIMEOUT', '120'))
+
+# Firma de transacciones (signer.py): procesos del pool (0 = núcleos de CPU) y tamaño
+# mínimo de lote para repartir la firma entre procesos
+BLOCKCHAIN_SIGN_WORKERS = int(os.getenv('BLOCKCHAIN_SIGN_WORKERS', '0'))
+BLOCKCHAIN_SIGN_PARALLEL_MIN = int(os.getenv('BLOCKCHAIN_SIGN_PARALLEL_MIN', '64'))
+
+# Segundos máximos que get_blockchain_info reutiliza la info del bloque actual
+BLOCKCHAIN_INFO_TTL = float(os.getenv('BLOCKCHAIN_INFO_TTL', '10'))
+
+# Oráculo de tarifas EIP-1559 (fees.py): bloques de eth_feeHistory por muestra,
+# propina mínima y antigüedad máxima de la muestra si no hay HeadWatcher de esa cadena
+BLOCKCHAIN_FEE_HISTORY_BLOCKS = int(os.getenv('BLOCKCHAIN_FEE_HISTORY_BLOCKS', '20'))
+BLOCKCHAIN_MIN_PRIORITY_FEE_GWEI = float(os.getenv('BLOCKCHAIN_MIN_PRIORITY_FEE_GWEI', '1'))
+BLOCKCHAIN_FEE_MAX_AGE = float(os.getenv('BLOCKCHAIN_FEE_MAX_AGE', '15'))
+
+# Índice local de bloques y transacciones (manage.py indexar_bloques)
+BLOCKCHAIN_INDEXER_ENABLED = os.getenv('BLOCKCHAIN_INDEXER_ENABLED', 'false').lower() == 'true'
+BLOCKCHAIN_INDEX_START_BLOCK = int(os.getenv('BLOCKCHAIN_INDEX_START_BLOCK', '0'))
+BLOCKCHAIN_INDEX_BATCH_BLOCKS = int(os.getenv('BLOCKCHAIN_INDEX_BATCH_BLOCKS', '50'))
+# Profundidad que se deshace al detectar un reorg
+BLOCKCHAIN_INDEX_CONFIRMATIONS = int(os.getenv('BLOCKCHAIN_INDEX_CONFIRMATIONS', '6'))
+
+# Índice de eventos del contrato ECommerce (manage.py indexar_eventos)
+BLOCKCHAIN_EVENTS_START_BLOCK = int(os.getenv('BLOCKCHAIN_EVENTS_START_BLOCK', '0'))
+# Bloques por eth_getLogs: se duplica tras cada éxito y se parte a la mitad si el nodo lo rechaza
+BLOCKCHAIN_LOGS_CHUNK = int(os.getenv('BLOCKCHAIN_LOGS_CHUNK', '2000'))
+BLOCKCHAIN_LOGS_MAX_CHUNK = int(os.getenv('BLOCKCHAIN_LOGS_MAX_CHUNK', '10000'))
+
+# Caché LRU de bloques y recibos finalizados (chain_cache.py): presupuesto en MB (0 la
+# desactiva), confirmaciones para considerar un bloque final y SQLite opcional para persistirla
+BLOCKCHAIN_CHAIN_CACHE_MB = float(os.getenv('BLOCKCHAIN_CHAIN_CACHE_MB', '64'))
+BLOCKCHAIN_CHAIN_CACHE_CONFIRMATIONS = int(
+    os.getenv('BLOCKCHAIN_CHAIN_CACHE_CONFIRMATIONS', str(BLOCKCHAIN_INDEX_CONFIRMATIONS))
+)
+BLOCKCHAIN_CHAIN_CACHE_PATH = os.getenv('BLOCKCHAIN_CHAIN_CACHE_PATH', '')
+# Presupuesto del fichero SQLite (se borran las entradas más antiguas; 0 = sin límite)
+BLOCKCHAIN_CHAIN_CACHE_DISK_MB = float(os.getenv('BLOCKCHAIN_CHAIN_CACHE_DISK_MB', '512'))
+# Segundos entre comprobaciones del bloque génesis de cada endpoint (también se comprueba
+# si la cabeza retrocede): detecta un Ganache reiniciado con el servidor en marcha
+BLOCKCHAIN_CHAIN_NAMESPACE_TTL = float(os.getenv('BLOCKCHAIN_CHAIN_NAMESPACE_TTL', '30'))
+
+# Registro local de contratos desplegados (compartido por todos los workers)
+BLOCKCHAIN_DEPLOYMENTS_FILE = os.getenv('BLOCKCHAIN_DEPLOYMENTS_FILE', str(BASE_DIR / 'deployments.json'))
+
+# Pool HTTP compartido por todos los providers de la cadena
+BLOCKCHAIN_HTTP_POOL_SIZE = int(os.getenv('BLOCKCHAIN_HTTP_POOL_SIZE', '20'))
+BLOCKCHAIN_HTTP_CONNECT_TIMEOUT = float(os.getenv('BLOCKCHAIN_HTTP_CONNECT_TIMEOUT', '3'))
+BLOCKCHAIN_HTTP_READ_TIMEOUT = float(os.getenv('BLOCKCHAIN_HTTP_READ_TIMEOUT', '10'))
+BLOCKCHAIN_HTTP_RETRIES = int(os.getenv('BLOCKCHAIN_HTTP_RETRIES', '3'))
+BLOCKCHAIN_HTTP_BACKOFF = float(os.getenv('BLOCKCHAIN_HTTP_BACKOFF', '0.2'))
+
+# Réplicas JSON-RPC de una misma red separadas por comas (providers.RPCRouter): las
+# lecturas van al nodo sano más rápido y los envíos al endpoint que pide el servicio.
+# El breaker se abre tras N fallos seguidos o con la tasa de error EWMA por encima del umbral
+BLOCKCHAIN_RPC_ENDPOINTS = [url.strip() for url in os.getenv('BLOCKCHAIN_RPC_ENDPOINTS', '').split(',') if url.strip()]
+BLOCKCHAIN_RPC_EWMA_ALPHA = float(os.getenv('BLOCKCHAIN_RPC_EWMA_ALPHA', '0.3'))
+BLOCKCHAIN_RPC_BREAKER_FAILURES = int(os.getenv('BLOCKCHAIN_RPC_BREAKER_FAILURES', '3'))
+BLOCKCHAIN_RPC_BREAKER_ERROR_RATE = float(os.getenv('BLOCKCHAIN_RPC_BREAKER_ERROR_RATE', '0.5'))
+BLOCKCHAIN_RPC_BREAKER_COOLDOWN = float(os.getenv('BLOCKCHAIN_RPC_BREAKER_COOLDOWN', '30'))
+
+# Lecturas JSON-RPC idénticas y simultáneas comparten una sola petición (providers.SingleFlight)
+BLOCKCHAIN_RPC_COALESCE = os.getenv('BLOCKCHAIN_RPC_COALESCE', 'true').lower() == 'true'
+
+# Contadores e histogramas por método JSON-RPC y operación de servicio (/api/blockchain/metrics/)
+BLOCKCHAIN_METRICS_ENABLED = os.getenv('BLOCKCHAIN_METRICS_ENABLED', 'true').lower() == 'true'
+
 # Internationalization
 LANGUAGE_CODE = 'es-es'
 TIME_ZONE = 'UTC'
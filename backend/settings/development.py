@@ -7,6 +7,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'timeout': SQLITE_TIMEOUT},
+        # Base de pruebas en fichero: la de memoria compartida ignora el timeout y las
+        # pruebas de compras concurrentes fallarían con 'database table is locked'
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 